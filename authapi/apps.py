@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class AuthapiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'authapi'
+
+    def ready(self):
+        from django.contrib.auth.models import User
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete, post_save
+        from .authentication import forget_user
+        from .db import configure_connection
+        connection_created.connect(configure_connection, dispatch_uid='authapi_configure_connection')
+        post_save.connect(forget_user, sender=User, dispatch_uid='authapi_forget_user_saved')
+        post_delete.connect(forget_user, sender=User, dispatch_uid='authapi_forget_user_deleted')
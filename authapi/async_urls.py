@@ -0,0 +1,17 @@
+from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
+from .async_views import AsyncProtectedView, AsyncAccountView, AsyncCategoryView, AsyncTransactionView
+
+# Mounted ahead of authapi.urls by the ASGI profile (finalproj.asgi_urls); the
+# paths and names shadow the sync routes. csrf_exempt as on the DRF views:
+# authentication is by bearer token, not cookie.
+urlpatterns = [
+    path('protected/', csrf_exempt(AsyncProtectedView.as_view()), name='protected'),
+    path('accounts/', csrf_exempt(AsyncAccountView.as_view()), name='account-list'),
+    path('accounts/<int:pk>/', csrf_exempt(AsyncAccountView.as_view(detail=True)), name='account-detail'),
+    path('categories/', csrf_exempt(AsyncCategoryView.as_view()), name='category-list'),
+    path('categories/<int:pk>/', csrf_exempt(AsyncCategoryView.as_view(detail=True)), name='category-detail'),
+    path('transactions/', csrf_exempt(AsyncTransactionView.as_view()), name='transaction-list'),
+    path('transactions/<int:pk>/', csrf_exempt(AsyncTransactionView.as_view(detail=True)),
+         name='transaction-detail'),
+]
@@ -0,0 +1,145 @@
+"""
+Native async read endpoints, served under the ASGI profile (finalproj.settings_asgi).
+
+These views handle GETs on /api/protected/ and on the account, category and
+transaction collections and items. They use the async ORM (aiterator/aget),
+so one worker process can hold many slow connections without a thread for
+each. Writes to the same URLs go to the synchronous DRF viewsets in a thread.
+Responses match the sync views: the same JSON, the same 401/404/429 errors,
+the same rate limits and the same conditional GET (ETag, and Last-Modified on items) handling.
+"""
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views import View
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework.utils.urls import replace_query_param
+from rest_framework_simplejwt.exceptions import InvalidToken
+from . import conditional, renderers
+from .authentication import StatelessJWTAuthentication
+from .pagination import InvalidCursor, get_page_size
+from .ratelimit import SlidingWindowRateLimiter, default_key, rate_limited_response
+from .response_cache import request_digest
+from .services import AccountService, CategoryService, TransactionService
+from .views import AccountViewSet, CategoryViewSet, TransactionViewSet
+
+auth = StatelessJWTAuthentication()
+
+
+def json_response(data, status=200, headers=None):
+    # The same bytes the sync views' ORJSONRenderer produces
+    return HttpResponse(renderers.dumps(data), status=status, headers=headers, content_type='application/json')
+
+
+async def authenticate(request):
+    """Set request.user from the bearer token. Returns a 401 response on failure, else None."""
+    try:
+        result = await auth.aauthenticate(request)
+    except (InvalidToken, AuthenticationFailed) as e:
+        detail = e.detail
+    else:
+        if result is not None:
+            request.user = result[0]
+            return None
+        detail = {'detail': 'Authentication credentials were not provided.'}
+    if not isinstance(detail, dict):
+        detail = {'detail': detail}
+    return json_response(detail, status=401, headers={'WWW-Authenticate': auth.authenticate_header(request)})
+
+
+async def rate_limit(request, limiter, unit='requests'):
+    """A 429 response if the request is over the limiter's limit, else None."""
+    result = await limiter.ahit(default_key(request))
+    if result.allowed:
+        return None
+    return rate_limited_response(limiter.limit, limiter.period, unit, result, response_class=json_response)
+
+
+class AsyncProtectedView(View):
+    limiter = SlidingWindowRateLimiter(limit=5, period=60)
+
+    async def get(self, request):
+        denied = await authenticate(request) or await rate_limit(request, self.limiter)
+        if denied:
+            return denied
+        return json_response({'message': f'Hello, {request.user.username}! This is a protected route.'})
+
+
+class AsyncResourceView(View):
+    """
+    GET on a collection (keyset-paginated like KeysetPagination) or, with
+    detail=True, on one item. Other methods are answered by `viewset`.
+    """
+    service_class = None
+    viewset = None
+    detail = False
+    # Same limit as the viewsets' list(); retrieve is not rate limited there either
+    limiter = SlidingWindowRateLimiter(limit=10, period=60)
+
+    async def get(self, request, pk=None):
+        denied = await authenticate(request)
+        if denied:
+            return denied
+        if not self.detail:
+            denied = await rate_limit(request, self.limiter)
+            if denied:
+                return denied
+        service = self.service_class(request.user)
+        state = await service.aread_state(pk)
+        etag = conditional.make_etag(request.user.pk, state, request_digest(request, format='json'))
+        last_modified = conditional.last_modified(state, pk)
+        response = conditional.not_modified(request, etag, last_modified)
+        if response is None:
+            response = await self.respond(request, service, pk)
+            if response.status_code == 200:
+                for name, value in conditional.validator_headers(etag, last_modified).items():
+                    response[name] = value
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+    async def respond(self, request, service, pk):
+        if self.detail:
+            try:
+                return json_response(await service.aretrieve_data(pk))
+            except Http404 as e:
+                return json_response({'detail': str(e)}, status=404)
+        try:
+            filters = service.parse_filters(request.GET)
+        except ValidationError as e:
+            return json_response(e.detail, status=400)
+        try:
+            data, next_cursor, previous_cursor = await service.apage_data(
+                request.GET.get('cursor'), get_page_size(request.GET), filters
+            )
+        except InvalidCursor:
+            return json_response({'cursor': ['Invalid cursor.']}, status=400)
+        links = {
+            name: replace_query_param(request.build_absolute_uri(), 'cursor', cursor) if cursor is not None else None
+            for name, cursor in (('next', next_cursor), ('previous', previous_cursor))
+        }
+        return json_response({**links, 'results': data})
+
+    async def write(self, request, *args, **kwargs):
+        if self.detail:
+            actions = {'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}
+        else:
+            actions = {'post': 'create'}
+        view = self.viewset.as_view(actions)
+        return await sync_to_async(view)(request, *args, **kwargs)
+
+    post = put = patch = delete = write
+
+
+class AsyncAccountView(AsyncResourceView):
+    service_class = AccountService
+    viewset = AccountViewSet
+
+
+class AsyncCategoryView(AsyncResourceView):
+    service_class = CategoryService
+    viewset = CategoryViewSet
+
+
+class AsyncTransactionView(AsyncResourceView):
+    service_class = TransactionService
+    viewset = TransactionViewSet
@@ -0,0 +1,180 @@
+"""
+Stateless JWT authentication.
+
+Access tokens issued by LoginView carry the username next to the user id, so a
+request can be authenticated from the token alone instead of loading User
+first. The one thing a token cannot answer is whether it has been revoked:
+whether the user was deactivated, deleted, or changed their password after it
+was issued. That check reads the user's row at most once per
+AUTH_REVOCATION_CACHE_TTL seconds per process, through a small LRU cache.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+UserState = namedtuple('UserState', 'exists is_active password_hash')
+MISSING_USER = UserState(False, False, None)
+
+
+class RevocationCache:
+    """Thread-safe LRU of user id -> UserState whose entries expire after `ttl` seconds."""
+
+    def __init__(self, maxsize=10000, ttl=60, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, user_id):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None:
+                return None
+            expires, state = entry
+            if expires <= self.clock():
+                del self.entries[user_id]
+                return None
+            self.entries.move_to_end(user_id)
+            return state
+
+    def set(self, user_id, state):
+        with self.lock:
+            self.entries[user_id] = (self.clock() + self.ttl, state)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def discard(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+revocation_cache = RevocationCache(
+    maxsize=getattr(settings, 'AUTH_REVOCATION_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'AUTH_REVOCATION_CACHE_TTL', 60),
+)
+
+
+def claim_user_id(token):
+    # simplejwt stores the id as a string; convert it back so it compares and
+    # serializes like User.pk
+    return User._meta.pk.to_python(token[api_settings.USER_ID_CLAIM])
+
+
+def state_query(user_id):
+    return User.objects.filter(pk=user_id).values_list('is_active', 'password')
+
+
+def state_from_row(row):
+    if row is None:
+        return MISSING_USER
+    is_active, password = row
+    return UserState(True, is_active, get_md5_hash_password(password))
+
+
+def user_state(user_id):
+    state = revocation_cache.get(user_id)
+    if state is None:
+        state = state_from_row(state_query(user_id).first())
+        revocation_cache.set(user_id, state)
+    return state
+
+
+async def auser_state(user_id):
+    state = revocation_cache.get(user_id)
+    if state is None:
+        state = state_from_row(await state_query(user_id).afirst())
+        revocation_cache.set(user_id, state)
+    return state
+
+
+def forget_user(sender, instance, **kwargs):
+    """post_save/post_delete receiver: drop the cached state so this process sees the change at once."""
+    revocation_cache.discard(instance.pk)
+
+
+class ClaimsUser(TokenUser):
+    """
+    Request user built from token claims. id, username, is_staff and
+    is_superuser come from the token; any other attribute (email, profile, ...)
+    loads the real User on first access.
+    """
+
+    @cached_property
+    def id(self):
+        return claim_user_id(self.token)
+
+    @cached_property
+    def pk(self):
+        return self.id
+
+    @cached_property
+    def user(self):
+        return User.objects.get(pk=self.id)
+
+    @cached_property
+    def username(self):
+        # Tokens issued before the username claim was added fall back to the database
+        return self.token.get('username') or self.user.username
+
+    def __getattr__(self, name):
+        if name.startswith('_') or name == 'token':
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that returns a ClaimsUser instead of querying User on
+    every request. Applies the same active-user and password-change checks,
+    against the cached UserState.
+    """
+
+    def token_user_id(self, validated_token):
+        try:
+            return claim_user_id(validated_token)
+        except (KeyError, ValidationError) as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+
+    def check_state(self, validated_token, state):
+        if not state.exists:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        if api_settings.CHECK_USER_IS_ACTIVE and not state.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != state.password_hash:
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code='password_changed'
+                )
+
+    def get_user(self, validated_token):
+        self.check_state(validated_token, user_state(self.token_user_id(validated_token)))
+        return ClaimsUser(validated_token)
+
+    async def aauthenticate(self, request):
+        """authenticate() for async views, reading the revocation state with the async ORM."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        state = await auser_state(self.token_user_id(validated_token))
+        self.check_state(validated_token, state)
+        return ClaimsUser(validated_token), validated_token
@@ -0,0 +1,51 @@
+"""
+Conditional GET validators built from model timestamps.
+
+A list or item is described by its state: the newest updated_at among the
+rows shown (and their related rows) plus the row count, read by
+ResourceService.read_state() in one aggregate query. The count catches
+deletes, which leave no newer timestamp behind. The ETag hashes the state
+with the user and the request URL. Both are derived from the database, so
+every worker process computes the same validators and a client's poll can be
+answered with 304 by any of them.
+
+Only single rows get a Last-Modified (their updated_at). A list's newest
+timestamp does not move when a row is deleted, and If-Modified-Since
+compares whole seconds, so a list relies on its ETag alone.
+"""
+import hashlib
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def make_etag(user_id, state, variant=''):
+    """Strong ETag for a (last_modified, count) state; variant tells apart URLs and formats."""
+    last_modified, count = state
+    stamp = last_modified.isoformat() if last_modified else ''
+    raw = f'{user_id}|{stamp}|{count}|{variant}'
+    return f'"{hashlib.sha1(raw.encode()).hexdigest()[:20]}"'
+
+
+def last_modified(state, pk=None):
+    """The Last-Modified of a retrieve's state; None for a list (see above)."""
+    return state[0] if pk is not None else None
+
+
+def validator_headers(etag, last_modified):
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified.timestamp())
+    return headers
+
+
+def not_modified(request, etag, last_modified):
+    """
+    The 304 (or 412) response that If-None-Match / If-Modified-Since and their
+    If-Match counterparts call for, or None if the full response should be sent.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified is not None else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        for name, value in validator_headers(etag, last_modified).items():
+            response[name] = value
+    return response
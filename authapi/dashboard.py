@@ -0,0 +1,44 @@
+"""
+The dashboard bundle: accounts, categories, the latest transactions and
+account balances in one response, for a client's first screen.
+
+Each section costs at most one query (three in all: balances are read from
+the accounts rows when both are asked for), and sections left out of
+?fields= cost nothing. Rows are read with values() through authapi.readers,
+so fields left out are neither selected nor formatted.
+"""
+from .services import AccountService, CategoryService, TransactionService
+
+BALANCE_FIELDS = {'id', 'name', 'balance'}
+
+
+def bundle(user, fields, recent=20):
+    """
+    The sections in `fields` ({section: field names or None}, as validated
+    by DashboardQuerySerializer) for user.
+    """
+    data = {}
+    if 'accounts' in fields or 'balances' in fields:
+        service = AccountService(user)
+        balance_fields = fields.get('balances') or BALANCE_FIELDS
+        if 'accounts' not in fields:
+            columns = balance_fields
+        elif fields['accounts'] is None:
+            columns = None
+        else:
+            columns = fields['accounts'] | balance_fields
+        rows = list(service.list_values(fields=columns))
+        if 'accounts' in fields:
+            data['accounts'] = service.get_reader(fields['accounts']).represent(rows)
+        if 'balances' in fields:
+            data['balances'] = service.get_reader(balance_fields).represent(rows)
+    if 'categories' in fields:
+        service = CategoryService(user)
+        data['categories'] = service.get_reader(fields['categories']).represent(
+            service.list_values(fields=fields['categories'])
+        )
+    if 'transactions' in fields:
+        service = TransactionService(user)
+        rows = service.list_values(fields=fields['transactions'])[:recent]
+        data['transactions'] = service.get_reader(fields['transactions']).represent(rows)
+    return data
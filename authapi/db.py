@@ -0,0 +1,21 @@
+"""
+Per-connection database setup, connected to connection_created in
+AuthapiConfig.ready().
+"""
+from django.conf import settings
+from .metrics import query_wrapper
+
+
+def configure_connection(sender, connection, **kwargs):
+    """
+    Apply settings.SQLITE_PRAGMAS to each new SQLite connection, then install
+    the request-metrics query wrapper.
+    """
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+    # Installed for good rather than per request, so queries the async views
+    # run in worker threads are counted too; the wrapper list outlives reconnects
+    if query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_wrapper)
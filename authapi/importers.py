@@ -0,0 +1,245 @@
+"""
+Streaming import of bank statement exports (CSV and OFX) into Transaction.
+
+Files are read line by line through generators and written in fixed-size
+bulk_create chunks, each in its own database transaction, so memory use does
+not grow with the file. Duplicates on (account, date, amount, description)
+are skipped by checking each chunk against the rows already stored.
+"""
+import csv
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from django.db import transaction as db_transaction
+from . import ledger, response_cache, rollups, sync
+from .models import Category, Transaction
+
+FORMATS = ('csv', 'ofx')
+MAX_REPORTED_ERRORS = 100
+CENT = Decimal('0.01')
+
+
+class ImportRowError(ValueError):
+    line = None
+
+
+@dataclass
+class ImportRow:
+    line: int
+    date: date
+    amount: Decimal
+    description: str
+    is_income: bool
+    category: str = ''
+
+
+@dataclass
+class ImportReport:
+    created: int = 0
+    duplicates: int = 0
+    error_count: int = 0
+    errors: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        total = self.created + self.duplicates + self.error_count
+        return round(total / self.elapsed, 1) if self.elapsed else 0.0
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'duplicates': self.duplicates,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'elapsed': round(self.elapsed, 3),
+            'rows_per_second': self.rows_per_second,
+        }
+
+
+def parse_amount(value):
+    try:
+        amount = Decimal(value.strip().replace(',', '')).quantize(CENT)
+    except (InvalidOperation, AttributeError):
+        raise ImportRowError(f'Invalid amount "{value}".')
+    if abs(amount) >= Decimal('1e10'):
+        raise ImportRowError(f'Amount "{value}" is too large.')
+    return amount
+
+
+def parse_bool(value):
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'y', 'income')
+
+
+def parse_csv(lines):
+    """
+    Yield ImportRow (or ImportRowError) per CSV record. Columns, matched by header:
+    date (YYYY-MM-DD), amount, description, optional category (name) and is_income.
+    Without is_income, negative amounts are expenses and positive ones income.
+    """
+    reader = csv.DictReader(lines)
+    if reader.fieldnames is None:
+        return
+    headers = {name.strip().lower() for name in reader.fieldnames if name}
+    missing = {'date', 'amount'} - headers
+    if missing:
+        yield ImportRowError(f"Missing CSV column(s): {', '.join(sorted(missing))}.")
+        return
+    for record in reader:
+        line = reader.line_num
+        try:
+            # DictReader keeps the fields past the last header as a list under the key None
+            extra = record.pop(None, None)
+            if extra is not None:
+                raise ImportRowError(f'Expected {len(reader.fieldnames)} fields, got '
+                                     f'{len(reader.fieldnames) + len(extra)}.')
+            record = {(k or '').strip().lower(): (v or '').strip() for k, v in record.items()}
+            try:
+                posted = date.fromisoformat(record['date'])
+            except ValueError:
+                raise ImportRowError(f'Invalid date "{record["date"]}", expected YYYY-MM-DD.')
+            amount = parse_amount(record['amount'])
+            if record.get('is_income'):
+                is_income = parse_bool(record['is_income'])
+            else:
+                is_income = amount > 0
+            yield ImportRow(line, posted, abs(amount), record.get('description', ''), is_income,
+                            record.get('category', ''))
+        except ImportRowError as e:
+            e.line = line
+            yield e
+
+
+OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+
+def parse_ofx(lines):
+    """
+    Yield ImportRow (or ImportRowError) per <STMTTRN> block of an OFX file.
+    Handles both SGML (unclosed leaf tags) and XML variants; only one
+    transaction's tags are held in memory at a time.
+    """
+    current = None
+    start_line = 0
+    for number, text in enumerate(lines, start=1):
+        for closing, tag, value in OFX_TAG.findall(text):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if not closing:
+                    current, start_line = {}, number
+                elif current is not None:
+                    yield ofx_row(start_line, current)
+                    current = None
+            elif current is not None and not closing:
+                current[tag] = value.strip()
+
+
+def ofx_row(line, values):
+    try:
+        posted = values.get('DTPOSTED', '')
+        try:
+            posted = datetime.strptime(posted[:8], '%Y%m%d').date()
+        except ValueError:
+            raise ImportRowError(f'Invalid DTPOSTED "{posted}".')
+        amount = parse_amount(values.get('TRNAMT', ''))
+        description = ' '.join(v for v in (values.get('NAME'), values.get('MEMO')) if v)
+        return ImportRow(line, posted, abs(amount), description, amount > 0)
+    except ImportRowError as e:
+        e.line = line
+        return e
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class TransactionImporter:
+    """
+    Insert parsed rows for one account. Rows naming a category are matched by
+    name (case-insensitive) against the user's categories, loaded once;
+    rows without one use default_category.
+    """
+
+    def __init__(self, user, account, default_category=None, chunk_size=1000, dedupe=True):
+        self.user = user
+        self.account = account
+        self.default_category = default_category
+        self.chunk_size = chunk_size
+        self.dedupe = dedupe
+        self.categories = {
+            name.lower(): pk for pk, name in Category.objects.for_user(user).values_list('id', 'name')
+        }
+
+    def category_id(self, row):
+        if row.category:
+            pk = self.categories.get(row.category.lower())
+            if pk is None:
+                raise ImportRowError(f'Unknown category "{row.category}".')
+            return pk
+        if self.default_category is None:
+            raise ImportRowError('No category given and no default category set.')
+        return self.default_category.pk
+
+    def existing_keys(self, rows):
+        dates = {row.date for row in rows}
+        stored = Transaction.objects.for_user(self.user).filter(account=self.account, date__in=dates)
+        return set(stored.values_list('date', 'amount', 'description'))
+
+    def run(self, lines, file_format='csv'):
+        """Import an iterable of text lines (e.g. an open file); returns an ImportReport."""
+        parser = parse_ofx if file_format == 'ofx' else parse_csv
+        report = ImportReport()
+        started = time.perf_counter()
+        for chunk in chunked(parser(lines), self.chunk_size):
+            self.import_chunk(chunk, report)
+        report.elapsed = time.perf_counter() - started
+        return report
+
+    def import_chunk(self, chunk, report):
+        parsed = []
+        for row in chunk:
+            if isinstance(row, ImportRowError):
+                report.add_error(row.line, str(row))
+                continue
+            try:
+                parsed.append((row, self.category_id(row)))
+            except ImportRowError as e:
+                report.add_error(row.line, str(e))
+        with db_transaction.atomic():
+            seen = self.existing_keys([row for row, _ in parsed]) if self.dedupe else set()
+            new_rows = []
+            for row, category_id in parsed:
+                key = (row.date, row.amount, row.description)
+                if key in seen:
+                    report.duplicates += 1
+                    continue
+                if self.dedupe:
+                    seen.add(key)
+                new_rows.append(Transaction(
+                    user_id=self.user.pk, account=self.account, category_id=category_id, amount=row.amount,
+                    date=row.date, description=row.description, is_income=row.is_income,
+                ))
+            if new_rows:
+                seq = sync.advance(self.user.pk)
+                for txn in new_rows:
+                    txn.change_seq = seq
+            created = Transaction.objects.bulk_create(new_rows)
+            ledger.record_many(added=[ledger.snapshot(txn) for txn in created])
+            rollups.record_many(added=[rollups.snapshot(txn) for txn in created])
+            if created:
+                response_cache.invalidate_user(self.user.pk)
+        report.created += len(created)
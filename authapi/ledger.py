@@ -0,0 +1,92 @@
+"""
+Account balances derived from the transaction ledger.
+
+Account.balance = Account.opening_balance + income - expenses. Every
+transaction write adjusts the owning account with a single
+UPDATE ... SET balance = balance + delta, so concurrent writes to one account
+never lose each other's changes. The record_* helpers must run inside the
+same database transaction as the write they mirror, after it has taken its
+change sequence number (authapi.sync.advance), which the UPDATEs stamp on
+the account along with updated_at.
+"""
+from collections import defaultdict
+from django.db.models import Case, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from . import money, sync
+from .models import Account, Transaction
+
+SIGNED_AMOUNT = Case(
+    When(is_income=True, then=F('amount')),
+    default=-F('amount'),
+    output_field=money.MoneyField(max_digits=12, decimal_places=2),
+)
+
+
+def snapshot(txn):
+    """(account id, signed amount) for a transaction; take it before an update to undo the old values."""
+    return txn.account_id, txn.amount if txn.is_income else -txn.amount
+
+
+def apply_delta(account_id, delta):
+    if delta:
+        Account.objects.filter(pk=account_id).update(balance=F('balance') + money.value(delta), **sync.touched())
+
+
+def record_create(txn):
+    apply_delta(*snapshot(txn))
+
+
+def record_update(before, txn):
+    old_account_id, old_amount = before
+    account_id, amount = snapshot(txn)
+    if account_id == old_account_id:
+        apply_delta(account_id, amount - old_amount)
+    else:
+        apply_delta(old_account_id, -old_amount)
+        apply_delta(account_id, amount)
+
+
+def record_delete(txn):
+    account_id, amount = snapshot(txn)
+    apply_delta(account_id, -amount)
+
+
+def record_many(added=(), removed=()):
+    """Apply many snapshots at once with one UPDATE per affected account."""
+    deltas = defaultdict(int)
+    for account_id, amount in added:
+        deltas[account_id] += amount
+    for account_id, amount in removed:
+        deltas[account_id] -= amount
+    for account_id, delta in deltas.items():
+        apply_delta(account_id, delta)
+
+
+def remove_transactions(queryset):
+    """Take a set of transactions out of their accounts' balances, e.g. before a cascade delete."""
+    per_account = queryset.values('account_id').annotate(total=Sum(SIGNED_AMOUNT)).order_by()
+    for row in per_account:
+        apply_delta(row['account_id'], -row['total'])
+
+
+def ledger_total():
+    """Signed sum of an account's transactions, as a subquery on the outer Account row."""
+    ledger = (
+        Transaction.objects.filter(account=OuterRef('pk'))
+        .values('account')
+        .annotate(total=Sum(SIGNED_AMOUNT))
+        .values('total')
+    )
+    return Coalesce(Subquery(ledger), Value(0), output_field=money.MoneyField(max_digits=12, decimal_places=2))
+
+
+def expected_balances(accounts=None):
+    """Accounts annotated with expected_balance recomputed from opening_balance and the ledger."""
+    accounts = Account.objects.all() if accounts is None else accounts
+    return accounts.annotate(expected_balance=F('opening_balance') + ledger_total())
+
+
+def reconcile(accounts=None):
+    """Recompute balances with a single UPDATE; returns the number of accounts written."""
+    accounts = Account.objects.all() if accounts is None else accounts
+    return accounts.update(balance=F('opening_balance') + ledger_total(), **sync.touched())
@@ -0,0 +1,106 @@
+import asyncio
+import datetime
+import io
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from authapi.management.bench import rate_limits_disabled
+from authapi.models import Account, Category, Transaction
+from authapi.serializers import LoginTokenSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test: requests per second with many concurrent slow clients, for a WSGI worker '
+        'with a fixed thread pool and a single ASGI event loop. Runs the handlers in-process; '
+        'a slow client is simulated by holding the connection for --delay seconds after the response.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', default='8,64,256', help='Comma-separated concurrency levels')
+        parser.add_argument('--requests', type=int, default=4, help='Requests per client')
+        parser.add_argument('--threads', type=int, default=8, help='WSGI worker threads')
+        parser.add_argument('--delay', type=float, default=0.2, help='Seconds each client takes to read a response')
+        parser.add_argument('--path', default='/api/accounts/')
+
+    def handle(self, *args, clients, requests, threads, delay, path, **options):
+        user = User.objects.create_user(f'bench-asgi-{uuid.uuid4().hex[:8]}', password=uuid.uuid4().hex)
+        account = Account.objects.create(user=user, name='Bench', type='cash')
+        category = Category.objects.create(user=user, name='Bench', type='expense')
+        Transaction.objects.bulk_create(
+            Transaction(user=user, account=account, category=category, amount=1,
+                        date=datetime.date(2024, 1, 1) + datetime.timedelta(days=i))
+            for i in range(20)
+        )
+        token = str(LoginTokenSerializer.get_token(user).access_token)
+        self.stdout.write(f'{path}: {requests} requests per client, client read delay {delay}s, '
+                          f'WSGI with {threads} threads vs one ASGI event loop')
+        try:
+            with rate_limits_disabled():
+                for level in [int(n) for n in clients.split(',') if n.strip()]:
+                    wsgi = self.run_wsgi(path, token, level, requests, threads, delay)
+                    with override_settings(ROOT_URLCONF='finalproj.asgi_urls'):
+                        asgi = asyncio.run(self.run_asgi(path, token, level, requests, delay))
+                    self.stdout.write(f'{level:5d} clients   WSGI {wsgi:8.1f} req/s   ASGI {asgi:8.1f} req/s')
+        finally:
+            user.delete()
+
+    def run_wsgi(self, path, token, clients, requests, threads, delay):
+        handler = WSGIHandler()
+        statuses = []
+
+        def request(_):
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+                'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_HOST': 'localhost', 'HTTP_AUTHORIZATION': f'Bearer {token}',
+                'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+            }
+            response = handler(environ, lambda status, headers: statuses.append(status))
+            b''.join(response)
+            response.close()
+            # The worker thread stays busy until the slow client has read everything
+            time.sleep(delay)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(request, range(clients * requests)))
+        return clients * requests / (time.perf_counter() - started)
+
+    async def run_asgi(self, path, token, clients, requests, delay):
+        handler = ASGIHandler()
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+            'headers': [(b'host', b'localhost'), (b'authorization', f'Bearer {token}'.encode())],
+            'server': ('localhost', 80), 'client': ('127.0.0.1', 50000),
+        }
+
+        async def request():
+            messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+            async def receive():
+                if messages:
+                    return messages.pop()
+                await asyncio.Event().wait()  # no disconnect; Django cancels this when done
+
+            async def send(message):
+                if message['type'] == 'http.response.body' and not message.get('more_body'):
+                    # Only this connection waits for the slow client
+                    await asyncio.sleep(delay)
+
+            await handler(dict(scope), receive, send)
+
+        async def client():
+            for _ in range(requests):
+                await request()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(clients)))
+        return clients * requests / (time.perf_counter() - started)
@@ -0,0 +1,65 @@
+import datetime
+import time
+import uuid
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from authapi.authentication import StatelessJWTAuthentication
+from authapi.management.bench import rate_limits_disabled
+from authapi.models import Account, Category, Transaction
+from authapi.serializers import LoginTokenSerializer
+
+PATHS = ('/api/protected/', '/api/accounts/', '/api/transactions/')
+MODES = (
+    ('JWTAuthentication', JWTAuthentication),
+    ('stateless', StatelessJWTAuthentication),
+)
+
+
+class Command(BaseCommand):
+    help = 'Compare requests per second of the database-backed and stateless JWT authentication.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per endpoint and mode')
+        parser.add_argument('--rows', type=int, default=50, help='Transactions created for the bench user')
+
+    def handle(self, *args, requests, rows, **options):
+        # A throwaway user with a little data, removed again at the end
+        user = User.objects.create_user(f'bench-auth-{uuid.uuid4().hex[:8]}', password=uuid.uuid4().hex)
+        account = Account.objects.create(user=user, name='Bench', type='cash')
+        category = Category.objects.create(user=user, name='Bench', type='expense')
+        Transaction.objects.bulk_create(
+            Transaction(user=user, account=account, category=category, amount=1,
+                        date=datetime.date(2024, 1, 1) + datetime.timedelta(days=i % 365))
+            for i in range(rows)
+        )
+        token = LoginTokenSerializer.get_token(user).access_token
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {token}', HTTP_HOST='localhost')
+        self.stdout.write(f'{requests} sequential in-process requests per endpoint and mode')
+        try:
+            with rate_limits_disabled():
+                for path in PATHS:
+                    for label, auth_class in MODES:
+                        with mock.patch.object(APIView, 'authentication_classes', [auth_class]):
+                            self.run(client, path, label, requests)
+        finally:
+            user.delete()
+
+    def run(self, client, path, label, requests):
+        client.get(path)
+        # Counted with a wrapper: each request resets connection.queries
+        executed = []
+        with connection.execute_wrapper(lambda execute, sql, *a: executed.append(sql) or execute(sql, *a)):
+            status = client.get(path).status_code
+        started = time.perf_counter()
+        for _ in range(requests):
+            client.get(path)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{path:<20} {label:<18} {requests / elapsed:8.0f} req/s  '
+            f'{len(executed)} queries/request  (HTTP {status})'
+        )
@@ -0,0 +1,132 @@
+import statistics
+import threading
+import time
+import uuid
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection, connections
+from django.test.utils import override_settings
+from authapi.models import Account, Category
+from authapi.services import TransactionService
+
+
+def profiles(vendor):
+    """(label, PRAGMAs, connection settings) to compare for the configured database."""
+    if vendor == 'sqlite':
+        return [
+            # SQLite's own defaults; journal_mode is stored in the file, so set it back explicitly
+            ('stock', {'journal_mode': 'DELETE', 'synchronous': 'FULL'}, {'CONN_MAX_AGE': 0, 'OPTIONS': {}}),
+            ('optimized', settings.SQLITE_OPTIMIZED_PRAGMAS,
+             {'CONN_MAX_AGE': 600, 'OPTIONS': {'transaction_mode': 'IMMEDIATE'}}),
+        ]
+    options = {key: value for key, value in connections.settings['default']['OPTIONS'].items() if key != 'pool'}
+    result = [
+        ('new connection per request', {}, {'CONN_MAX_AGE': 0, 'OPTIONS': options}),
+        ('persistent', {}, {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True, 'OPTIONS': options}),
+    ]
+    try:
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        pass
+    else:
+        result.append(('pool', {}, {'CONN_MAX_AGE': 0, 'OPTIONS': {**options, 'pool': {'min_size': 2, 'max_size': 8}}}))
+    return result
+
+
+class Command(BaseCommand):
+    help = (
+        'Write-concurrency benchmark for the configured database: concurrent writers creating and '
+        'updating transactions (with their ledger, rollup and sync writes) while readers list them, '
+        'for the stock and the tuned connection profile. Each operation runs like a request, '
+        'opening or reusing its connection the way the request cycle does.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8)
+        parser.add_argument('--readers', type=int, default=2)
+        parser.add_argument('--ops', type=int, default=50, help='Writes per writer')
+
+    def handle(self, *args, writers, readers, ops, **options):
+        vendor = connection.vendor
+        user = User.objects.create_user(f'bench-db-{uuid.uuid4().hex[:8]}', password=uuid.uuid4().hex)
+        account = Account.objects.create(user=user, name='Bench', type='cash')
+        category = Category.objects.create(user=user, name='Bench', type='expense')
+        self.stdout.write(f'{vendor}: {writers} writers x {ops} writes (3 creates : 1 update), {readers} readers')
+        db_settings = connections.settings['default']
+        saved = {key: db_settings.get(key) for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS', 'OPTIONS')}
+        try:
+            for label, pragmas, overrides in profiles(vendor):
+                connections.close_all()
+                db_settings.update(overrides)
+                with override_settings(SQLITE_PRAGMAS=pragmas):
+                    connection.ensure_connection()  # applies the PRAGMAs before the workers connect
+                    connection.close()
+                    self.run(label, user, account, category, writers, readers, ops)
+        finally:
+            connections.close_all()
+            db_settings.update(saved)
+            user.delete()
+
+    def run(self, label, user, account, category, writers, readers, ops):
+        service = TransactionService(user)
+        latencies, errors, done = [], [], threading.Event()
+        lock = threading.Lock()
+
+        def request(func):
+            close_old_connections()
+            started = time.perf_counter()
+            try:
+                func()
+            except OperationalError as e:  # "database is locked"
+                with lock:
+                    errors.append(str(e))
+            else:
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+            finally:
+                close_old_connections()
+
+        def writer(n):
+            last = []
+            create = lambda: last.append(service.create({
+                'account': account.pk, 'category': category.pk, 'amount': '1.00', 'date': '2024-01-01',
+            }).pk)
+            try:
+                for i in range(ops):
+                    if i % 4 == 3 and last:
+                        request(lambda: service.update(last[-1], {'amount': Decimal(n + 2)}, partial=True))
+                    else:
+                        request(create)
+            finally:
+                connection.close()
+
+        def reader():
+            try:
+                while not done.is_set():
+                    close_old_connections()
+                    service.page_data(page_size=20)
+                    time.sleep(0.01)
+            finally:
+                connection.close()
+
+        reader_threads = [threading.Thread(target=reader) for _ in range(readers)]
+        writer_threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+        for thread in reader_threads:
+            thread.start()
+        started = time.perf_counter()
+        for thread in writer_threads:
+            thread.start()
+        for thread in writer_threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        done.set()
+        for thread in reader_threads:
+            thread.join()
+        p50 = statistics.median(latencies) * 1000 if latencies else float('nan')
+        p95 = statistics.quantiles(latencies, n=20)[-1] * 1000 if len(latencies) > 1 else float('nan')
+        self.stdout.write(
+            f'{label:<27} {len(latencies) / elapsed:8.1f} writes/s   p50 {p50:7.1f} ms   p95 {p95:7.1f} ms   '
+            f'{len(errors)} failed ("database is locked")'
+        )
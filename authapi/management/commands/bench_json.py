@@ -0,0 +1,79 @@
+import datetime
+import io
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.utils import timezone
+from django.utils.text import compress_string
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from authapi.management.bench import timed
+from authapi.middleware import CompressionMiddleware, brotli
+from authapi.models import Account, Category, Transaction
+from authapi.renderers import ORJSONParser, ORJSONRenderer, orjson
+from authapi.serializers import TransactionReadSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'JSON benchmark over a transaction list payload: render and parse time with DRF\'s json-based '
+        'classes and the orjson ones, then bytes on the wire and compression time per Content-Encoding. '
+        'Rows are built in memory; nothing is written to the database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, rows, repeat, **options):
+        user = User(pk=1, username='bench')
+        account = Account(pk=1, user=user, name='Everyday checking', type='bank')
+        category = Category(pk=1, user=user, name='Groceries', type='expense')
+        now = timezone.now()
+        transactions = [
+            Transaction(pk=i, user=user, account=account, category=category,
+                        amount=Decimal(i % 50000) / 100, date=datetime.date(2024, 1, 1) + datetime.timedelta(days=i % 366),
+                        description=f'Card payment {i} at Corner Market', is_income=i % 7 == 0,
+                        created_at=now, updated_at=now, change_seq=i)
+            for i in range(1, rows + 1)
+        ]
+        serialize_time, data = timed(lambda: TransactionReadSerializer(transactions, many=True).data, 1)
+        payload = {'next': None, 'results': data}
+        self.stdout.write(f'{rows} transactions; serializers took {serialize_time * 1000:.1f} ms '
+                          f'(the same for both renderers)')
+        if orjson is None:
+            self.stdout.write('orjson is not installed: ORJSONRenderer falls back to the json module')
+
+        self.stdout.write(f'{"":10s} {"render ms":>10s} {"parse ms":>10s}')
+        bodies = []
+        for label, renderer, parser in (('json', JSONRenderer(), JSONParser()),
+                                        ('orjson', ORJSONRenderer(), ORJSONParser())):
+            render_time, body = timed(lambda: renderer.render(payload), repeat)
+            parse_time, parsed = timed(lambda: parser.parse(io.BytesIO(body), parser_context={}), repeat)
+            assert parsed == payload, f'{label} round trip changed the data'
+            bodies.append(body)
+            self.stdout.write(f'{label:10s} {render_time * 1000:10.1f} {parse_time * 1000:10.1f}')
+        assert bodies[0] == bodies[1], 'the renderers disagree'
+
+        middleware = CompressionMiddleware(lambda request: None)
+        self.stdout.write(f'{"encoding":10s} {"bytes":>10s} {"ratio":>7s} {"compress ms":>12s}')
+        self.stdout.write(f'{"identity":10s} {len(body):10d} {1:7.2f} {0:12.1f}')
+        encodings = [('gzip', lambda: compress_string(body, max_random_bytes=middleware.max_random_bytes))]
+        if brotli is not None:
+            quality = getattr(settings, 'BROTLI_QUALITY', 4)
+            encodings.append(('br', lambda: brotli.compress(body, quality=quality)))
+        else:
+            self.stdout.write('br: not available (pip install brotli)')
+        for label, compress in encodings:
+            compress_time, compressed = timed(compress, repeat)
+            self.stdout.write(f'{label:10s} {len(compressed):10d} {len(body) / len(compressed):7.2f} '
+                              f'{compress_time * 1000:12.1f}')
+
+        # Check the negotiated path end to end
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='br;q=1.0, gzip;q=0.8')
+        response = middleware.process_response(request, HttpResponse(body, content_type='application/json'))
+        self.stdout.write(f'Accept-Encoding "br;q=1.0, gzip;q=0.8" -> {response["Content-Encoding"]}, '
+                          f'{len(response.content)} bytes')
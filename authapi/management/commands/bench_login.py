@@ -0,0 +1,91 @@
+import os
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from authapi.management.bench import rate_limits_disabled
+
+MODES = (
+    ('inline', 'django.contrib.auth.backends.ModelBackend'),
+    ('pooled', 'authapi.passwords.PooledModelBackend'),
+)
+
+
+def cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+class Command(BaseCommand):
+    help = 'Measure login throughput per core for each password hasher, inline and on the hashing pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent clients')
+        parser.add_argument('--logins', type=int, default=20, help='Logins per client')
+        parser.add_argument('--hashers', default=settings.PASSWORD_HASHER,
+                            help='Comma-separated algorithms, e.g. pbkdf2_sha256,scrypt,argon2')
+
+    def handle(self, *args, threads, logins, hashers, **options):
+        classes = settings.PASSWORD_HASHER_CLASSES
+        algorithms = [name.strip() for name in hashers.split(',') if name.strip()]
+        unknown = set(algorithms) - set(classes)
+        if unknown:
+            raise CommandError(f"Unknown hasher(s): {', '.join(sorted(unknown))}. Choose from {', '.join(classes)}.")
+        self.stdout.write(f'{cores()} core(s), {threads} clients x {logins} logins; '
+                          f'latency is for /api/protected/ requested during the burst')
+        with rate_limits_disabled():
+            for algorithm in algorithms:
+                ordered = [classes[algorithm]] + [p for name, p in classes.items() if name != algorithm]
+                with override_settings(PASSWORD_HASHERS=ordered):
+                    username, password = f'bench-login-{uuid.uuid4().hex[:8]}', uuid.uuid4().hex
+                    user = User.objects.create_user(username, password=password)
+                    try:
+                        for label, backend in MODES:
+                            with override_settings(AUTHENTICATION_BACKENDS=[backend]):
+                                self.run(algorithm, label, username, password, threads, logins)
+                    finally:
+                        user.delete()
+
+    def run(self, algorithm, label, username, password, threads, logins):
+        def login_many(_):
+            client = Client(HTTP_HOST='localhost')
+            ok = 0
+            for _ in range(logins):
+                ok += client.post('/api/login/', {'username': username, 'password': password}).status_code == 200
+            return ok
+
+        # A cheap authenticated request, timed while the logins run
+        token = Client(HTTP_HOST='localhost').post(
+            '/api/login/', {'username': username, 'password': password}).json()['access']
+        probe = Client(HTTP_AUTHORIZATION=f'Bearer {token}', HTTP_HOST='localhost')
+        latencies, done = [], threading.Event()
+
+        def probe_loop():
+            while not done.is_set():
+                started = time.perf_counter()
+                probe.get('/api/protected/')
+                latencies.append(time.perf_counter() - started)
+                time.sleep(0.01)
+
+        prober = threading.Thread(target=probe_loop)
+        prober.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            ok = sum(pool.map(login_many, range(threads)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        prober.join()
+        rate = ok / elapsed
+        p50 = statistics.median(latencies) * 1000 if latencies else float('nan')
+        self.stdout.write(
+            f'{algorithm:<14} {label:<7} {rate:8.1f} logins/s  {rate / cores():8.1f} logins/s/core  '
+            f'protected p50 {p50:7.1f} ms  ({ok}/{threads * logins} ok)'
+        )
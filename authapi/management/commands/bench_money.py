@@ -0,0 +1,101 @@
+from decimal import Decimal
+from django.apps.registry import Apps
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection, models
+from django.db.models import Sum
+from rest_framework import serializers
+from authapi.management.bench import timed
+from authapi.money import MoneyField
+from authapi.readers import RowReader
+
+
+def bench_model(name, amount_field):
+    """A throwaway model in its own app registry, so it is never part of a migration."""
+    class Meta:
+        app_label = 'authapi'
+        db_table = f'bench_money_{name}'
+        apps = Apps()
+    return type(f'BenchMoney{name.title()}', (models.Model,), {
+        '__module__': __name__,
+        'Meta': Meta,
+        'account': models.IntegerField(),
+        'amount': amount_field,
+    })
+
+
+def table_size(model):
+    """Bytes used by model's table on SQLite (the dbstat virtual table), else None."""
+    if connection.vendor != 'sqlite':
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT SUM(pgsize) FROM dbstat WHERE name = %s', [model._meta.db_table])
+            return cursor.fetchone()[0]
+    except DatabaseError:
+        return None
+
+
+def bench_serializer(model):
+    meta = type('Meta', (), {'model': model, 'fields': ('id', 'account', 'amount')})
+    return type(f'{model.__name__}Serializer', (serializers.ModelSerializer,), {'Meta': meta})
+
+
+class Command(BaseCommand):
+    help = (
+        'Sum() aggregation, fetch, serialization and table size of amounts stored as DecimalField '
+        'and as MoneyField (integer minor units), and whether the sums are exact. Creates two '
+        'scratch tables with --rows rows each and drops them afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, rows, repeat, **options):
+        candidates = [
+            ('decimal', bench_model('decimal', models.DecimalField(max_digits=12, decimal_places=2))),
+            ('cents', bench_model('cents', MoneyField(max_digits=12, decimal_places=2))),
+        ]
+        with connection.schema_editor() as editor:
+            for _, model in candidates:
+                editor.create_model(model)
+        amounts = [Decimal(i % 50000 - 10000) / 100 for i in range(rows)]
+        expected = {}
+        for i, amount in enumerate(amounts):
+            expected[i % 20] = expected.get(i % 20, 0) + amount
+        try:
+            outputs = []
+            self.stdout.write(f'{"":8s} {"sum ms":>7s} {"sum by account ms":>18s} {"fetch ms":>9s} '
+                              f'{"serializer ms":>14s} {"reader ms":>10s} {"table KB":>9s}  exact sums')
+            for name, model in candidates:
+                model.objects.bulk_create(
+                    (model(account=i % 20, amount=amount) for i, amount in enumerate(amounts)), batch_size=1000
+                )
+                outputs.append(self.measure(name, model, repeat, expected))
+            if outputs[0] != outputs[1]:
+                self.stderr.write('DecimalField and MoneyField serialize differently')
+        finally:
+            with connection.schema_editor() as editor:
+                for _, model in candidates:
+                    editor.delete_model(model)
+
+    def measure(self, name, model, repeat, expected):
+        total_time, total = timed(lambda: model.objects.aggregate(total=Sum('amount'))['total'], repeat)
+        grouped_time, grouped = timed(
+            lambda: list(model.objects.values('account').annotate(total=Sum('amount')).order_by('account')), repeat
+        )
+        exact = total == sum(expected.values()) and all(
+            row['total'] == expected[row['account']] and row['total'].as_tuple().exponent == -2 for row in grouped
+        )
+        fetch_time, instances = timed(lambda: list(model.objects.order_by('id')), repeat)
+        serializer_class = bench_serializer(model)
+        serialize_time, data = timed(lambda: serializer_class(instances, many=True).data, repeat)
+        reader = RowReader(serializer_class)
+        read_time, read = timed(lambda: reader.represent(reader.values(model.objects.order_by('id'))), repeat)
+        if read != data:
+            self.stderr.write(f'{name}: the serializer and the reader disagree')
+        size = table_size(model)
+        self.stdout.write(f'{name:8s} {total_time * 1000:7.1f} {grouped_time * 1000:18.1f} {fetch_time * 1000:9.1f} '
+                          f'{serialize_time * 1000:14.1f} {read_time * 1000:10.1f} '
+                          f'{"-" if size is None else f"{size / 1024:.0f}":>9s}  {"yes" if exact else "no"}')
+        return data
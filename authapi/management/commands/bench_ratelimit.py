@@ -0,0 +1,43 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from authapi.ratelimit import SlidingWindowRateLimiter
+
+
+def legacy_hit(cache, key, limit, period):
+    # The old get/set decorator body, for comparison
+    count = cache.get(key, 0)
+    if count >= limit:
+        return False
+    cache.set(key, count + 1, timeout=period)
+    return True
+
+
+class Command(BaseCommand):
+    help = 'Measure rate limiter overhead per request under multi-threaded load.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--hits', type=int, default=5000, help='Hits per thread')
+        parser.add_argument('--limit', type=int, default=1000)
+        parser.add_argument('--cache', default=None, help='Cache alias (default: RATE_LIMIT_CACHE)')
+
+    def handle(self, *args, threads, hits, limit, cache, **options):
+        limiter = SlidingWindowRateLimiter(limit, period=3600, cache_alias=cache)
+        backend = limiter.cache
+        self.stdout.write(f'backend={type(backend).__name__} threads={threads} hits/thread={hits} limit={limit}')
+
+        def run(label, hit):
+            backend.clear()
+            started = time.perf_counter()
+            with ThreadPoolExecutor(threads) as pool:
+                allowed = sum(pool.map(lambda _: sum(hit() for _ in range(hits)), range(threads)))
+            elapsed = time.perf_counter() - started
+            total = threads * hits
+            self.stdout.write(
+                f'{label:<16} {elapsed * 1e6 / total:8.2f} us/hit  '
+                f'{total / elapsed:10.0f} hits/s  allowed={allowed} (limit {limit})'
+            )
+
+        run('legacy get/set', lambda: legacy_hit(backend, 'bench:legacy', limit, 3600))
+        run('sliding window', lambda: limiter.hit('bench:sliding').allowed)
@@ -0,0 +1,59 @@
+import datetime
+import uuid
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from authapi.management.bench import timed
+from authapi.models import Account, Category, Transaction
+from authapi.services import AccountService, TransactionService
+
+
+class Command(BaseCommand):
+    help = (
+        'Per-row cost of listing through the ModelSerializer (model instances, then to_representation) '
+        'and through the values() read path (authapi.readers), split into fetch and format time. '
+        'Creates a throwaway user with --rows transactions and deletes it afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, rows, repeat, **options):
+        user = User.objects.create_user(f'bench-ser-{uuid.uuid4().hex[:8]}', password=uuid.uuid4().hex)
+        try:
+            accounts = Account.objects.bulk_create(
+                Account(user=user, name=f'Account {i}', type='bank', balance=Decimal('1234.56')) for i in range(20)
+            )
+            category = Category.objects.create(user=user, name='Groceries', type='expense')
+            Transaction.objects.bulk_create(
+                (Transaction(user=user, account=accounts[i % len(accounts)], category=category,
+                             amount=Decimal(i % 50000) / 100, description=f'Card payment {i}',
+                             date=datetime.date(2024, 1, 1) + datetime.timedelta(days=i % 366))
+                 for i in range(rows)),
+                batch_size=1000,
+            )
+            self.stdout.write(f'{"":30s} {"rows":>6s} {"fetch us/row":>13s} {"format us/row":>14s} {"total ms":>9s}')
+            for service in (TransactionService(user), AccountService(user)):
+                self.compare(service, repeat)
+        finally:
+            user.delete()
+
+    def compare(self, service, repeat):
+        name = service.model._meta.verbose_name_plural
+        ordering = service.get_ordering()
+        fetch, instances = timed(lambda: list(service.get_list_queryset().order_by(*ordering)), repeat)
+        count = len(instances)
+        serialize, expected = timed(lambda: service.get_read_serializer(instances, many=True).data, repeat)
+        self.report(f'{name}: serializer', count, fetch, serialize)
+        reader = service.get_reader()
+        fetch, values = timed(lambda: list(service.list_values()), repeat)
+        represent, actual = timed(lambda: reader.represent(values), repeat)
+        self.report(f'{name}: values() reader', count, fetch, represent)
+        if actual != expected:
+            self.stderr.write(f'{name}: the two paths disagree')
+
+    def report(self, label, count, fetch, format_time):
+        per_row = 1e6 / max(count, 1)
+        self.stdout.write(f'{label:30s} {count:6d} {fetch * per_row:13.1f} {format_time * per_row:14.1f} '
+                          f'{(fetch + format_time) * 1000:9.1f}')
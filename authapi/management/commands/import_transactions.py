@@ -0,0 +1,38 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from authapi.importers import FORMATS, TransactionImporter
+from authapi.models import Account, Category
+
+
+class Command(BaseCommand):
+    help = 'Stream a CSV or OFX bank statement into one account.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--user', required=True, help='Username owning the account')
+        parser.add_argument('--account', type=int, required=True, help='Account id')
+        parser.add_argument('--category', type=int, help='Default category id for rows without a category')
+        parser.add_argument('--format', choices=FORMATS, help='Default: from the file extension')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--no-dedupe', action='store_true',
+                            help='Do not skip rows matching an existing (account, date, amount, description)')
+
+    def handle(self, *args, path, user, account, category, format, chunk_size, no_dedupe, **options):
+        try:
+            user = User.objects.get(username=user)
+            account = Account.objects.for_user(user).get(pk=account)
+            category = Category.objects.for_user(user).get(pk=category) if category else None
+        except (User.DoesNotExist, Account.DoesNotExist, Category.DoesNotExist) as e:
+            raise CommandError(str(e))
+        file_format = format or path.rsplit('.', 1)[-1].lower()
+        if file_format not in FORMATS:
+            raise CommandError('Cannot tell the file format from its name; pass --format.')
+        importer = TransactionImporter(user, account, category, chunk_size=chunk_size, dedupe=not no_dedupe)
+        with open(path, encoding='utf-8-sig', errors='replace', newline='') as lines:
+            report = importer.run(lines, file_format)
+        for error in report.errors:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {report.created} row(s), skipped {report.duplicates} duplicate(s), '
+            f'{report.error_count} error(s) in {report.elapsed:.2f}s ({report.rows_per_second} rows/s).'
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from authapi.models import UserProfile
+from authapi.photos import process_profile_photo
+
+
+class Command(BaseCommand):
+    help = 'Verify, strip and thumbnail profile photos that are still pending (e.g. after a worker restart).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Reprocess every profile photo')
+
+    def handle(self, *args, all=False, **options):
+        profiles = UserProfile.objects.exclude(photo='').exclude(photo=None)
+        if not all:
+            profiles = profiles.filter(photo_status=UserProfile.PHOTO_PENDING)
+        processed = 0
+        for pk in profiles.values_list('pk', flat=True).iterator():
+            process_profile_photo(pk)
+            processed += 1
+        failed = UserProfile.objects.filter(photo_status=UserProfile.PHOTO_FAILED).count()
+        self.stdout.write(f'Processed {processed} photo(s); {failed} profile(s) have a rejected photo.')
@@ -0,0 +1,16 @@
+import datetime
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from authapi import sync
+
+
+class Command(BaseCommand):
+    help = 'Delete sync tombstones older than --days. Clients with older sync tokens must sync again from scratch.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 90))
+
+    def handle(self, *args, days, **options):
+        count = sync.prune(timezone.now() - datetime.timedelta(days=days))
+        self.stdout.write(self.style.SUCCESS(f'Pruned {count} tombstone(s) older than {days} day(s).'))
@@ -0,0 +1,31 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from authapi import rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild MonthlyRollup from the Transaction table, or check it with --verify.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only this username')
+        parser.add_argument('--verify', action='store_true',
+                            help='Compare rollups with the Transaction table without changing anything')
+
+    def handle(self, *args, user=None, verify=False, **options):
+        if user is not None:
+            try:
+                user = User.objects.get(username=user)
+            except User.DoesNotExist:
+                raise CommandError(f'User "{user}" does not exist.')
+        if verify:
+            mismatches = rollups.verify(user)
+            for key, (expected, stored) in sorted(mismatches.items(), key=str):
+                self.stdout.write(f'{dict(zip(rollups.ROLLUP_KEY_FIELDS, key))}: expected {expected}, stored {stored}')
+            if mismatches:
+                raise CommandError(f'{len(mismatches)} rollup row(s) differ from the Transaction table.')
+            self.stdout.write(self.style.SUCCESS('Rollups match the Transaction table.'))
+            return
+        with transaction.atomic():
+            count = rollups.rebuild(user)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} rollup row(s).'))
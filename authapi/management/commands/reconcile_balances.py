@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from authapi import ledger, response_cache, sync
+from authapi.models import Account
+
+
+class Command(BaseCommand):
+    help = 'Recompute Account.balance from opening_balance and the transaction ledger.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only report accounts whose balance has drifted')
+
+    def handle(self, *args, check=False, **options):
+        drifted = ledger.expected_balances().exclude(balance=F('expected_balance'))
+        for account in drifted.only('id', 'name', 'balance'):
+            self.stdout.write(f'Account {account.id} ({account.name}): stored {account.balance}, '
+                              f'expected {account.expected_balance}')
+        count = drifted.count()
+        if check:
+            if count:
+                raise CommandError(f'{count} account balance(s) differ from the ledger.')
+            self.stdout.write(self.style.SUCCESS('All account balances match the ledger.'))
+            return
+        with transaction.atomic():
+            user_ids = set(drifted.values_list('user_id', flat=True))
+            for user_id in user_ids:
+                sync.advance(user_id)
+            ledger.reconcile(Account.objects.filter(pk__in=drifted.values('pk')))
+            for user_id in user_ids:
+                response_cache.invalidate_user(user_id)
+        self.stdout.write(self.style.SUCCESS(f'Reconciled {count} account balance(s).'))
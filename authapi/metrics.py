@@ -0,0 +1,169 @@
+"""
+In-process request metrics, exposed in the Prometheus text format at /api/metrics/.
+
+InstrumentationMiddleware starts a RequestStats for every request in a
+context variable. The query wrapper that authapi.db installs on each database
+connection adds every query's time to it, including queries the async views
+run in worker threads. TimedSerializerMixin adds the time serializers spend
+in to_representation. When the response is ready the middleware records, per
+URL name, the wall time, query count, DB time, serializer time and response
+size.
+
+Each metric is a log-linear Histogram in the style of HdrHistogram: bounded
+memory and about 6% relative error. It is exported as a summary with
+quantiles. The numbers are per process; scrape every worker.
+"""
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from django.conf import settings
+
+logger = logging.getLogger('authapi.slow_queries')
+
+current = ContextVar('authapi_request_stats', default=None)
+
+
+class Histogram:
+    """
+    Counts non-negative integers. Values below 2 * SUB_BUCKETS are counted
+    exactly. Larger values share a bucket with the values that agree in
+    their top SUB_BUCKET_BITS + 1 bits, i.e. each power of two is split into
+    SUB_BUCKETS equal buckets.
+    """
+    SUB_BUCKET_BITS = 4
+    SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+    def __init__(self):
+        self.buckets = Counter()
+        self.count = 0
+        self.total = 0
+
+    @classmethod
+    def bucket(cls, value):
+        shift = value.bit_length() - cls.SUB_BUCKET_BITS - 1
+        if shift <= 0:
+            return value
+        return shift * cls.SUB_BUCKETS + (value >> shift)
+
+    @classmethod
+    def bucket_range(cls, index):
+        """[low, high) of the values counted in bucket `index`."""
+        if index < 2 * cls.SUB_BUCKETS:
+            return index, index + 1
+        shift, mantissa = index // cls.SUB_BUCKETS - 1, index % cls.SUB_BUCKETS + cls.SUB_BUCKETS
+        return mantissa << shift, (mantissa + 1) << shift
+
+    def record(self, value):
+        value = max(int(value), 0)
+        self.buckets[self.bucket(value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q):
+        """Midpoint of the bucket holding the q-th quantile, or 0 if empty."""
+        rank, seen = q * self.count, 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                low, high = self.bucket_range(index)
+                return (low + high - 1) / 2
+        return 0
+
+
+# name, HELP text, scale from the recorded integer unit to the exported one
+METRICS = (
+    ('request_duration_seconds', 'Request wall time', 1e-6),
+    ('db_queries', 'Database queries per request', 1),
+    ('db_duration_seconds', 'Time spent in database queries per request', 1e-6),
+    ('serializer_duration_seconds', 'Time spent in serializers per request', 1e-6),
+    ('response_size_bytes', 'Response body size (not recorded for streaming responses)', 1),
+)
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.histograms = defaultdict(Histogram)
+        self.requests = Counter()
+
+    def record(self, endpoint, method, status, values):
+        """values: {metric name: integer in its recorded unit}."""
+        with self.lock:
+            self.requests[endpoint, method, status] += 1
+            for name, value in values.items():
+                self.histograms[name, endpoint].record(value)
+
+    def render(self):
+        with self.lock:
+            lines = [
+                '# HELP authapi_requests_total Requests by endpoint, method and status.',
+                '# TYPE authapi_requests_total counter',
+            ]
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                labels = f'endpoint="{escape(endpoint)}",method="{method}",status="{status}"'
+                lines.append(f'authapi_requests_total{{{labels}}} {count}')
+            for name, help_text, scale in METRICS:
+                lines += [f'# HELP authapi_{name} {help_text}.', f'# TYPE authapi_{name} summary']
+                for (metric, endpoint), histogram in sorted(self.histograms.items()):
+                    if metric != name:
+                        continue
+                    label = f'endpoint="{escape(endpoint)}"'
+                    for q in QUANTILES:
+                        lines.append(f'authapi_{name}{{{label},quantile="{q}"}} {histogram.quantile(q) * scale:g}')
+                    lines.append(f'authapi_{name}_sum{{{label}}} {histogram.total * scale:g}')
+                    lines.append(f'authapi_{name}_count{{{label}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Registry()
+
+
+class RequestStats:
+    __slots__ = ('request', 'queries', 'db_time', 'serializer_time', 'serializing')
+
+    def __init__(self, request):
+        self.request = request
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+
+    @property
+    def endpoint(self):
+        """URL name of the matched route, e.g. account-list or accounts_list."""
+        match = getattr(self.request, 'resolver_match', None)
+        if match is None:
+            return 'unmatched'
+        return match.view_name or match._func_path
+
+
+def view_of(stats):
+    if stats is None:
+        return '-'
+    match = getattr(stats.request, 'resolver_match', None)
+    return f'{stats.endpoint} ({match._func_path})' if match else stats.endpoint
+
+
+def query_wrapper(execute, sql, params, many, context):
+    """Connection execute wrapper: counts the query for the current request and logs it if slow."""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        stats = current.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += elapsed
+        if elapsed * 1000 >= getattr(settings, 'SLOW_QUERY_MS', 200):
+            logger.warning('Slow query (%.1f ms) in %s: %s', elapsed * 1000, view_of(stats), sql)
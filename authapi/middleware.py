@@ -0,0 +1,170 @@
+import re
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_sequence, compress_string
+from . import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class InstrumentationMiddleware:
+    """
+    Records per-endpoint wall time, DB queries and time, serializer time and
+    response size in authapi.metrics. Works under WSGI and ASGI; list it first
+    in MIDDLEWARE so the wall time covers the other middleware too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = metrics.RequestStats(request)
+        token = metrics.current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.current.reset(token)
+        self.record(stats, response, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        stats = metrics.RequestStats(request)
+        token = metrics.current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.current.reset(token)
+        self.record(stats, response, time.perf_counter() - started)
+        return response
+
+    def record(self, stats, response, elapsed):
+        values = {
+            'request_duration_seconds': elapsed * 1e6,
+            'db_queries': stats.queries,
+            'db_duration_seconds': stats.db_time * 1e6,
+            'serializer_duration_seconds': stats.serializer_time * 1e6,
+        }
+        if not response.streaming:
+            values['response_size_bytes'] = len(response.content)
+        metrics.registry.record(stats.endpoint, stats.request.method, response.status_code, values)
+
+
+def accepted_encodings(header):
+    """{coding: q} from an Accept-Encoding header; '*' stands for any coding not listed."""
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        match = re.search(r'\bq=([^;\s]*)', params)
+        try:
+            q = float(match.group(1)) if match else 1.0
+        except ValueError:
+            q = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def brotli_sequence(sequence, quality):
+    compressor = brotli.Compressor(quality=quality)
+    for chunk in sequence:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def abrotli_sequence(sequence, quality):
+    compressor = brotli.Compressor(quality=quality)
+    async for chunk in sequence:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def agzip_sequence(sequence, max_random_bytes):
+    # compress_sequence() takes a sync iterable; compress each chunk as GZipMiddleware does
+    async for chunk in sequence:
+        yield compress_string(chunk, max_random_bytes=max_random_bytes)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compresses text responses (JSON, NDJSON, CSV, HTML) with brotli or gzip,
+    whichever the client's Accept-Encoding prefers; brotli needs the brotli
+    package (pip install brotli). Bodies smaller than COMPRESSION_MIN_SIZE
+    bytes are sent as they are: the saving would not pay for the CPU time.
+    Streaming responses are compressed chunk by chunk. List it right after
+    InstrumentationMiddleware, so response sizes are recorded as sent.
+
+    Like Django's GZipMiddleware it sets Vary: Accept-Encoding, weakens a
+    strong ETag, and adds random bytes to the gzip header against BREACH.
+    """
+    COMPRESSIBLE = ('text/', 'application/json', 'application/x-ndjson', 'application/javascript',
+                    'application/xml', 'image/svg+xml')
+    max_random_bytes = 100
+
+    def choose_encoding(self, request):
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        available = ('br', 'gzip') if brotli is not None else ('gzip',)
+        best, best_q = None, 0.0
+        for coding in available:
+            q = accepted.get(coding, accepted.get('*', 0.0))
+            if q > best_q:
+                best, best_q = coding, q
+        return best
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        if not response.get('Content-Type', '').startswith(self.COMPRESSIBLE):
+            return response
+        if not response.streaming and len(response.content) < getattr(settings, 'COMPRESSION_MIN_SIZE', 1024):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        coding = self.choose_encoding(request)
+        if coding is None:
+            return response
+        quality = getattr(settings, 'BROTLI_QUALITY', 4)
+        if response.streaming:
+            if response.is_async:
+                content = response.streaming_content
+                response.streaming_content = (
+                    abrotli_sequence(content, quality) if coding == 'br'
+                    else agzip_sequence(content, self.max_random_bytes)
+                )
+            elif coding == 'br':
+                response.streaming_content = brotli_sequence(response.streaming_content, quality)
+            else:
+                response.streaming_content = compress_sequence(
+                    response.streaming_content, max_random_bytes=self.max_random_bytes
+                )
+            del response.headers['Content-Length']
+        else:
+            if coding == 'br':
+                compressed = brotli.compress(response.content, quality=quality)
+            else:
+                compressed = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = coding
+        return response
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def build_rollups(apps, schema_editor):
+    Transaction = apps.get_model('authapi', 'Transaction')
+    MonthlyRollup = apps.get_model('authapi', 'MonthlyRollup')
+    rows = (
+        Transaction.objects.annotate(month=TruncMonth('date'))
+        .values('user_id', 'account_id', 'category_id', 'month', 'is_income')
+        .annotate(total=Sum('amount'), count=Count('id'))
+    )
+    MonthlyRollup.objects.bulk_create([
+        MonthlyRollup(
+            user_id=row['user_id'], account_id=row['account_id'], category_id=row['category_id'],
+            month=row['month'], is_income=row['is_income'],
+            total_amount=row['total'], transaction_count=row['count'],
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapi', '0004_finance_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('is_income', models.BooleanField()),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('transaction_count', models.IntegerField(default=0)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='authapi.account')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='authapi.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'month', 'account', 'category', 'is_income'), name='monthly_rollup_unique_key')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
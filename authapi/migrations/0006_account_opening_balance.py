@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:27
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def derive_opening_balances(apps, schema_editor):
+    # Keep today's balances: opening_balance = balance - (income - expenses)
+    Account = apps.get_model('authapi', 'Account')
+    Transaction = apps.get_model('authapi', 'Transaction')
+    for account in Account.objects.all():
+        rows = Transaction.objects.filter(account=account)
+        income = rows.filter(is_income=True).aggregate(total=Sum('amount'))['total'] or 0
+        expenses = rows.filter(is_income=False).aggregate(total=Sum('amount'))['total'] or 0
+        account.opening_balance = account.balance - income + expenses
+        account.save(update_fields=['opening_balance'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapi', '0005_monthlyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='opening_balance',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(derive_opening_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:47
+
+from django.db import migrations, models
+
+
+def mark_existing_photos_pending(apps, schema_editor):
+    # Photos uploaded before background processing; run manage.py process_photos
+    UserProfile = apps.get_model('authapi', 'UserProfile')
+    UserProfile.objects.exclude(photo='').exclude(photo=None).update(photo_status='pending')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapi', '0006_account_opening_balance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='photo_status',
+            field=models.CharField(blank=True, choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='', max_length=10),
+        ),
+        migrations.RunPython(mark_existing_photos_pending, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+from authapi import search
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapi', '0009_sync_feed'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'amount'], name='txn_user_amount_idx'),
+        ),
+        # FTS5 table and triggers on SQLite, a GIN index on PostgreSQL
+        migrations.RunPython(search.install, search.uninstall),
+    ]
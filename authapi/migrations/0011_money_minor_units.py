@@ -0,0 +1,118 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:39
+
+import authapi.money
+from django.db import migrations, models
+
+from authapi import search
+
+# Unapplying restores the decimal columns for code from before MoneyField, which
+# is the only code that reads them correctly: MoneyField would take them as cents.
+
+# (table, column) of every money column; the old decimal column is kept as <column>_decimal until copied
+MONEY_COLUMNS = [
+    ('authapi_account', 'opening_balance'),
+    ('authapi_account', 'balance'),
+    ('authapi_monthlyrollup', 'total_amount'),
+    ('authapi_transaction', 'amount'),
+]
+
+
+def to_minor_units(apps, schema_editor):
+    quote = schema_editor.quote_name
+    for table, column in MONEY_COLUMNS:
+        schema_editor.execute(
+            f'UPDATE {quote(table)} SET {quote(column)} = CAST(ROUND({quote(column + "_decimal")} * 100) AS BIGINT)'
+        )
+
+
+def to_decimal(apps, schema_editor):
+    quote = schema_editor.quote_name
+    for table, column in MONEY_COLUMNS:
+        schema_editor.execute(f'UPDATE {quote(table)} SET {quote(column + "_decimal")} = {quote(column)} / 100.0')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapi', '0010_transaction_search'),
+    ]
+
+    operations = [
+        # Rebuilding authapi_transaction on SQLite drops the search triggers: put them
+        # back after the last rebuild, here when unapplying and at the end when applying
+        migrations.RunPython(migrations.RunPython.noop, search.install),
+        # SQLite cannot drop a column that is in an index
+        migrations.RemoveIndex(
+            model_name='transaction',
+            name='txn_user_amount_idx',
+        ),
+        migrations.RenameField(
+            model_name='account',
+            old_name='opening_balance',
+            new_name='opening_balance_decimal',
+        ),
+        migrations.RenameField(
+            model_name='account',
+            old_name='balance',
+            new_name='balance_decimal',
+        ),
+        migrations.RenameField(
+            model_name='monthlyrollup',
+            old_name='total_amount',
+            new_name='total_amount_decimal',
+        ),
+        migrations.RenameField(
+            model_name='transaction',
+            old_name='amount',
+            new_name='amount_decimal',
+        ),
+        # Nullable so that unapplying can add the column back to a table with rows
+        migrations.AlterField(
+            model_name='transaction',
+            name='amount_decimal',
+            field=models.DecimalField(decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='account',
+            name='opening_balance',
+            field=authapi.money.MoneyField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='account',
+            name='balance',
+            field=authapi.money.MoneyField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='monthlyrollup',
+            name='total_amount',
+            field=authapi.money.MoneyField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='amount',
+            field=authapi.money.MoneyField(decimal_places=2, default=0, max_digits=12),
+            preserve_default=False,
+        ),
+        migrations.RunPython(to_minor_units, to_decimal),
+        migrations.RemoveField(
+            model_name='account',
+            name='opening_balance_decimal',
+        ),
+        migrations.RemoveField(
+            model_name='account',
+            name='balance_decimal',
+        ),
+        migrations.RemoveField(
+            model_name='monthlyrollup',
+            name='total_amount_decimal',
+        ),
+        migrations.RemoveField(
+            model_name='transaction',
+            name='amount_decimal',
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'amount'], name='txn_user_amount_idx'),
+        ),
+        migrations.RunPython(search.install, migrations.RunPython.noop),
+    ]
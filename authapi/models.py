@@ -2,11 +2,17 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.conf import settings
 from django.core.validators import FileExtensionValidator
+from .money import MoneyField
 
 # No custom models needed. Using Django's default User model for authentication.
 
 # Create your models here.
 
+class UserScopedQuerySet(models.QuerySet):
+    def for_user(self, user):
+        # By id, so a stateless token user (authapi.authentication.ClaimsUser) works too
+        return self.filter(user_id=user.pk)
+
 class Account(models.Model):
     ACCOUNT_TYPES = [
         ('cash', 'Cash'),
@@ -17,9 +23,22 @@ class Account(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
     type = models.CharField(max_length=20, choices=ACCOUNT_TYPES)
-    balance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # balance = opening_balance + income - expenses, kept in step by authapi.ledger
+    opening_balance = MoneyField(max_digits=12, decimal_places=2, default=0)
+    balance = MoneyField(max_digits=12, decimal_places=2, default=0)
     institution = models.CharField(max_length=100, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # The user's change sequence number at the last write; see authapi.sync
+    change_seq = models.BigIntegerField(default=0)
+
+    objects = UserScopedQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'type'], name='account_user_type_idx'),
+            models.Index(fields=['user', 'change_seq'], name='account_user_seq_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.get_type_display()})"
@@ -35,6 +54,17 @@ class Category(models.Model):
     description = models.TextField(blank=True)
     color = models.CharField(max_length=7, default="#ffffff")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # The user's change sequence number at the last write; see authapi.sync
+    change_seq = models.BigIntegerField(default=0)
+
+    objects = UserScopedQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'type'], name='category_user_type_idx'),
+            models.Index(fields=['user', 'change_seq'], name='category_user_seq_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.get_type_display()})"
@@ -43,16 +73,102 @@ class Transaction(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     account = models.ForeignKey(Account, on_delete=models.CASCADE)
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
-    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    amount = MoneyField(max_digits=12, decimal_places=2)
     date = models.DateField()
     description = models.TextField(blank=True)
     is_income = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # The user's change sequence number at the last write; see authapi.sync
+    change_seq = models.BigIntegerField(default=0)
+
+    objects = UserScopedQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date'], name='txn_user_date_idx'),
+            models.Index(fields=['user', 'account', 'date'], name='txn_user_account_date_idx'),
+            models.Index(fields=['user', 'category', 'date'], name='txn_user_category_date_idx'),
+            models.Index(fields=['user', 'change_seq'], name='txn_user_seq_idx'),
+            models.Index(fields=['user', 'amount'], name='txn_user_amount_idx'),
+        ]
 
     def __str__(self):
         return f"{self.date}: {self.amount} ({'Income' if self.is_income else 'Expense'})"
 
+class SyncCounter(models.Model):
+    """
+    Per-user change sequence for the delta-sync feed (authapi.sync). Every
+    write takes the next value and stamps it on the rows and tombstones it
+    touches. pruned_through is the highest sequence number whose tombstones
+    have been pruned; sync tokens at or below it have expired.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
+    value = models.BigIntegerField(default=0)
+    pruned_through = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Sync counter of user {self.user_id}: {self.value}"
+
+class Tombstone(models.Model):
+    """A deleted account, category or transaction, kept so sync clients can drop it too."""
+    MODEL_NAMES = [
+        ('account', 'Account'),
+        ('category', 'Category'),
+        ('transaction', 'Transaction'),
+    ]
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    model_name = models.CharField(max_length=20, choices=MODEL_NAMES)
+    object_id = models.BigIntegerField()
+    change_seq = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    objects = UserScopedQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'change_seq'], name='tombstone_user_seq_idx'),
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"Deleted {self.model_name} {self.object_id}"
+
+class MonthlyRollup(models.Model):
+    """
+    Per-user monthly transaction totals, maintained incrementally by
+    authapi.rollups on every transaction write. Rebuild with
+    `manage.py rebuild_rollups`.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    account = models.ForeignKey(Account, on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    month = models.DateField(help_text='First day of the month')
+    is_income = models.BooleanField()
+    total_amount = MoneyField(max_digits=14, decimal_places=2, default=0)
+    transaction_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'month', 'account', 'category', 'is_income'],
+                name='monthly_rollup_unique_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m}: {self.total_amount} ({self.transaction_count})"
+
 class UserProfile(models.Model):
+    PHOTO_PENDING = 'pending'
+    PHOTO_READY = 'ready'
+    PHOTO_FAILED = 'failed'
+    PHOTO_STATUSES = [
+        (PHOTO_PENDING, 'Pending'),
+        (PHOTO_READY, 'Ready'),
+        (PHOTO_FAILED, 'Failed'),
+    ]
+
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     photo = models.ImageField(
         upload_to='user_photos/',
@@ -60,6 +176,15 @@ class UserProfile(models.Model):
         null=True,
         validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'webp'])]
     )
+    # Set by authapi.photos once the upload has been verified and thumbnailed
+    photo_status = models.CharField(max_length=10, choices=PHOTO_STATUSES, blank=True, default='')
 
     def __str__(self):
         return f"Profile of {self.user.username}"
+
+    def thumbnail_url(self, size):
+        """URL of the size x size WebP thumbnail, or None until processing has finished."""
+        from .photos import thumbnail_name
+        if self.photo_status != self.PHOTO_READY or not self.photo:
+            return None
+        return self.photo.storage.url(thumbnail_name(self.photo.name, size))
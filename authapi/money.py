@@ -0,0 +1,49 @@
+"""
+Money stored as a whole number of minor units (cents).
+
+MoneyField is a DecimalField whose column is a BIGINT holding the amount
+times 10 ** decimal_places. Python code, forms, serializers and the API see
+the same Decimal values as before: values are scaled on the way into and
+out of the database, and DRF maps the field to a serializers.DecimalField
+with the same max_digits and decimal_places.
+
+Integers are exact in every backend. SQLite has no decimal type and keeps a
+DecimalField as a float, so SUM() over one adds floats and the result is
+rounded back to cents in Python. Over a MoneyField the database adds
+integers, and each value read back costs one Decimal scale instead of a
+float to Decimal conversion.
+
+Arithmetic in SQL must stay in minor units. A plain Decimal in an F()
+expression, as in F('balance') + delta, is sent as a decimal, not as cents;
+wrap it with value() first.
+"""
+import decimal
+from django.db import models
+from django.db.models import Value
+
+
+class MoneyField(models.DecimalField):
+    description = 'Decimal number stored as an integer number of minor units'
+
+    def get_internal_type(self):
+        # The column type, and which backend converters apply: those of an integer
+        return 'BigIntegerField'
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        # SUM() of a bigint is a numeric on PostgreSQL, AVG() a float on SQLite
+        value = decimal.Decimal(value) if isinstance(value, int) else decimal.Decimal(str(value))
+        return value.scaleb(-self.decimal_places)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if not prepared:
+            value = self.get_prep_value(value)
+        if value is None or hasattr(value, 'as_sql'):
+            return value
+        return int(value.scaleb(self.decimal_places).to_integral_value(rounding=decimal.ROUND_HALF_EVEN))
+
+
+def value(amount, decimal_places=2):
+    """amount (a Decimal or int) as an expression in minor units, for F() arithmetic on a MoneyField."""
+    return Value(amount, output_field=MoneyField(max_digits=20, decimal_places=decimal_places))
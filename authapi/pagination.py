@@ -0,0 +1,195 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are selected with a WHERE clause on the ordering columns instead of an
+OFFSET, so fetching a deep page costs the same as fetching the first one.
+The cursor is an opaque base64 token holding the ordering values of the row
+the page starts after: the last row of the previous page. A "previous"
+cursor holds the first row of a page and selects the rows before it, read in
+reverse order and turned back round.
+"""
+import base64
+import binascii
+import json
+from types import SimpleNamespace
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def get_page_size(params, default=None):
+    """Read ?page_size= from a QueryDict, falling back to PAGE_SIZE and capping at MAX_PAGE_SIZE."""
+    default = default or api_settings.PAGE_SIZE or DEFAULT_PAGE_SIZE
+    try:
+        page_size = int(params.get('page_size', default))
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def _ordering_fields(ordering):
+    return [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+
+
+def reverse_ordering(ordering):
+    return tuple(name[1:] if name.startswith('-') else f'-{name}' for name in ordering)
+
+
+def encode_cursor(obj, ordering, model=None, before=False):
+    """
+    Cursor after obj (before it if `before`): a model instance or, given its
+    model, a values() row.
+    """
+    model = model or type(obj)
+    names = [name for name, _ in _ordering_fields(ordering)]
+    fields = [model._meta.get_field(name) for name in names]
+    if isinstance(obj, dict):
+        obj = SimpleNamespace(**{field.attname: obj[name] for field, name in zip(fields, names)})
+    values = [field.value_to_string(obj) for field in fields]
+    payload = {'before': values} if before else values
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, ordering):
+    """(ordering values, whether the cursor selects the rows before them). Raises InvalidCursor."""
+    fields = [model._meta.get_field(name) for name, _ in _ordering_fields(ordering)]
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+        before = isinstance(values, dict) and list(values) == ['before']
+        if before:
+            values = values['before']
+        if not isinstance(values, list) or len(values) != len(fields):
+            raise InvalidCursor(cursor)
+        values = [field.to_python(value) for field, value in zip(fields, values)]
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError, DjangoValidationError):
+        raise InvalidCursor(cursor)
+    # The ordering columns are not nullable; the ORM cannot compare with None
+    if any(value is None for value in values):
+        raise InvalidCursor(cursor)
+    return values, before
+
+
+def keyset_filter(ordering, values):
+    """
+    Build the "row comes after the cursor" predicate for a multi-column ordering:
+    (a > x) OR (a = x AND b > y) ..., with < for descending columns.
+    """
+    fields = _ordering_fields(ordering)
+    condition = Q()
+    for i, (name, descending) in enumerate(fields):
+        step = Q(**{f'{name}__{"lt" if descending else "gt"}': values[i]})
+        for j in range(i):
+            step &= Q(**{fields[j][0]: values[j]})
+        condition |= step
+    # Redundant bound on the leading column so the database can range-scan its index.
+    name, descending = fields[0]
+    return Q(**{f'{name}__{"lte" if descending else "gte"}': values[0]}) & condition
+
+
+def keyset_queryset(queryset, ordering, cursor=None):
+    """
+    (queryset, backwards): the rows after the cursor, or for a previous cursor
+    the rows before it in reverse order (backwards=True). Raises InvalidCursor.
+    """
+    if not cursor:
+        return queryset.order_by(*ordering), False
+    values, before = decode_cursor(cursor, queryset.model, ordering)
+    if before:
+        ordering = reverse_ordering(ordering)
+    return queryset.order_by(*ordering).filter(keyset_filter(ordering, values)), before
+
+
+def split_page(rows, ordering, page_size, model=None, cursor=None, backwards=False):
+    """
+    Trim the extra look-ahead row fetched past page_size and return
+    (rows, next_cursor, previous_cursor); either cursor is None at that end.
+    """
+    more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+        has_next, has_previous = True, more
+    else:
+        # A page reached through a cursor has rows before it
+        has_next, has_previous = more, bool(cursor)
+    next_cursor = encode_cursor(rows[-1], ordering, model) if rows and has_next else None
+    previous_cursor = encode_cursor(rows[0], ordering, model, before=True) if rows and has_previous else None
+    return rows, next_cursor, previous_cursor
+
+
+def paginate_keyset(queryset, ordering, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Return (rows, next_cursor, previous_cursor) for one page. next_cursor is
+    None on the last page, previous_cursor on the first. A values() queryset
+    gives dict rows; it must include the ordering columns.
+    """
+    page, backwards = keyset_queryset(queryset, ordering, cursor)
+    rows = list(page[:page_size + 1])
+    return split_page(rows, ordering, page_size, queryset.model, cursor, backwards)
+
+
+async def apaginate_keyset(queryset, ordering, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """paginate_keyset() with the async ORM."""
+    page, backwards = keyset_queryset(queryset, ordering, cursor)
+    rows = [row async for row in page[:page_size + 1].aiterator()]
+    return split_page(rows, ordering, page_size, queryset.model, cursor, backwards)
+
+
+class KeysetPagination(BasePagination):
+    """
+    DRF pagination class using keyset pagination.
+    Orders on the view's `ordering` attribute, e.g. ('-date', '-id').
+    Response: {"next": <url or null>, "previous": <url or null>, "results": [...]}
+    An invalid cursor is a 400.
+    """
+    cursor_query_param = 'cursor'
+    ordering = ('-id',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = getattr(view, 'ordering', None) or self.ordering
+        cursor = request.query_params.get(self.cursor_query_param)
+        try:
+            rows, self.next_cursor, self.previous_cursor = paginate_keyset(
+                queryset, ordering, cursor, get_page_size(request.query_params)
+            )
+        except InvalidCursor:
+            raise ValidationError({self.cursor_query_param: ['Invalid cursor.']})
+        return rows
+
+    def cursor_link(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        return self.cursor_link(self.next_cursor)
+
+    def get_previous_link(self):
+        return self.cursor_link(self.previous_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'previous': self.get_previous_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
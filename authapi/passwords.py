@@ -0,0 +1,145 @@
+"""
+Password hashing off the request thread.
+
+Hashing and verifying passwords is deliberately slow, taking tens to hundreds
+of milliseconds of CPU. Here it runs on a bounded pool of
+PASSWORD_HASH_WORKERS threads. hashlib's pbkdf2_hmac and scrypt, and
+argon2-cffi, release the GIL while hashing, so the threads hash in parallel
+while a login burst cannot occupy more cores than the pool has. When
+PASSWORD_HASH_QUEUE further requests are already waiting, new ones get a 429
+instead of piling up.
+
+The hasher classes read their cost parameters from settings.PASSWORD_HASH_COST.
+Django's check_password reports hashes made with older parameters or another
+algorithm, and PooledModelBackend saves them rehashed on the user's next login.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth import get_user_model, hashers
+from django.contrib.auth.backends import ModelBackend
+from rest_framework.exceptions import Throttled
+
+
+class CostFromSettingsMixin:
+    def __init__(self):
+        for name, value in getattr(settings, 'PASSWORD_HASH_COST', {}).get(self.algorithm, {}).items():
+            setattr(self, name, value)
+
+
+class PBKDF2PasswordHasher(CostFromSettingsMixin, hashers.PBKDF2PasswordHasher):
+    pass
+
+
+class ScryptPasswordHasher(CostFromSettingsMixin, hashers.ScryptPasswordHasher):
+    pass
+
+
+class Argon2PasswordHasher(CostFromSettingsMixin, hashers.Argon2PasswordHasher):
+    # Requires the argon2-cffi package
+    pass
+
+
+class HashingBusy(Throttled):
+    default_detail = 'Too many logins in progress. Try again shortly.'
+
+    def __init__(self):
+        super().__init__(wait=1)
+
+
+class HashPool:
+    def __init__(self, workers, queue_size):
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix='authapi-hash')
+        self.slots = threading.BoundedSemaphore(workers + queue_size)
+
+    def submit(self, func, *args):
+        if not self.slots.acquire(blocking=False):
+            raise HashingBusy()
+        future = self.executor.submit(func, *args)
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = getattr(settings, 'PASSWORD_HASH_WORKERS', None) or os.cpu_count() or 1
+            _pool = HashPool(workers, getattr(settings, 'PASSWORD_HASH_QUEUE', 64))
+        return _pool
+
+
+def verify(raw_password, encoded):
+    """(valid, rehashed) where rehashed is a new hash if the stored one is outdated, else None."""
+    rehashed = []
+    valid = hashers.check_password(
+        raw_password, encoded, setter=lambda raw: rehashed.append(hashers.make_password(raw))
+    )
+    return valid, (rehashed[0] if rehashed else None)
+
+
+def hash_password(raw_password):
+    return get_pool().submit(hashers.make_password, raw_password).result()
+
+
+async def ahash_password(raw_password):
+    return await asyncio.wrap_future(get_pool().submit(hashers.make_password, raw_password))
+
+
+def check_password(user, raw_password):
+    valid, rehashed = get_pool().submit(verify, raw_password, user.password).result()
+    if rehashed:
+        user.password = rehashed
+        user.save(update_fields=['password'])
+    return valid
+
+
+async def acheck_password(user, raw_password):
+    valid, rehashed = await asyncio.wrap_future(get_pool().submit(verify, raw_password, user.password))
+    if rehashed:
+        user.password = rehashed
+        await user.asave(update_fields=['password'])
+    return valid
+
+
+class PooledModelBackend(ModelBackend):
+    """ModelBackend that checks passwords on the hashing pool (sync and async)."""
+
+    def lookup_username(self, username, kwargs):
+        UserModel = get_user_model()
+        return kwargs.get(UserModel.USERNAME_FIELD) if username is None else username
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        username = self.lookup_username(username, kwargs)
+        if username is None or password is None:
+            return None
+        UserModel = get_user_model()
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway, so an unknown username takes as long as a wrong password
+            hash_password(password)
+            return None
+        if check_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        username = self.lookup_username(username, kwargs)
+        if username is None or password is None:
+            return None
+        UserModel = get_user_model()
+        try:
+            user = await UserModel._default_manager.aget_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            await ahash_password(password)
+            return None
+        if await acheck_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
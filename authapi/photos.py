@@ -0,0 +1,118 @@
+"""
+Background processing of uploaded profile photos.
+
+Registration only reads the upload's header (sniff()), stores the file under
+a random name with the extension of its real format and marks the profile
+pending. process_profile_photo then runs on a task worker (authapi.tasks) and:
+- verifies that the file really is a JPEG, PNG or WebP image,
+- re-encodes the original without its metadata (EXIF, GPS position, comments),
+- writes square WebP thumbnails beside it, as thumbs/<name>.<size>.webp. The
+  subdirectory keeps them clear of upload names, which never contain a slash.
+Files that are not images are deleted, and the profile is marked failed.
+"""
+import io
+import os
+import uuid
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+from .models import UserProfile
+
+FORMATS = ('JPEG', 'PNG', 'WEBP')
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}
+DEFAULT_THUMBNAIL_SIZES = (64, 256)
+
+
+def thumbnail_sizes():
+    return tuple(getattr(settings, 'PROFILE_THUMBNAIL_SIZES', DEFAULT_THUMBNAIL_SIZES))
+
+
+def thumbnail_name(photo_name, size):
+    directory, filename = os.path.split(photo_name)
+    return os.path.join(directory, 'thumbs', f'{filename}.{size}.webp')
+
+
+def sniff(upload):
+    """
+    A server-chosen file name for an upload, from the image format in its
+    header; ValueError if it is not a supported image. Nothing is decoded.
+    """
+    try:
+        with Image.open(upload) as image:
+            image_format = image.format
+    except (OSError, SyntaxError, Image.DecompressionBombError):
+        raise ValueError('Not an image.')
+    finally:
+        upload.seek(0)
+    if image_format not in FORMATS:
+        raise ValueError(f'Unsupported image format {image_format}.')
+    return f'{uuid.uuid4().hex}.{EXTENSIONS[image_format]}'
+
+
+def open_image(storage, name):
+    """Decode the stored file, or raise ValueError if it is not a supported image."""
+    try:
+        with storage.open(name) as f:
+            Image.open(f).verify()
+        with storage.open(name) as f:
+            image = Image.open(f)
+            image.load()
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise ValueError(f'Not a valid image: {e}')
+    if image.format not in FORMATS:
+        raise ValueError(f'Unsupported image format {image.format}.')
+    return image
+
+
+def encode(image, image_format, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def replace(storage, name, content):
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, content)
+
+
+def clean_original(image):
+    """The image upright and without metadata, re-encoded in its original format."""
+    image_format = image.format
+    icc_profile = image.info.get('icc_profile')
+    # Apply the EXIF orientation before the EXIF block is dropped
+    image = ImageOps.exif_transpose(image)
+    image.info = {}
+    options = {'icc_profile': icc_profile} if icc_profile else {}
+    if image_format == 'JPEG':
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        options['quality'] = 90
+    elif image_format == 'WEBP':
+        options['quality'] = 90
+    return image, encode(image, image_format, **options)
+
+
+def thumbnail(image, size):
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    return encode(ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS), 'WEBP', quality=80)
+
+
+def process_profile_photo(profile_id):
+    profile = UserProfile.objects.filter(pk=profile_id).first()
+    if profile is None or not profile.photo:
+        return
+    profiles = UserProfile.objects.filter(pk=profile_id)
+    storage, name = profile.photo.storage, profile.photo.name
+    try:
+        image = open_image(storage, name)
+    except ValueError:
+        storage.delete(name)
+        profiles.update(photo=None, photo_status=UserProfile.PHOTO_FAILED)
+        return
+    image, content = clean_original(image)
+    name = replace(storage, name, content)
+    for size in thumbnail_sizes():
+        replace(storage, thumbnail_name(name, size), thumbnail(image, size))
+    profiles.update(photo=name, photo_status=UserProfile.PHOTO_READY)
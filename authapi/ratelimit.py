@@ -0,0 +1,134 @@
+"""
+Sliding-window rate limiting on a shared cache backend.
+
+Counters live in the cache named by settings.RATE_LIMIT_CACHE and are only
+changed with atomic add()/incr(), so concurrent requests cannot overwrite each
+other's counts. With a Redis cache every worker process shares one limit; the
+local-memory fallback behaves the same within a single process.
+"""
+import math
+import time
+from dataclasses import dataclass
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    remaining: int
+    retry_after: int
+
+
+def wall_clock():
+    # Looked up on every hit, so tests can pin the time seen by the limiters rate_limit() creates
+    return time.time()
+
+
+class SlidingWindowRateLimiter:
+    """
+    Sliding-window counter: the current fixed window's count plus the previous
+    window's count weighted by how much of it still overlaps the last `period`
+    seconds. Two cache keys per client, O(1) per hit.
+    """
+
+    def __init__(self, limit, period, cache_alias=None, clock=None):
+        self.limit = limit
+        self.period = period
+        self.cache_alias = cache_alias
+        self.clock = clock
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias or getattr(settings, 'RATE_LIMIT_CACHE', 'default')]
+
+    def _incr(self, key, cost):
+        cache = self.cache
+        try:
+            return cache.incr(key, cost)
+        except ValueError:
+            pass
+        # First hit in this window. Two windows must stay readable: the current
+        # one and the one before it. If another request created the key first,
+        # add() fails and we increment theirs.
+        if cache.add(key, cost, timeout=self.period * 2):
+            return cost
+        return cache.incr(key, cost)
+
+    def hit(self, key, cost=1):
+        now = (self.clock or wall_clock)()
+        window = int(now // self.period)
+        elapsed = now - window * self.period
+        current_key = f'{key}:{window}'
+        current = self._incr(current_key, cost)
+        previous = self.cache.get(f'{key}:{window - 1}', 0)
+        weight = (self.period - elapsed) / self.period
+        used = previous * weight + current
+        if used <= self.limit:
+            return RateLimitResult(True, int(self.limit - used), 0)
+        # Rejected hits do not use up quota.
+        try:
+            self.cache.decr(current_key, cost)
+        except ValueError:
+            pass
+        return RateLimitResult(False, 0, self._retry_after(previous, current, elapsed))
+
+    async def ahit(self, key, cost=1):
+        """hit() for async views; cache backends block, so it runs in a worker thread."""
+        return await sync_to_async(self.hit, thread_sensitive=False)(key, cost)
+
+    def _retry_after(self, previous, current, elapsed):
+        until_next_window = self.period - elapsed
+        if current > self.limit or not previous:
+            return max(1, math.ceil(until_next_window))
+        # Time for the previous window's weight to decay enough to fit this hit.
+        wait = until_next_window - (self.limit - current) * self.period / previous
+        return max(1, math.ceil(wait))
+
+
+def rate_limited_response(limit, period, unit, result, response_class=Response):
+    return response_class({
+        'detail': f'Rate limit exceeded. Max {limit} {unit} per {period} seconds.'
+    }, status=429, headers={'Retry-After': str(result.retry_after)})
+
+
+def default_key(request):
+    # Use user id if authenticated, else IP
+    if hasattr(request, 'user') and request.user.is_authenticated:
+        return f"rl:{request.user.id}"
+    ip = request.META.get('REMOTE_ADDR', 'anon')
+    return f"rl:ip:{ip}"
+
+
+# Custom rate limiting decorator
+# Example: @rate_limit(key_func, limit=5, period=60)
+def rate_limit(key_func=None, limit=5, period=60, scope=None, cost=None, unit='requests', on_limit=None):
+    """
+    Rate limit decorator for Django views.
+    :param key_func: function(request) -> str, unique key per user/IP
+    :param limit: max requests (or units, see cost)
+    :param period: seconds
+    :param scope: suffix that gives this limit its own counter instead of the shared one
+    :param cost: function(request) -> int, units one request uses up (default 1)
+    :param unit: what is being counted, for the 429 message
+    :param on_limit: function(request, result) -> response for a rejected request (default: a 429 JSON body)
+    """
+    limiter = SlidingWindowRateLimiter(limit, period)
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            key = key_func(request) if key_func else default_key(request)
+            if scope:
+                key = f'{key}:{scope}'
+            result = limiter.hit(key, cost(request) if cost else 1)
+            if not result.allowed:
+                if on_limit:
+                    return on_limit(request, result)
+                return rate_limited_response(limit, period, unit, result)
+            return view_func(request, *args, **kwargs)
+        return _wrapped_view
+    return decorator
@@ -0,0 +1,157 @@
+"""
+Fast read path for lists: rows fetched with values() and formatted by
+per-field converters compiled once from the read serializer.
+
+Listing through a ModelSerializer builds a model instance per row and then
+walks every serializer field for it: get_attribute, the None check and
+to_representation. For a field whose representation of a database value is
+the value itself (ids, strings, booleans, foreign keys) RowReader copies
+the value. Decimals, dates and datetimes get a converter that does what the
+DRF field would. Any other field falls back to the field's own
+to_representation. The output is identical to the serializer's; tests
+compare the two. The serializers stay in place for writes and single-object
+reads.
+"""
+import datetime
+import decimal
+import time
+from functools import lru_cache
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.settings import ISO_8601, api_settings
+from . import metrics
+
+
+def decimal_converter(field):
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.localize or field.normalize_output or field.decimal_places is None:
+        return field.to_representation
+    exponent = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        if type(value) is not decimal.Decimal:
+            return field.to_representation(value)
+        return f'{value.quantize(exponent, rounding=rounding, context=context):f}'
+    return convert
+
+
+def datetime_converter(field):
+    if getattr(field, 'format', api_settings.DATETIME_FORMAT) != ISO_8601:
+        return field.to_representation
+
+    def bind():
+        # enforce_timezone() looks up the active time zone on every call; look it up once per list
+        field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+        if field_timezone is None:
+            return field.to_representation
+
+        def convert(value):
+            if type(value) is not datetime.datetime or value.tzinfo is None:
+                return field.to_representation(value)
+            text = value.astimezone(field_timezone).isoformat()
+            return text[:-6] + 'Z' if text.endswith('+00:00') else text
+        return convert
+    return PerList(bind)
+
+
+def date_converter(field):
+    if getattr(field, 'format', api_settings.DATE_FORMAT) != ISO_8601:
+        return field.to_representation
+
+    def convert(value):
+        return value.isoformat() if type(value) is datetime.date else field.to_representation(value)
+    return convert
+
+
+class PerList:
+    """A converter that depends on request state, such as the active time zone, built once per list by bind()."""
+
+    def __init__(self, bind):
+        self.bind = bind
+
+
+def compile_field(field):
+    """
+    Converter for a non-None database value of field: a function or a
+    PerList, or None where the value is already its representation.
+    """
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        if field.pk_field is not None:
+            raise ImproperlyConfigured(f'{field.field_name}: pk_field is not supported')
+        return None
+    if isinstance(field, serializers.RelatedField) or isinstance(field, serializers.BaseSerializer):
+        raise ImproperlyConfigured(f'{field.field_name}: only scalar fields can be read from values()')
+    if isinstance(field, serializers.DecimalField):
+        return decimal_converter(field)
+    if isinstance(field, serializers.DateTimeField):
+        return datetime_converter(field)
+    if isinstance(field, serializers.DateField):
+        return date_converter(field)
+    if isinstance(field, serializers.IntegerField):
+        # BigIntegerField (DRF 3.16+) may be set to coerce to strings
+        coerce_to_string = getattr(field, 'coerce_to_string', getattr(api_settings, 'COERCE_BIGINT_TO_STRING', False))
+        return str if type(field) is not serializers.IntegerField and coerce_to_string else None
+    if isinstance(field, (serializers.BooleanField, serializers.CharField)):
+        return None
+    if isinstance(field, serializers.ChoiceField):
+        if all(key == value for key, value in field.choice_strings_to_values.items()):
+            return None
+    return field.to_representation
+
+
+class RowReader:
+    """
+    Reads the representation of serializer_class (optionally only `fields`)
+    from values() rows.
+    """
+
+    def __init__(self, serializer_class, fields=None):
+        # (output key, values() path, converter or None)
+        self.columns = []
+        for field in serializer_class()._readable_fields:
+            if fields is not None and field.field_name not in fields:
+                continue
+            if field.source == '*':
+                raise ImproperlyConfigured(f'{field.field_name}: source="*" cannot be read from values()')
+            self.columns.append((field.field_name, '__'.join(field.source_attrs), compile_field(field)))
+        self.paths = list(dict.fromkeys(path for _, path, _ in self.columns))
+
+    def values(self, queryset, ordering=()):
+        """queryset as values() rows with every column this reader needs, and the ordering columns."""
+        extra = [name.lstrip('-') for name in ordering if name.lstrip('-') not in self.paths]
+        return queryset.values(*self.paths, *extra)
+
+    def represent_row(self, row, columns):
+        data = {}
+        for key, path, convert in columns:
+            value = row[path]
+            data[key] = value if convert is None or value is None else convert(value)
+        return data
+
+    def represent(self, rows):
+        """The serializer's list representation of values() rows; timed as serializer time (authapi.metrics)."""
+        stats = metrics.current.get()
+        started = time.perf_counter()
+        try:
+            columns = [
+                (key, path, convert.bind() if isinstance(convert, PerList) else convert)
+                for key, path, convert in self.columns
+            ]
+            return [self.represent_row(row, columns) for row in rows]
+        finally:
+            if stats is not None:
+                stats.serializer_time += time.perf_counter() - started
+
+
+@lru_cache(maxsize=None)
+def _reader(serializer_class, fields):
+    return RowReader(serializer_class, fields)
+
+
+def reader_for(serializer_class, fields=None):
+    """Shared RowReader for serializer_class, limited to `fields` if given."""
+    return _reader(serializer_class, frozenset(fields) if fields is not None else None)
@@ -0,0 +1,78 @@
+"""
+JSON rendering and parsing with orjson (pip install orjson), several times
+faster than the json module on large lists.
+
+The output is byte-for-byte what DRF's JSONRenderer produces for the same
+data, except that a raw Decimal becomes its exact string ("12.50") rather
+than a float. Serializers already emit amounts that way. Without orjson,
+indented output requested by the browsable API or by "; indent=", or data
+orjson cannot encode (such as integers wider than 64 bits), both classes
+fall back to DRF's json-based implementation.
+"""
+import codecs
+import decimal
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# DRF's encoder for everything orjson does not handle natively, so dates and
+# times keep DRF's format ("Z" for UTC rather than "+00:00")
+encoder = JSONEncoder()
+
+
+def default(obj):
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    return encoder.default(obj)
+
+
+def dumps(data):
+    """data as compact UTF-8 JSON bytes, like JSONRenderer. Raises TypeError for unencodable data."""
+    if orjson is None:
+        return JSONRenderer().render(data)
+    try:
+        content = orjson.dumps(data, default=default, option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+    except orjson.JSONEncodeError as e:
+        raise TypeError(str(e)) from e
+    # Keep the output a strict JavaScript subset, as JSONRenderer does
+    if b'\xe2\x80\xa8' in content or b'\xe2\x80\xa9' in content:
+        content = content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return content
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            return dumps(data)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+def is_utf8(encoding):
+    try:
+        return codecs.lookup(encoding).name == 'utf-8'
+    except LookupError:
+        return False
+
+
+class ORJSONParser(JSONParser):
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None or not is_utf8((parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,56 @@
+"""
+Spending reports computed with database aggregation.
+
+Ranges made of whole months are read from MonthlyRollup, so their cost grows
+with the number of months rather than the number of transactions. Other
+ranges fall back to aggregating the Transaction table.
+"""
+import calendar
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from .models import MonthlyRollup, Transaction
+
+# Dimensions a monthly report can be grouped by, besides the month itself
+GROUP_BY_FIELDS = {
+    'account': ('account', 'account__name'),
+    'category': ('category', 'category__name'),
+    'is_income': ('is_income',),
+}
+
+
+def covers_whole_months(start, end):
+    if start and start.day != 1:
+        return False
+    if end and end.day != calendar.monthrange(end.year, end.month)[1]:
+        return False
+    return True
+
+
+def monthly_totals(user, start=None, end=None, group_by=('account', 'category', 'is_income')):
+    """
+    Sum and count the user's transactions per month and per each dimension in
+    group_by, optionally limited to start <= date <= end. One GROUP BY query.
+    """
+    columns = [column for name in group_by for column in GROUP_BY_FIELDS[name]]
+    if covers_whole_months(start, end):
+        queryset = MonthlyRollup.objects.filter(user_id=user.pk)
+        if start:
+            queryset = queryset.filter(month__gte=start)
+        if end:
+            queryset = queryset.filter(month__lte=end)
+        return (
+            queryset.values('month', *columns)
+            .annotate(total=Sum('total_amount'), count=Sum('transaction_count'))
+            .order_by('month', *columns)
+        )
+    queryset = Transaction.objects.for_user(user)
+    if start:
+        queryset = queryset.filter(date__gte=start)
+    if end:
+        queryset = queryset.filter(date__lte=end)
+    return (
+        queryset.annotate(month=TruncMonth('date'))
+        .values('month', *columns)
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by('month', *columns)
+    )
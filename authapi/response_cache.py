@@ -0,0 +1,80 @@
+"""
+Read-through cache for API read responses, invalidated by a per-user version.
+
+Every user has a version number in the RESPONSE_CACHE cache. Cached
+responses are keyed by user, version and request URL, and stored with their
+validators from authapi.conditional. Any write to a user's accounts, categories or transactions
+calls invalidate_user(), which bumps the number. That one O(1) step makes all
+of the user's cached entries and ETags stale, without finding or deleting
+keys; the old entries expire on their own. One version covers all three
+resources, because transaction writes also change account balances.
+A cache hit costs no queries, including the 304 check.
+
+That holds when the cache is shared by every worker process
+(settings.RESPONSE_CACHE_SHARED, set with REDIS_URL). A per-process cache
+never sees the bumps made by writes in other processes, so there the
+version also includes the user's change sequence number from the database
+(authapi.sync), which every write advances: one indexed query per cached
+read instead of serving stale entries until they expire.
+"""
+import hashlib
+import secrets
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from .models import SyncCounter
+
+
+def get_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE', 'default')]
+
+
+def version_key(user_id):
+    return f'resp:v:{user_id}'
+
+
+def get_version(user_id):
+    if getattr(settings, 'RESPONSE_CACHE_SHARED', False):
+        return cached_version(user_id)
+    seq = SyncCounter.objects.filter(user_id=user_id).values_list('value', flat=True).first()
+    return f'{cached_version(user_id)}.{seq or 0}'
+
+
+def cached_version(user_id):
+    cache = get_cache()
+    version = cache.get(version_key(user_id))
+    if version is None:
+        # Unknown or evicted: start from a random number, so versions seen
+        # before the eviction are not handed out again
+        cache.add(version_key(user_id), secrets.randbits(48), timeout=None)
+        version = cache.get(version_key(user_id))
+    return version
+
+
+def bump(user_id):
+    try:
+        get_cache().incr(version_key(user_id))
+    except ValueError:
+        cached_version(user_id)
+
+
+def invalidate_user(user_id):
+    """
+    Mark the user's cached responses stale. Call it from within the write.
+    It bumps now, so the rest of the request reads fresh data, and again on
+    commit, in case a concurrent read cached the pre-commit rows in between.
+    """
+    bump(user_id)
+    transaction.on_commit(lambda: bump(user_id))
+
+
+def entry_key(user_id, version, digest):
+    return f'resp:{user_id}:{version}:{digest}'
+
+
+def request_digest(request, format=None):
+    # URL (with host, for the absolute "next" links) and renderer format
+    format = format or getattr(getattr(request, 'accepted_renderer', None), 'format', '')
+    raw = f'{request.build_absolute_uri()}|{format}'
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
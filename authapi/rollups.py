@@ -0,0 +1,117 @@
+"""
+Incremental maintenance of MonthlyRollup.
+
+Each transaction contributes its amount and a count of one to the rollup row
+keyed by (user, account, category, month, is_income). The record_* helpers
+must run inside the same database transaction as the write they mirror.
+"""
+from collections import defaultdict
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from . import money
+from .models import MonthlyRollup, Transaction
+
+ROLLUP_KEY_FIELDS = ('user_id', 'account_id', 'category_id', 'month', 'is_income')
+
+
+def snapshot(txn):
+    """(rollup key, amount) for a transaction; take it before an update to undo the old values."""
+    key = {
+        'user_id': txn.user_id,
+        'account_id': txn.account_id,
+        'category_id': txn.category_id,
+        'month': txn.date.replace(day=1),
+        'is_income': txn.is_income,
+    }
+    return key, txn.amount
+
+
+def apply_delta(key, amount, count):
+    row, created = MonthlyRollup.objects.get_or_create(
+        **key, defaults={'total_amount': amount, 'transaction_count': count}
+    )
+    if created:
+        return
+    rows = MonthlyRollup.objects.filter(pk=row.pk)
+    rows.update(total_amount=F('total_amount') + money.value(amount), transaction_count=F('transaction_count') + count)
+    rows.filter(transaction_count__lte=0).delete()
+
+
+def record_create(txn):
+    key, amount = snapshot(txn)
+    apply_delta(key, amount, 1)
+
+
+def record_update(before, txn):
+    old_key, old_amount = before
+    key, amount = snapshot(txn)
+    if key == old_key:
+        if amount != old_amount:
+            apply_delta(key, amount - old_amount, 0)
+        return
+    apply_delta(old_key, -old_amount, -1)
+    apply_delta(key, amount, 1)
+
+
+def record_delete(txn):
+    key, amount = snapshot(txn)
+    apply_delta(key, -amount, -1)
+
+
+def record_many(added=(), removed=()):
+    """Apply many snapshots at once with one write per affected rollup row."""
+    deltas = defaultdict(lambda: [0, 0])
+    for key, amount in added:
+        delta = deltas[tuple(key[f] for f in ROLLUP_KEY_FIELDS)]
+        delta[0] += amount
+        delta[1] += 1
+    for key, amount in removed:
+        delta = deltas[tuple(key[f] for f in ROLLUP_KEY_FIELDS)]
+        delta[0] -= amount
+        delta[1] -= 1
+    for key, (amount, count) in deltas.items():
+        if amount or count:
+            apply_delta(dict(zip(ROLLUP_KEY_FIELDS, key)), amount, count)
+
+
+def raw_totals(user=None):
+    """Rollup rows recomputed from the Transaction table, as {key tuple: (total, count)}."""
+    queryset = Transaction.objects.all() if user is None else Transaction.objects.for_user(user)
+    rows = (
+        queryset.annotate(month=TruncMonth('date'))
+        .values('user_id', 'account_id', 'category_id', 'month', 'is_income')
+        .annotate(total=Sum('amount'), count=Count('id'))
+    )
+    return {tuple(row[f] for f in ROLLUP_KEY_FIELDS): (row['total'], row['count']) for row in rows}
+
+
+def stored_totals(user=None):
+    queryset = MonthlyRollup.objects.all() if user is None else MonthlyRollup.objects.filter(user_id=user.pk)
+    rows = queryset.values(*ROLLUP_KEY_FIELDS, 'total_amount', 'transaction_count')
+    return {
+        tuple(row[f] for f in ROLLUP_KEY_FIELDS): (row['total_amount'], row['transaction_count'])
+        for row in rows
+    }
+
+
+def rebuild(user=None, batch_size=1000):
+    """Replace the rollup rows (all, or one user's) with totals recomputed from Transaction."""
+    existing = MonthlyRollup.objects.all() if user is None else MonthlyRollup.objects.filter(user_id=user.pk)
+    existing.delete()
+    rows = [
+        MonthlyRollup(**dict(zip(ROLLUP_KEY_FIELDS, key)), total_amount=total, transaction_count=count)
+        for key, (total, count) in raw_totals(user).items()
+    ]
+    MonthlyRollup.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def verify(user=None):
+    """Keys whose stored rollup differs from the Transaction table: {key: (expected, stored)}."""
+    expected = raw_totals(user)
+    stored = stored_totals(user)
+    return {
+        key: (expected.get(key), stored.get(key))
+        for key in expected.keys() | stored.keys()
+        if expected.get(key) != stored.get(key)
+    }
@@ -0,0 +1,96 @@
+"""
+Full-text search over Transaction.description.
+
+On SQLite the descriptions are indexed in an FTS5 table,
+authapi_transaction_fts. It is an external-content table over
+authapi_transaction: it stores only the index, not the text. Triggers on
+authapi_transaction keep it in sync with every insert, update and delete,
+including bulk_create(), queryset.update() and cascades. On PostgreSQL a GIN
+index on to_tsvector('simple', description) does the same job. Other
+databases fall back to a LIKE scan.
+
+Each word of a search must match the start of a word in the description, in
+any order: "groc mar" finds "Groceries at the market".
+
+SQLite drops a table's triggers when a migration rebuilds the table. A
+migration that alters Transaction must call install() again.
+"""
+import re
+from django.db import connections
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'authapi_transaction_fts'
+MAX_TERMS = 8
+
+SQLITE_INSTALL = [
+    f'''CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        description, content='authapi_transaction', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )''',
+    'DROP TRIGGER IF EXISTS authapi_transaction_fts_insert',
+    'DROP TRIGGER IF EXISTS authapi_transaction_fts_delete',
+    'DROP TRIGGER IF EXISTS authapi_transaction_fts_update',
+    f'''CREATE TRIGGER authapi_transaction_fts_insert AFTER INSERT ON authapi_transaction BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, description) VALUES (new.id, new.description);
+    END''',
+    f'''CREATE TRIGGER authapi_transaction_fts_delete AFTER DELETE ON authapi_transaction BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description) VALUES ('delete', old.id, old.description);
+    END''',
+    f'''CREATE TRIGGER authapi_transaction_fts_update AFTER UPDATE OF description ON authapi_transaction BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description) VALUES ('delete', old.id, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, description) VALUES (new.id, new.description);
+    END''',
+    # Index the rows that already exist
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS authapi_transaction_fts_insert',
+    'DROP TRIGGER IF EXISTS authapi_transaction_fts_delete',
+    'DROP TRIGGER IF EXISTS authapi_transaction_fts_update',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+POSTGRES_INSTALL = [
+    "CREATE INDEX IF NOT EXISTS txn_description_fts_idx ON authapi_transaction "
+    "USING GIN (to_tsvector('simple', description))",
+]
+POSTGRES_UNINSTALL = ['DROP INDEX IF EXISTS txn_description_fts_idx']
+
+
+def run(schema_editor, statements):
+    for sql in statements.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(sql)
+
+
+def install(apps, schema_editor):
+    """Create the search index and its triggers; safe to run again. For RunPython."""
+    run(schema_editor, {'sqlite': SQLITE_INSTALL, 'postgresql': POSTGRES_INSTALL})
+
+
+def uninstall(apps, schema_editor):
+    run(schema_editor, {'sqlite': SQLITE_UNINSTALL, 'postgresql': POSTGRES_UNINSTALL})
+
+
+def search_terms(text):
+    """The words of a search, lowercased; punctuation and query syntax are dropped."""
+    return re.findall(r'\w+', text.lower())[:MAX_TERMS]
+
+
+def matching(queryset, text):
+    """Transactions in queryset whose description contains every word of text as a word prefix."""
+    terms = search_terms(text)
+    if not terms:
+        return queryset
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return queryset.filter(pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]))
+    if vendor == 'postgresql':
+        query = ' & '.join(f'{term}:*' for term in terms)
+        return queryset.filter(RawSQL(
+            "to_tsvector('simple', authapi_transaction.description) @@ to_tsquery('simple', %s)",
+            [query], output_field=BooleanField(),
+        ))
+    for term in terms:
+        queryset = queryset.filter(description__icontains=term)
+    return queryset
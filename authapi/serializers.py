@@ -0,0 +1,346 @@
+import time
+from django.contrib.auth.models import User
+from django.db import transaction
+from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from .models import Account, Category, Transaction, UserProfile
+from .reports import GROUP_BY_FIELDS
+from .importers import FORMATS
+from .exports import EXPORT_FORMATS
+from .passwords import hash_password
+from .photos import process_profile_photo, sniff, thumbnail_sizes
+from .tasks import enqueue
+from . import metrics, sync
+
+
+def context_user(context):
+    """Return the user a serializer is acting for, from either a service or a DRF request."""
+    user = context.get('user')
+    if user is None and context.get('request') is not None:
+        user = context['request'].user
+    return user
+
+# Serializer for user registration
+class RegisterSerializer(serializers.ModelSerializer):
+    # Only the header is checked here; decoding and verification happen in authapi.photos, off the request
+    photo = serializers.FileField(write_only=True, required=False)
+
+    class Meta:
+        model = User
+        fields = ('username', 'password', 'email', 'photo')
+        extra_kwargs = {'password': {'write_only': True}}
+
+    def validate_photo(self, value):
+        if value:
+            if value.size > 2 * 1024 * 1024:
+                raise serializers.ValidationError('Photo size must be less than 2MB.')
+            try:
+                value.name = sniff(value)
+            except ValueError:
+                raise serializers.ValidationError('Only JPEG, PNG, and WebP images are allowed.')
+        return value
+
+    def create(self, validated_data):
+        photo = validated_data.pop('photo', None)
+        # Hash before the transaction: with BEGIN IMMEDIATE (settings.SQLITE_OPTIMIZED)
+        # every other writer would wait for the hash otherwise
+        password = hash_password(validated_data['password'])
+        with transaction.atomic():
+            user = User.objects.create(
+                username=validated_data['username'],
+                email=validated_data.get('email', ''),
+                password=password
+            )
+            profile = UserProfile.objects.create(
+                user=user, photo=photo, photo_status=UserProfile.PHOTO_PENDING if photo else ''
+            )
+            if photo:
+                enqueue(process_profile_photo, profile.pk)
+        return user
+
+class ProfileSerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source='user.username')
+    email = serializers.CharField(source='user.email')
+    photo_url = serializers.SerializerMethodField()
+    # {"64": url, ...}, empty until the photo has been processed
+    thumbnails = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UserProfile
+        fields = ('username', 'email', 'photo_status', 'photo_url', 'thumbnails')
+
+    def get_photo_url(self, profile):
+        return profile.photo.url if profile.photo_status == UserProfile.PHOTO_READY and profile.photo else None
+
+    def get_thumbnails(self, profile):
+        urls = {str(size): profile.thumbnail_url(size) for size in thumbnail_sizes()}
+        return {size: url for size, url in urls.items() if url}
+
+# Login serializer: embeds the claims authapi.authentication.ClaimsUser reads
+class LoginTokenSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['username'] = user.get_username()
+        return token
+
+class TimedSerializerMixin:
+    """Adds the time spent in to_representation to the request's serializer time (authapi.metrics)."""
+
+    def to_representation(self, instance):
+        stats = metrics.current.get()
+        if stats is None or stats.serializing:
+            return super().to_representation(instance)
+        stats.serializing = True
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            stats.serializing = False
+            stats.serializer_time += time.perf_counter() - started
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
+
+# Serializers for CRUD
+class AccountSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Account
+        fields = '__all__'
+        # balance is derived from opening_balance and the account's transactions
+        read_only_fields = ['user', 'balance', 'change_seq']
+        list_serializer_class = TimedListSerializer
+
+class CategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Category
+        fields = '__all__'
+        read_only_fields = ['user', 'change_seq']
+        list_serializer_class = TimedListSerializer
+
+class TransactionSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Transaction
+        fields = '__all__'
+        read_only_fields = ['user', 'change_seq']
+        list_serializer_class = TimedListSerializer
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Only the user's own accounts and categories are valid choices.
+        user = context_user(self.context)
+        if user is not None and user.is_authenticated:
+            self.fields['account'].queryset = Account.objects.for_user(user)
+            self.fields['category'].queryset = Category.objects.for_user(user)
+
+class TransactionReadSerializer(TransactionSerializer):
+    """
+    Read-only transaction representation with the account and category names
+    flattened in. Expects a queryset from TransactionService.get_read_queryset(),
+    which joins both relations so listing costs one query.
+    """
+    account_name = serializers.CharField(source='account.name', read_only=True)
+    category_name = serializers.CharField(source='category.name', read_only=True)
+
+# Serializers for bulk transaction writes
+class BulkTransactionItemSerializer(serializers.ModelSerializer):
+    """
+    Validates one item of a bulk request. Accounts and categories are looked up
+    in the dicts passed as context['accounts'] / context['categories'], fetched
+    once per batch, instead of one query per item.
+    """
+    account = serializers.IntegerField()
+    category = serializers.IntegerField()
+
+    class Meta:
+        model = Transaction
+        fields = ('account', 'category', 'amount', 'date', 'description', 'is_income')
+
+    def _lookup(self, name, value):
+        obj = self.context[name].get(value)
+        if obj is None:
+            raise serializers.ValidationError(f'Invalid pk "{value}" - object does not exist.')
+        return obj
+
+    def validate_account(self, value):
+        return self._lookup('accounts', value)
+
+    def validate_category(self, value):
+        return self._lookup('categories', value)
+
+class BulkTransactionRequestSerializer(serializers.Serializer):
+    create = serializers.ListField(child=serializers.DictField(), required=False, default=list)
+    update = serializers.ListField(child=serializers.DictField(), required=False, default=list)
+    delete = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+
+    def validate(self, attrs):
+        size = sum(len(attrs[op]) for op in ('create', 'update', 'delete'))
+        max_items = self.context['max_items']
+        if not size:
+            raise serializers.ValidationError('Provide at least one item in create, update or delete.')
+        if size > max_items:
+            raise serializers.ValidationError(f'A batch may contain at most {max_items} items, got {size}.')
+        return attrs
+
+class TransactionImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    account = serializers.PrimaryKeyRelatedField(queryset=Account.objects.all())
+    category = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all(), required=False,
+                                                  help_text='Used for rows without a category column')
+    format = serializers.ChoiceField(choices=FORMATS, required=False)
+    dedupe = serializers.BooleanField(default=True)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        user = context_user(self.context)
+        if user is not None and user.is_authenticated:
+            self.fields['account'].queryset = Account.objects.for_user(user)
+            self.fields['category'].queryset = Category.objects.for_user(user)
+
+    def validate(self, attrs):
+        if not attrs.get('format'):
+            extension = attrs['file'].name.rsplit('.', 1)[-1].lower()
+            if extension not in FORMATS:
+                raise serializers.ValidationError(
+                    {'format': 'Cannot tell the file format from its name; pass format=csv or format=ofx.'}
+                )
+            attrs['format'] = extension
+        return attrs
+
+class TransactionExportQuerySerializer(serializers.Serializer):
+    # Not "format": DRF reserves ?format= for renderer selection
+    output = serializers.ChoiceField(choices=list(EXPORT_FORMATS), default='csv')
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    account = serializers.PrimaryKeyRelatedField(queryset=Account.objects.all(), required=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        user = context_user(self.context)
+        if user is not None and user.is_authenticated:
+            self.fields['account'].queryset = Account.objects.for_user(user)
+
+class TransactionFilterSerializer(serializers.Serializer):
+    """
+    Query parameters of the transaction list, applied by TransactionService.
+    account and category are plain ids: another user's id matches nothing,
+    so no lookup query is needed to validate them.
+    """
+    # ?ordering= value -> keyset ordering, ending in the unique id
+    ORDERINGS = {
+        '-date': ('-date', '-id'),
+        'date': ('date', 'id'),
+        '-amount': ('-amount', '-id'),
+        'amount': ('amount', 'id'),
+    }
+
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    account = serializers.IntegerField(required=False)
+    category = serializers.IntegerField(required=False)
+    is_income = serializers.BooleanField(required=False, allow_null=True, default=None)
+    min_amount = serializers.DecimalField(max_digits=12, decimal_places=2, required=False)
+    max_amount = serializers.DecimalField(max_digits=12, decimal_places=2, required=False)
+    search = serializers.CharField(required=False, max_length=200)
+    ordering = serializers.ChoiceField(choices=list(ORDERINGS), default='-date')
+
+    def validate(self, attrs):
+        if attrs.get('start') and attrs.get('end') and attrs['start'] > attrs['end']:
+            raise serializers.ValidationError('start must be on or before end.')
+        if (attrs.get('min_amount') is not None and attrs.get('max_amount') is not None
+                and attrs['min_amount'] > attrs['max_amount']):
+            raise serializers.ValidationError('min_amount must not be greater than max_amount.')
+        attrs['ordering'] = self.ORDERINGS[attrs['ordering']]
+        return attrs
+
+# Serializers for reports
+class MonthlyReportQuerySerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    group_by = serializers.CharField(required=False, default='account,category,is_income')
+
+    def validate_group_by(self, value):
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in names if name not in GROUP_BY_FIELDS]
+        if unknown:
+            raise serializers.ValidationError(
+                f"Unknown group_by field(s): {', '.join(unknown)}. Choose from {', '.join(GROUP_BY_FIELDS)}."
+            )
+        return names
+
+    def validate(self, attrs):
+        if attrs.get('start') and attrs.get('end') and attrs['start'] > attrs['end']:
+            raise serializers.ValidationError('start must be on or before end.')
+        return attrs
+
+class SyncQuerySerializer(serializers.Serializer):
+    since = serializers.CharField(required=False)
+    page_size = serializers.IntegerField(required=False, min_value=1, max_value=2000, default=500)
+
+    def validate_since(self, value):
+        try:
+            return sync.decode_token(value)
+        except sync.InvalidSyncToken:
+            raise serializers.ValidationError('Invalid sync token.')
+
+class DashboardQuerySerializer(serializers.Serializer):
+    """
+    ?fields= lists the sections to return, and optionally the fields of a
+    section as section.field: "accounts,transactions.id,transactions.amount".
+    Omitted: every section with every field. Validated as {section: set of
+    field names, or None for all of them}.
+    """
+    SECTIONS = {
+        'accounts': AccountSerializer,
+        'categories': CategorySerializer,
+        'transactions': TransactionReadSerializer,
+        'balances': None,
+    }
+    BALANCE_FIELDS = ('id', 'name', 'balance')
+
+    def get_fields(self):
+        # Declared here: a "fields" class attribute would shadow Serializer.fields
+        return {
+            'fields': serializers.CharField(required=False),
+            'recent': serializers.IntegerField(required=False, min_value=0, max_value=100, default=20),
+        }
+
+    @classmethod
+    def section_fields(cls, section):
+        serializer_class = cls.SECTIONS[section]
+        return set(serializer_class().fields) if serializer_class else set(cls.BALANCE_FIELDS)
+
+    def validate_fields(self, value):
+        selected = {}
+        for item in filter(None, (part.strip() for part in value.split(','))):
+            section, _, field = item.partition('.')
+            if section not in self.SECTIONS:
+                raise serializers.ValidationError(
+                    f"Unknown section: {section}. Choose from {', '.join(self.SECTIONS)}."
+                )
+            if not field:
+                selected[section] = None
+            elif field not in self.section_fields(section):
+                raise serializers.ValidationError(f'Unknown field: {item}.')
+            elif section not in selected or selected[section] is not None:
+                selected.setdefault(section, set()).add(field)
+        if not selected:
+            raise serializers.ValidationError('Select at least one section.')
+        return selected
+
+    def validate(self, attrs):
+        attrs.setdefault('fields', dict.fromkeys(self.SECTIONS))
+        return attrs
+
+class MonthlyTotalSerializer(TimedSerializerMixin, serializers.Serializer):
+    month = serializers.DateField(format='%Y-%m')
+    account = serializers.IntegerField(required=False)
+    account_name = serializers.CharField(source='account__name', required=False)
+    category = serializers.IntegerField(required=False)
+    category_name = serializers.CharField(source='category__name', required=False)
+    is_income = serializers.BooleanField(required=False)
+    total = serializers.DecimalField(max_digits=14, decimal_places=2)
+    count = serializers.IntegerField()
+
+    class Meta:
+        list_serializer_class = TimedListSerializer
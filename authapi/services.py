@@ -0,0 +1,393 @@
+"""
+In-process service layer for the finance models.
+
+Both the DRF viewsets and the HTML CRUD views go through these services, so
+per-user scoping and serializer validation live in one place and the template
+views no longer call back into the API over HTTP.
+"""
+from django.conf import settings
+from django.db import transaction as db_transaction
+from rest_framework import serializers
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Count, F, Max
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from . import ledger, money, readers, response_cache, rollups, search, sync
+from .models import Account, Category, Transaction
+from .pagination import DEFAULT_PAGE_SIZE, apaginate_keyset, paginate_keyset
+from .serializers import (
+    AccountSerializer, CategorySerializer, TransactionSerializer, TransactionReadSerializer,
+    BulkTransactionItemSerializer, BulkTransactionRequestSerializer, TransactionFilterSerializer,
+)
+
+
+class ResourceService:
+    """
+    CRUD operations for one model, scoped to a single user.
+    Validation errors are raised as rest_framework ValidationError,
+    missing or foreign objects as Http404.
+    """
+    model = None
+    serializer_class = None
+    # Used for list/retrieve output; defaults to serializer_class
+    read_serializer_class = None
+    # Keyset pagination order; must end in a unique column
+    ordering = ('id',)
+    # Foreign keys whose fields appear in the read representation
+    state_relations = ()
+    # Validates list query parameters; None if the list takes no filters
+    filter_serializer_class = None
+
+    def __init__(self, user):
+        self.user = user
+
+    def get_queryset(self):
+        return self.model.objects.for_user(self.user)
+
+    def get_read_queryset(self):
+        """Queryset for list/retrieve, shaped for read_serializer_class."""
+        return self.get_queryset()
+
+    def get_serializer(self, *args, **kwargs):
+        serializer_class = kwargs.pop('serializer_class', self.serializer_class)
+        kwargs.setdefault('context', {})
+        kwargs['context'].setdefault('user', self.user)
+        return serializer_class(*args, **kwargs)
+
+    def get_read_serializer(self, *args, **kwargs):
+        kwargs['serializer_class'] = self.read_serializer_class or self.serializer_class
+        return self.get_serializer(*args, **kwargs)
+
+    def get(self, pk):
+        return get_object_or_404(self.get_queryset(), pk=pk)
+
+    # List filters and ordering
+    def parse_filters(self, params):
+        """Validated filters from query parameters. Raises ValidationError."""
+        if self.filter_serializer_class is None:
+            return {}
+        serializer = self.get_serializer(data=params, serializer_class=self.filter_serializer_class)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    def filter_queryset(self, queryset, filters):
+        return queryset
+
+    def get_list_queryset(self, filters=None):
+        """get_read_queryset() narrowed by parse_filters() output."""
+        return self.filter_queryset(self.get_read_queryset(), filters or {})
+
+    def get_ordering(self, filters=None):
+        return (filters or {}).get('ordering') or self.ordering
+
+    # Lists are read with values() and formatted by authapi.readers, with the
+    # same output as read_serializer_class
+    def get_reader(self, fields=None):
+        return readers.reader_for(self.read_serializer_class or self.serializer_class, fields)
+
+    def list_values(self, filters=None, fields=None):
+        """values() rows of the list, in list order, for get_reader(fields)."""
+        ordering = self.get_ordering(filters)
+        return self.get_reader(fields).values(self.get_list_queryset(filters), ordering).order_by(*ordering)
+
+    def list_data(self):
+        return self.get_reader().represent(self.list_values())
+
+    def page_data(self, cursor=None, page_size=DEFAULT_PAGE_SIZE, filters=None):
+        """Serialized keyset page: (rows, next_cursor, previous_cursor). Raises InvalidCursor."""
+        rows, next_cursor, previous_cursor = paginate_keyset(
+            self.list_values(filters), self.get_ordering(filters), cursor, page_size
+        )
+        return self.get_reader().represent(rows), next_cursor, previous_cursor
+
+    def retrieve_data(self, pk):
+        return self.get_read_serializer(get_object_or_404(self.get_read_queryset(), pk=pk)).data
+
+    # Async reads for authapi.async_views. Lists are values() rows and the read
+    # serializers only touch fields loaded by get_read_queryset(), so
+    # formatting makes no queries.
+    async def apage_data(self, cursor=None, page_size=DEFAULT_PAGE_SIZE, filters=None):
+        rows, next_cursor, previous_cursor = await apaginate_keyset(
+            self.list_values(filters), self.get_ordering(filters), cursor, page_size
+        )
+        return self.get_reader().represent(rows), next_cursor, previous_cursor
+
+    async def aretrieve_data(self, pk):
+        try:
+            obj = await self.get_read_queryset().aget(pk=pk)
+        except self.model.DoesNotExist:
+            raise Http404(f'No {self.model._meta.object_name} matches the given query.')
+        return self.get_read_serializer(obj).data
+
+    # Validators for conditional GETs (authapi.conditional)
+    def state_queryset(self, pk=None):
+        queryset = self.get_queryset()
+        if pk is None:
+            return queryset
+        try:
+            return queryset.filter(pk=pk)
+        except (TypeError, ValueError, DjangoValidationError):
+            return queryset.none()
+
+    def state_aggregates(self):
+        aggregates = {'count': Count('pk'), 'updated_at': Max('updated_at')}
+        for name in self.state_relations:
+            aggregates[f'{name}_updated_at'] = Max(f'{name}__updated_at')
+        return aggregates
+
+    @staticmethod
+    def combine_state(row):
+        stamps = [value for name, value in row.items() if name != 'count' and value is not None]
+        return max(stamps, default=None), row['count']
+
+    def read_state(self, pk=None):
+        """
+        (last_modified, count) of the rows a list shows, or with pk the one row
+        a retrieve shows, in one aggregate query. Includes the relations in
+        state_relations, whose fields appear in the read representation.
+        """
+        return self.combine_state(self.state_queryset(pk).aggregate(**self.state_aggregates()))
+
+    async def aread_state(self, pk=None):
+        return self.combine_state(await self.state_queryset(pk).aaggregate(**self.state_aggregates()))
+
+    def create(self, data):
+        serializer = self.get_serializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        return self.perform_create(serializer)
+
+    def update(self, pk, data, partial=False):
+        serializer = self.get_serializer(self.get(pk), data=data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        return self.perform_update(serializer)
+
+    def delete(self, pk):
+        self.perform_destroy(self.get(pk))
+
+    # Write hooks shared with the viewsets. Each runs in a database transaction,
+    # stamps the rows with the next change sequence number (authapi.sync) and
+    # calls changed() after writing.
+    def changed(self):
+        response_cache.invalidate_user(self.user.pk)
+
+    def perform_create(self, serializer):
+        with db_transaction.atomic():
+            instance = serializer.save(user_id=self.user.pk, change_seq=sync.advance(self.user.pk))
+            self.changed()
+        return instance
+
+    def perform_update(self, serializer):
+        with db_transaction.atomic():
+            instance = serializer.save(change_seq=sync.advance(self.user.pk))
+            self.changed()
+        return instance
+
+    def perform_destroy(self, instance):
+        with db_transaction.atomic():
+            sync.record_delete(instance, sync.advance(self.user.pk))
+            instance.delete()
+            self.changed()
+
+
+class AccountService(ResourceService):
+    model = Account
+    serializer_class = AccountSerializer
+
+    def perform_create(self, serializer):
+        opening_balance = serializer.validated_data.get('opening_balance', 0)
+        with db_transaction.atomic():
+            instance = serializer.save(
+                user_id=self.user.pk, balance=opening_balance, change_seq=sync.advance(self.user.pk)
+            )
+            self.changed()
+        return instance
+
+    def perform_update(self, serializer):
+        # Write only the submitted fields, shifting balance by the opening_balance
+        # change. The change is taken against the stored opening_balance in the
+        # UPDATE itself, so neither concurrent ledger updates to balance nor a
+        # concurrent opening_balance change are lost.
+        instance = serializer.instance
+        data = serializer.validated_data
+        shift = {}
+        if 'opening_balance' in data:
+            shift['balance'] = F('balance') + money.value(data['opening_balance']) - F('opening_balance')
+        with db_transaction.atomic():
+            sync.advance(self.user.pk)
+            self.get_queryset().filter(pk=instance.pk).update(**data, **shift, **sync.touched())
+            self.changed()
+        instance.refresh_from_db()
+        return instance
+
+
+class CategoryService(ResourceService):
+    model = Category
+    serializer_class = CategorySerializer
+
+    def perform_destroy(self, instance):
+        # Deleting a category cascades to its transactions; take them out of the balances first.
+        with db_transaction.atomic():
+            sync.record_delete(instance, sync.advance(self.user.pk))
+            ledger.remove_transactions(Transaction.objects.filter(category=instance))
+            instance.delete()
+            self.changed()
+
+
+class TransactionService(ResourceService):
+    model = Transaction
+    serializer_class = TransactionSerializer
+    read_serializer_class = TransactionReadSerializer
+    ordering = ('-date', '-id')
+    state_relations = ('account', 'category')
+    filter_serializer_class = TransactionFilterSerializer
+
+    def get_read_queryset(self):
+        # Join account/category names in the same query instead of one lookup per row
+        return self.get_queryset().select_related('account', 'category').only(
+            'id', 'user', 'account', 'category', 'amount', 'date', 'description',
+            'is_income', 'created_at', 'updated_at', 'change_seq', 'account__name', 'category__name',
+        )
+
+    # Each filter has an index to use: (user, date), (user, account, date),
+    # (user, category, date), (user, amount), or the full-text index for search
+    FILTER_LOOKUPS = {
+        'start': 'date__gte', 'end': 'date__lte', 'account': 'account_id', 'category': 'category_id',
+        'is_income': 'is_income', 'min_amount': 'amount__gte', 'max_amount': 'amount__lte',
+    }
+
+    def filter_queryset(self, queryset, filters):
+        lookups = {
+            lookup: filters[name] for name, lookup in self.FILTER_LOOKUPS.items()
+            if filters.get(name) is not None
+        }
+        queryset = queryset.filter(**lookups)
+        if filters.get('search'):
+            queryset = search.matching(queryset, filters['search'])
+        return queryset
+
+    # Writes keep account balances and MonthlyRollup in step within the same database transaction
+    def perform_create(self, serializer):
+        with db_transaction.atomic():
+            instance = super().perform_create(serializer)
+            ledger.record_create(instance)
+            rollups.record_create(instance)
+        return instance
+
+    def perform_update(self, serializer):
+        with db_transaction.atomic():
+            # Snapshot the stored row under a lock so concurrent edits cannot both undo the same old values
+            stored = get_object_or_404(self.get_queryset().select_for_update(), pk=serializer.instance.pk)
+            ledger_before, rollup_before = ledger.snapshot(stored), rollups.snapshot(stored)
+            instance = super().perform_update(serializer)
+            ledger.record_update(ledger_before, instance)
+            rollups.record_update(rollup_before, instance)
+        return instance
+
+    def perform_destroy(self, instance):
+        with db_transaction.atomic():
+            stored = get_object_or_404(self.get_queryset().select_for_update(), pk=instance.pk)
+            ledger.record_delete(stored)
+            rollups.record_delete(stored)
+            super().perform_destroy(stored)
+
+    # Bulk writes
+    def bulk_max_items(self):
+        return getattr(settings, 'TRANSACTION_BULK_MAX_ITEMS', 5000)
+
+    def bulk_write(self, data, batch_size=500):
+        """
+        Apply a batch of creates, updates and deletes in one database transaction.
+        Valid items are written and invalid ones reported, as
+        {'created': [ids], 'updated': [ids], 'deleted': [ids], 'errors': [...]},
+        where each error is {'op', 'index', 'errors'}.
+        """
+        request = BulkTransactionRequestSerializer(data=data, context={'max_items': self.bulk_max_items()})
+        request.is_valid(raise_exception=True)
+        ops = request.validated_data
+        context = {
+            'accounts': Account.objects.for_user(self.user).only('id').in_bulk(),
+            'categories': Category.objects.for_user(self.user).only('id').in_bulk(),
+        }
+        errors = []
+
+        def validate(serializer, op, index, item):
+            try:
+                return serializer.run_validation(item)
+            except serializers.ValidationError as e:
+                errors.append({'op': op, 'index': index, 'errors': e.detail})
+
+        creator = BulkTransactionItemSerializer(context=context)
+        new_rows = []
+        for index, item in enumerate(ops['create']):
+            validated = validate(creator, 'create', index, item)
+            if validated is not None:
+                new_rows.append(Transaction(user_id=self.user.pk, **validated))
+
+        with db_transaction.atomic():
+            update_ids = [item.get('id') for item in ops['update']]
+            existing = self.get_queryset().select_for_update().in_bulk(
+                [pk for pk in update_ids + ops['delete'] if isinstance(pk, int)]
+            )
+            updater = BulkTransactionItemSerializer(context=context, partial=True)
+            seen = set()
+
+            def target(op, index, pk):
+                # Each stored row may appear once per batch
+                txn = existing.get(pk) if isinstance(pk, int) else None
+                if txn is None or pk in seen:
+                    message = 'Not found.' if txn is None else 'Duplicate id in batch.'
+                    errors.append({'op': op, 'index': index, 'errors': {'id': [message]}})
+                    return None
+                seen.add(pk)
+                return txn
+
+            # bulk_update() skips auto_now
+            changed, now, seq = [], timezone.now(), sync.advance(self.user.pk)
+            for index, item in enumerate(ops['update']):
+                txn = target('update', index, item.get('id'))
+                if txn is None:
+                    continue
+                validated = validate(updater, 'update', index, {k: v for k, v in item.items() if k != 'id'})
+                if validated is None:
+                    continue
+                before = (ledger.snapshot(txn), rollups.snapshot(txn))
+                for field, value in validated.items():
+                    setattr(txn, field, value)
+                txn.updated_at, txn.change_seq = now, seq
+                changed.append((before, txn))
+
+            deleted = []
+            for index, pk in enumerate(ops['delete']):
+                txn = target('delete', index, pk)
+                if txn is not None:
+                    deleted.append(txn)
+
+            for txn in new_rows:
+                txn.change_seq = seq
+            created = Transaction.objects.bulk_create(new_rows, batch_size=batch_size)
+            if changed:
+                Transaction.objects.bulk_update(
+                    [txn for _, txn in changed], (*BulkTransactionItemSerializer.Meta.fields, 'updated_at', 'change_seq'),
+                    batch_size=batch_size,
+                )
+            sync.record_deletes(self.user.pk, seq, Transaction, [txn.pk for txn in deleted])
+            Transaction.objects.filter(pk__in=[txn.pk for txn in deleted]).delete()
+
+            ledger.record_many(
+                added=[ledger.snapshot(txn) for txn in created] + [ledger.snapshot(txn) for _, txn in changed],
+                removed=[before[0] for before, _ in changed] + [ledger.snapshot(txn) for txn in deleted],
+            )
+            rollups.record_many(
+                added=[rollups.snapshot(txn) for txn in created] + [rollups.snapshot(txn) for _, txn in changed],
+                removed=[before[1] for before, _ in changed] + [rollups.snapshot(txn) for txn in deleted],
+            )
+            if created or changed or deleted:
+                self.changed()
+
+        return {
+            'created': [txn.pk for txn in created],
+            'updated': [txn.pk for _, txn in changed],
+            'deleted': [txn.pk for txn in deleted],
+            'errors': errors,
+        }
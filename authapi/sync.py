@@ -0,0 +1,165 @@
+"""
+Delta sync: a per-user change feed of accounts, categories and transactions.
+
+Every write takes the user's next change sequence number from SyncCounter
+and stamps it on the rows it creates or updates (change_seq) and on the
+Tombstone rows it leaves for deleted objects. advance() increments the
+counter inside the write's database transaction and the counter row stays
+locked until commit, so a user's writes commit in sequence order and a
+client that has seen number N has seen everything before it.
+
+changes() returns the rows and tombstones after a sync token, reading each
+source through its (user, change_seq) index, so a sync costs in proportion
+to what changed since the token rather than to the whole history. Rows hold
+only their latest sequence number: an object changed many times is sent once.
+"""
+import base64
+import binascii
+import heapq
+import json
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from .models import Account, Category, SyncCounter, Tombstone, Transaction
+
+# Feed sections in the order rows of one sequence number are sent: parents
+# before the transactions that refer to them, deletions last
+KINDS = (('accounts', Account), ('categories', Category), ('transactions', Transaction))
+DELETED = len(KINDS)
+# Key before every change, for a client's first (full) sync
+START = (0, -1, 0)
+SECTIONS = {model._meta.model_name: name for name, model in KINDS}
+
+# Rows deleted along with an object by on_delete=CASCADE
+CASCADES = {Account: ((Transaction, 'account'),), Category: ((Transaction, 'category'),)}
+
+
+class InvalidSyncToken(ValueError):
+    pass
+
+
+class SyncTokenExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'Sync token has expired. Sync again without a token.'
+    default_code = 'sync_token_expired'
+
+
+def advance(user_id):
+    """
+    Take the user's next change sequence number. Call it inside the write's
+    transaction.atomic() block, before stamping rows with the number.
+    """
+    if not SyncCounter.objects.filter(user_id=user_id).update(value=F('value') + 1):
+        try:
+            with transaction.atomic():
+                SyncCounter.objects.create(user_id=user_id, value=1)
+        except IntegrityError:
+            # Created by a concurrent first write
+            SyncCounter.objects.filter(user_id=user_id).update(value=F('value') + 1)
+    return SyncCounter.objects.filter(user_id=user_id).values_list('value', flat=True).get()
+
+
+def current_seq():
+    """The row owner's current sequence number, as an expression for queryset.update()."""
+    counter = SyncCounter.objects.filter(user_id=OuterRef('user_id')).values('value')[:1]
+    return Coalesce(Subquery(counter), Value(0))
+
+
+def touched():
+    """
+    Field values for an UPDATE that bypasses save(): auto_now is skipped, and
+    the rows take the sequence number advance() gave this transaction.
+    """
+    return {'updated_at': timezone.now(), 'change_seq': current_seq()}
+
+
+def record_deletes(user_id, seq, model, pks):
+    Tombstone.objects.bulk_create(
+        Tombstone(user_id=user_id, model_name=model._meta.model_name, object_id=pk, change_seq=seq)
+        for pk in pks
+    )
+
+
+def record_delete(instance, seq):
+    """Tombstones for instance and the rows its deletion cascades to. Call before deleting."""
+    record_deletes(instance.user_id, seq, type(instance), [instance.pk])
+    for model, field in CASCADES.get(type(instance), ()):
+        pks = model.objects.filter(**{field: instance}).values_list('pk', flat=True)
+        record_deletes(instance.user_id, seq, model, list(pks))
+
+
+def prune(before):
+    """
+    Delete tombstones older than `before` and return how many. Sync tokens
+    from before the newest pruned tombstone of a user expire.
+    """
+    old = Tombstone.objects.filter(deleted_at__lt=before)
+    with transaction.atomic():
+        for row in old.values('user_id').annotate(through=Max('change_seq')).order_by():
+            SyncCounter.objects.filter(user_id=row['user_id'], pruned_through__lt=row['through']).update(
+                pruned_through=row['through']
+            )
+        count, _ = old.delete()
+    return count
+
+
+def encode_token(key):
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    """(change_seq, section index, pk) of the last change a client has seen. Raises InvalidSyncToken."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidSyncToken(token)
+    if not (isinstance(key, list) and len(key) == 3 and all(type(value) is int for value in key)):
+        raise InvalidSyncToken(token)
+    return tuple(key)
+
+
+def after(key, index):
+    """Rows of section `index` that come after `key` in (change_seq, section, pk) order."""
+    seq, key_index, pk = key
+    if index < key_index:
+        return Q(change_seq__gt=seq)
+    if index > key_index:
+        return Q(change_seq__gte=seq)
+    return Q(change_seq__gt=seq) | Q(change_seq=seq, pk__gt=pk)
+
+
+def token_expired(user, key):
+    pruned = SyncCounter.objects.filter(user_id=user.pk).values_list('pruned_through', flat=True).first()
+    return bool(pruned) and key[0] <= pruned
+
+
+def changes(user, key=START, limit=500):
+    """
+    Up to `limit` changes after `key`, as
+    (rows by section, deleted ids by section, last key, has_more).
+    Each source is read up to limit + 1 rows in (change_seq, pk) order and
+    the sources are merged; the look-ahead row tells whether more remain.
+    """
+    sources = [model.objects.for_user(user) for _, model in KINDS] + [Tombstone.objects.for_user(user)]
+    streams = []
+    for index, queryset in enumerate(sources):
+        rows = queryset.filter(after(key, index)).order_by('change_seq', 'pk')[:limit + 1]
+        streams.append([((row.change_seq, index, row.pk), row) for row in rows])
+    merged = list(heapq.merge(*streams, key=lambda item: item[0]))
+    page = merged[:limit]
+    rows = {name: [] for name, _ in KINDS}
+    deleted = {name: [] for name, _ in KINDS}
+    for (_, index, _), row in page:
+        if index == DELETED:
+            deleted[SECTIONS[row.model_name]].append(row)
+        else:
+            rows[KINDS[index][0]].append(row)
+    # A tombstone is stale if its id is in use again (SQLite can reuse the highest id)
+    for name, _ in KINDS:
+        live = {row.pk for row in rows[name]}
+        deleted[name] = sorted({t.object_id for t in deleted[name] if t.object_id not in live})
+    last_key = page[-1][0] if page else key
+    return rows, deleted, last_key, len(merged) > limit
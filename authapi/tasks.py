@@ -0,0 +1,76 @@
+"""
+A minimal background task queue with pluggable backends.
+
+settings.TASK_BACKEND names the backend class. Each backend implements
+submit(func, *args, **kwargs). func must be a module-level function, because
+the process backend pickles it. Tasks run after the current database
+transaction commits, so they always see the rows that scheduled them.
+
+ThreadPoolBackend    - worker threads in the web process (default)
+ProcessPoolBackend   - worker processes, for CPU-heavy tasks
+ImmediateBackend     - runs the task inline; for tests and management commands
+"""
+import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def run_task(func, *args, **kwargs):
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        logger.exception('Background task %s failed', func.__name__)
+    finally:
+        # Worker threads/processes outlive requests; don't leave connections open
+        connections.close_all()
+
+
+def init_process_worker():
+    import django
+    django.setup()
+    # A forked worker must not use (or close) the parent's database connections
+    for conn in connections.all(initialized_only=True):
+        conn.connection = None
+
+
+class ImmediateBackend:
+    def __init__(self, workers=None):
+        pass
+
+    def submit(self, func, *args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            logger.exception('Background task %s failed', func.__name__)
+
+
+class ThreadPoolBackend:
+    def __init__(self, workers=2):
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix='authapi-task')
+
+    def submit(self, func, *args, **kwargs):
+        return self.executor.submit(run_task, func, *args, **kwargs)
+
+
+class ProcessPoolBackend(ThreadPoolBackend):
+    def __init__(self, workers=2):
+        self.executor = ProcessPoolExecutor(workers, initializer=init_process_worker)
+
+
+_backends = {}
+
+
+def get_backend():
+    path = getattr(settings, 'TASK_BACKEND', 'authapi.tasks.ThreadPoolBackend')
+    if path not in _backends:
+        _backends[path] = import_string(path)(getattr(settings, 'TASK_WORKERS', 2))
+    return _backends[path]
+
+
+def enqueue(func, *args, **kwargs):
+    """Run func(*args, **kwargs) on the configured backend once the current transaction commits."""
+    transaction.on_commit(lambda: get_backend().submit(func, *args, **kwargs))
@@ -1,3 +1,1302 @@
-from django.test import TestCase
+import base64
+import datetime
+import gzip
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from asgiref.sync import async_to_sync, sync_to_async
+import contextlib
+from contextlib import contextmanager
+from decimal import Decimal
+from io import BytesIO, StringIO
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from django.utils.http import http_date
+from django.test import AsyncClient, RequestFactory, TestCase, TransactionTestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection, connections, transaction
+from django.db.models import F, Sum
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from PIL import Image
+from .models import Account, Category, Transaction, MonthlyRollup, UserProfile
+from . import exports, ledger, metrics, passwords, photos, readers, rollups, search, sync
+from .services import AccountService, CategoryService, TransactionService
+from .reports import monthly_totals
+from .pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, get_page_size
+from .ratelimit import SlidingWindowRateLimiter
+from .serializers import AccountSerializer, LoginTokenSerializer
+from .authentication import ClaimsUser, RevocationCache
+from .db import configure_connection
+from .middleware import CompressionMiddleware, accepted_encodings, brotli
+from .renderers import ORJSONParser, ORJSONRenderer
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import AccessToken
 
 # Create your tests here.
+
+
+def setUpModule():
+    # Lock waits in the concurrency tests are slow on purpose; keep them out of the
+    # test output. assertLogs still captures the logger where a test checks it.
+    unittest.enterModuleContext(
+        mock.patch.object(logging.getLogger('authapi.slow_queries'), 'handlers', [logging.NullHandler()])
+    )
+
+
+def clear_caches():
+    # Rate limit counters and cached responses outlive each test's rolled-back data
+    caches['ratelimit'].clear()
+    caches['responses'].clear()
+
+
+# Query budgets below are those of a responses cache shared by all workers
+# (REDIS_URL), where a cache hit reads no sequence number from the database
+shared_response_cache = override_settings(RESPONSE_CACHE_SHARED=True)
+
+
+class QueryBudgetMixin:
+    """Test helpers for holding an endpoint to a fixed number of database queries."""
+
+    @contextmanager
+    def assertMaxQueries(self, maximum):
+        with CaptureQueriesContext(connection) as ctx:
+            yield ctx
+        executed = len(ctx.captured_queries)
+        if executed > maximum:
+            queries = '\n'.join(q['sql'] for q in ctx.captured_queries)
+            self.fail(f'{executed} queries executed, expected at most {maximum}:\n{queries}')
+
+
+class AuthClientMixin:
+    def api_client(self, username, password='pw12345!'):
+        token = Client().post('/api/login/', {'username': username, 'password': password}).json()['access']
+        return Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def session_client(self, username, password='pw12345!'):
+        client = Client()
+        client.post('/api/login-page/', {'username': username, 'password': password})
+        return client
+
+
+class FinanceFixtureMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', password='pw12345!')
+        cls.other = User.objects.create_user('bob', password='pw12345!')
+        cls.account = Account.objects.create(user=cls.user, name='Wallet', type='cash')
+        cls.category = Category.objects.create(user=cls.user, name='Food', type='expense')
+        other_account = Account.objects.create(user=cls.other, name='Bank', type='bank')
+        other_category = Category.objects.create(user=cls.other, name='Rent', type='expense')
+        for day in range(1, 11):
+            Transaction.objects.create(user=cls.user, account=cls.account, category=cls.category,
+                                       amount=day, date=datetime.date(2024, 1, day))
+            Transaction.objects.create(user=cls.other, account=other_account, category=other_category,
+                                       amount=day, date=datetime.date(2024, 1, day))
+
+
+class QueryPlanTests(FinanceFixtureMixin, TestCase):
+    """The composite indexes from migration 0004 are chosen for the per-user access patterns."""
+
+    def assertUsesIndex(self, queryset, index_name):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Query plan assertions are written against SQLite EXPLAIN QUERY PLAN output')
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, plan)
+
+    def test_transaction_list_uses_user_date_index(self):
+        qs = Transaction.objects.for_user(self.user).order_by('-date', '-id')
+        self.assertUsesIndex(qs, 'txn_user_date_idx')
+
+    def test_transaction_account_filter_uses_user_account_date_index(self):
+        qs = Transaction.objects.for_user(self.user).filter(
+            account=self.account, date__gte=datetime.date(2024, 1, 5))
+        self.assertUsesIndex(qs, 'txn_user_account_date_idx')
+
+    def test_transaction_category_filter_uses_user_category_date_index(self):
+        qs = Transaction.objects.for_user(self.user).filter(
+            category=self.category, date__gte=datetime.date(2024, 1, 5))
+        self.assertUsesIndex(qs, 'txn_user_category_date_idx')
+
+    def test_account_and_category_type_filters_use_user_type_index(self):
+        self.assertUsesIndex(Account.objects.for_user(self.user).filter(type='cash'), 'account_user_type_idx')
+        self.assertUsesIndex(Category.objects.for_user(self.user).filter(type='expense'), 'category_user_type_idx')
+
+    def test_transaction_amount_filter_uses_user_amount_index(self):
+        qs = Transaction.objects.for_user(self.user).filter(amount__gte=5).order_by('-amount', '-id')
+        self.assertUsesIndex(qs, 'txn_user_amount_idx')
+
+
+class UserScopingTests(FinanceFixtureMixin, TestCase):
+    def test_service_queryset_only_returns_own_rows(self):
+        rows = TransactionService(self.user).get_queryset()
+        self.assertEqual(rows.count(), 10)
+        self.assertFalse(rows.exclude(user=self.user).exists())
+
+
+class ServiceLayerTests(AuthClientMixin, FinanceFixtureMixin, TestCase):
+    """The API viewsets and the HTML CRUD views share authapi.services."""
+
+    def setUp(self):
+        clear_caches()
+
+    @contextmanager
+    def spy(self, service_class, *names):
+        """Record calls to service_class methods while still running them."""
+        with contextlib.ExitStack() as stack:
+            yield {name: stack.enter_context(mock.patch.object(
+                service_class, name, autospec=True, side_effect=getattr(service_class, name)
+            )) for name in names}
+
+    def test_other_users_objects_are_not_found(self):
+        txn = Transaction.objects.filter(user=self.other).first()
+        objects = {'accounts': txn.account, 'categories': txn.category, 'transactions': txn}
+        api, html = self.api_client('alice'), self.session_client('alice')
+        for resource, obj in objects.items():
+            self.assertEqual(api.get(f'/api/{resource}/{obj.pk}/').status_code, 404, resource)
+            self.assertEqual(api.patch(f'/api/{resource}/{obj.pk}/', {'name': 'x', 'amount': '1.00'},
+                                       content_type='application/json').status_code, 404, resource)
+            self.assertEqual(api.delete(f'/api/{resource}/{obj.pk}/').status_code, 404, resource)
+            self.assertEqual(html.get(f'/api/crud/{resource}/{obj.pk}/edit/').status_code, 404, resource)
+            self.assertEqual(html.post(f'/api/crud/{resource}/{obj.pk}/edit/', {'name': 'x'}).status_code, 404, resource)
+            self.assertEqual(html.post(f'/api/crud/{resource}/{obj.pk}/delete/').status_code, 404, resource)
+        txn.refresh_from_db()
+        self.assertEqual((txn.account.name, txn.category.name, txn.amount), ('Bank', 'Rent', Decimal('1.00')))
+
+    def test_html_forms_show_validation_errors(self):
+        client = self.session_client('alice')
+        response = client.post('/api/crud/accounts/create/', {'name': 'Savings', 'type': 'vault', 'opening_balance': '0'})
+        self.assertContains(response, 'is not a valid choice')
+        self.assertFalse(Account.objects.filter(name='Savings').exists())
+        txn = Transaction.objects.for_user(self.user).first()
+        response = client.post(f'/api/crud/transactions/{txn.pk}/edit/', {
+            'account': self.account.pk, 'category': self.category.pk, 'amount': 'lots', 'date': '2024-01-01',
+            'description': 'Kept in the form',
+        })
+        self.assertContains(response, 'A valid number is required')
+        self.assertContains(response, 'Kept in the form')
+        # The account <select> is still filled in
+        self.assertContains(response, 'Wallet')
+        self.assertEqual(Transaction.objects.get(pk=txn.pk).description, '')
+
+    def test_html_writes_go_through_the_service(self):
+        client = self.session_client('alice')
+        data = {'account': self.account.pk, 'category': self.category.pk, 'amount': '5.00', 'date': '2024-02-01',
+                'description': ''}
+        with self.spy(TransactionService, 'perform_create', 'perform_update', 'perform_destroy') as calls:
+            self.assertRedirects(client.post('/api/crud/transactions/create/', data),
+                                 '/api/crud/transactions/', fetch_redirect_response=False)
+            txn = Transaction.objects.get(date=datetime.date(2024, 2, 1))
+            client.post(f'/api/crud/transactions/{txn.pk}/edit/', {**data, 'amount': '7.00'})
+            client.post(f'/api/crud/transactions/{txn.pk}/delete/')
+        self.assertEqual([calls[name].call_count for name in calls], [1, 1, 1])
+        self.assertFalse(Transaction.objects.filter(pk=txn.pk).exists())
+        # The service moved the balance with each write and back out with the delete
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('0.00'))
+
+    def test_api_writes_go_through_the_service(self):
+        client = self.api_client('alice')
+        with self.spy(AccountService, 'perform_create', 'perform_update', 'perform_destroy') as calls:
+            response = client.post('/api/accounts/', {'name': 'Savings', 'type': 'bank', 'opening_balance': '10.00'},
+                                   content_type='application/json')
+            self.assertEqual(response.status_code, 201)
+            pk = response.json()['id']
+            client.patch(f'/api/accounts/{pk}/', {'opening_balance': '12.50'}, content_type='application/json')
+            self.assertEqual(Account.objects.get(pk=pk).balance, Decimal('12.50'))
+            self.assertEqual(client.delete(f'/api/accounts/{pk}/').status_code, 204)
+        self.assertEqual([calls[name].call_count for name in calls], [1, 1, 1])
+        self.assertFalse(Account.objects.filter(pk=pk).exists())
+
+
+@shared_response_cache
+class TransactionListQueryTests(QueryBudgetMixin, AuthClientMixin, FinanceFixtureMixin, TestCase):
+    """Listing transactions costs the same number of queries whatever the page size."""
+
+    def setUp(self):
+        clear_caches()
+
+    def test_api_list_query_count_is_constant(self):
+        client = self.api_client('alice')
+        for page_size in (2, 10):
+            # revocation check (first request only) + validators + one joined page query
+            with self.assertMaxQueries(3):
+                response = client.get(f'/api/transactions/?page_size={page_size}')
+            self.assertEqual(len(response.json()['results']), page_size)
+        row = response.json()['results'][0]
+        self.assertEqual((row['account_name'], row['category_name']), ('Wallet', 'Food'))
+
+    def test_api_retrieve_query_count(self):
+        client = self.api_client('alice')
+        pk = Transaction.objects.for_user(self.user).first().pk
+        with self.assertMaxQueries(3):
+            response = client.get(f'/api/transactions/{pk}/')
+        self.assertEqual(response.json()['account_name'], 'Wallet')
+
+    def test_html_list_query_count_is_constant(self):
+        client = self.session_client('alice')
+        for page_size in (2, 10):
+            # session + revocation check (first request only) + validators + one joined page query
+            with self.assertMaxQueries(4):
+                response = client.get(f'/api/crud/transactions/?page_size={page_size}')
+            self.assertContains(response, 'Wallet', count=page_size)
+
+
+class PaginationTests(AuthClientMixin, FinanceFixtureMixin, TestCase):
+    """Keyset cursors (authapi.pagination): round trips, ties on the ordering column, bad cursors."""
+
+    def setUp(self):
+        clear_caches()
+
+    def cursor(self, payload):
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+    def test_next_and_previous_links_round_trip(self):
+        client = self.api_client('alice')
+        pages = [client.get('/api/transactions/?page_size=3').json()]
+        self.assertIsNone(pages[0]['previous'])
+        while pages[-1]['next']:
+            pages.append(client.get(pages[-1]['next']).json())
+        self.assertEqual([len(page['results']) for page in pages], [3, 3, 3, 1])
+        ids = [row['id'] for page in pages for row in page['results']]
+        expected = Transaction.objects.for_user(self.user).order_by('-date', '-id').values_list('id', flat=True)
+        self.assertEqual(ids, list(expected))
+        page = pages[-1]
+        for earlier in reversed(pages[:-1]):
+            page = client.get(page['previous']).json()
+            self.assertEqual(page['results'], earlier['results'])
+        self.assertIsNone(page['previous'])
+
+    def test_ties_on_the_ordering_column_are_paged_once(self):
+        for _ in range(7):
+            Transaction.objects.create(user=self.user, account=self.account, category=self.category,
+                                       amount=5, date=datetime.date(2024, 1, 5))
+        service = TransactionService(self.user)
+        expected = list(service.get_queryset().order_by('-date', '-id').values_list('id', flat=True))
+        pages, cursor = [], None
+        while True:
+            rows, cursor, previous = service.page_data(cursor, page_size=2)
+            pages.append([row['id'] for row in rows])
+            if cursor is None:
+                break
+        self.assertEqual([pk for page in pages for pk in page], expected)
+        for page in reversed(pages[:-1]):
+            rows, _, previous = service.page_data(previous, page_size=2)
+            self.assertEqual([row['id'] for row in rows], page)
+        self.assertIsNone(previous)
+
+    def test_invalid_cursors_are_bad_requests(self):
+        service = TransactionService(self.user)
+        _, valid, _ = service.page_data(page_size=2)
+        bad = ['garbage!', valid[:-3] + 'xyz', self.cursor([None, None]), self.cursor(['2024-01-01', None]),
+               self.cursor({'before': [None, 1]}), self.cursor(['2024-01-01']), self.cursor(['2024-13-01', 1]),
+               self.cursor({'after': ['2024-01-01', 1]}), self.cursor('2024-01-01')]
+        for cursor in bad:
+            with self.assertRaises(InvalidCursor, msg=cursor):
+                service.page_data(cursor)
+        client = self.api_client('alice')
+        for path in (f'/api/accounts/?cursor={self.cursor([None])}',
+                     f'/api/transactions/?cursor={self.cursor([None, None])}',
+                     f'/api/transactions/?cursor={self.cursor(["2024-01-01", None])}',
+                     '/api/transactions/?cursor=garbage!'):
+            response = client.get(path)
+            self.assertEqual(response.status_code, 400, path)
+            self.assertEqual(response.json(), {'cursor': ['Invalid cursor.']})
+        response = self.session_client('alice').get(f'/api/crud/transactions/?cursor={self.cursor([None, None])}')
+        self.assertEqual(response.status_code, 400)
+
+    def test_page_size_is_capped(self):
+        self.assertEqual(get_page_size({'page_size': '100000'}), MAX_PAGE_SIZE)
+        self.assertEqual(get_page_size({'page_size': '0'}), 1)
+        self.assertEqual(get_page_size({'page_size': 'many'}), DEFAULT_PAGE_SIZE)
+        response = self.api_client('alice').get('/api/transactions/?page_size=100000')
+        self.assertEqual(len(response.json()['results']), 10)
+        self.assertIsNone(response.json()['next'])
+        with mock.patch('authapi.pagination.MAX_PAGE_SIZE', 4):
+            response = self.api_client('alice').get('/api/transactions/?page_size=99999')
+        self.assertEqual(len(response.json()['results']), 4)
+
+
+@shared_response_cache
+class StatelessAuthTests(QueryBudgetMixin, AuthClientMixin, FinanceFixtureMixin, TestCase):
+    def setUp(self):
+        clear_caches()
+
+    def test_authenticated_requests_skip_user_lookup(self):
+        client = self.api_client('alice')
+        client.get('/api/protected/')
+        with self.assertNumQueries(0):
+            response = client.get('/api/protected/')
+        self.assertEqual(response.json()['message'], 'Hello, alice! This is a protected route.')
+        # Conditional GET validators + page, no user lookup
+        with self.assertMaxQueries(2):
+            response = client.get('/api/transactions/')
+        self.assertEqual(len(response.json()['results']), 10)
+
+    def test_password_change_revokes_tokens(self):
+        client = self.api_client('alice')
+        self.assertEqual(client.get('/api/protected/').status_code, 200)
+        self.user.set_password('new-pw12345!')
+        self.user.save()
+        self.assertEqual(client.get('/api/protected/').status_code, 401)
+
+    def test_claims_user_loads_real_user_lazily(self):
+        user = ClaimsUser(AccessToken.for_user(self.user))
+        with self.assertNumQueries(0):
+            self.assertEqual((user.pk, user.is_authenticated), (self.user.pk, True))
+        with self.assertNumQueries(1):
+            self.assertEqual(user.date_joined, self.user.date_joined)
+
+    def test_revocation_cache_is_lru_with_ttl(self):
+        now = [0.0]
+        cache = RevocationCache(maxsize=2, ttl=10, clock=lambda: now[0])
+        cache.set(1, 'a')
+        cache.set(2, 'b')
+        cache.get(1)
+        cache.set(3, 'c')
+        self.assertEqual((cache.get(1), cache.get(2), cache.get(3)), ('a', None, 'c'))
+        now[0] = 10
+        self.assertIsNone(cache.get(1))
+
+
+class RateLimiterTests(AuthClientMixin, TestCase):
+    def setUp(self):
+        clear_caches()
+        self.now = 1000 * 60.0
+        self.limiter = SlidingWindowRateLimiter(limit=3, period=60, clock=lambda: self.now)
+
+    def test_window_is_not_reset_by_each_hit(self):
+        results = [self.limiter.hit('k') for _ in range(4)]
+        self.assertEqual([r.allowed for r in results], [True, True, True, False])
+        self.assertEqual(results[-1].retry_after, 60)
+        self.now += 90
+        # Half of the previous window still counts: 3 * 0.5 + 1 <= 3
+        self.assertTrue(self.limiter.hit('k').allowed)
+        self.assertFalse(self.limiter.hit('k').allowed)
+
+    def test_api_returns_retry_after_header(self):
+        User.objects.create_user('carol', password='pw12345!')
+        client = self.api_client('carol')
+        for _ in range(5):
+            client.get('/api/protected/')
+        response = client.get('/api/protected/')
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(int(response['Retry-After']) >= 1)
+
+    def test_html_login_and_register_pages_are_rate_limited(self):
+        # Each login post hashes a password; a real clock could cross into the next window
+        self.enterContext(mock.patch('authapi.ratelimit.wall_clock', lambda: self.now))
+        for path, data in (('/api/login-page/', {'username': 'carol', 'password': 'wrong'}),
+                           ('/api/register-page/', {'username': '', 'password': 'pw12345!'})):
+            clear_caches()  # both pages count against the same per-IP limit as /api/login/ and /api/register/
+            client = Client()
+            statuses = [client.post(path, data).status_code for _ in range(11)]
+            self.assertEqual(statuses, [200] * 10 + [429], path)
+            response = client.post(path, data)
+            self.assertContains(response, 'Too many attempts', status_code=429)
+            self.assertEqual(response['Content-Type'], 'text/html; charset=utf-8')
+            self.assertTrue(int(response['Retry-After']) >= 1)
+
+    def test_html_pages_render_a_busy_hashing_pool(self):
+        User.objects.create_user('carol', password='pw12345!')
+        pool = passwords.HashPool(workers=1, queue_size=0)
+        pool.slots.acquire()
+        with mock.patch.object(passwords, '_pool', pool):
+            login = Client().post('/api/login-page/', {'username': 'carol', 'password': 'pw12345!'})
+            register = Client().post('/api/register-page/',
+                                     {'username': 'dave', 'email': 'dave@example.com', 'password': 'pw12345!'})
+        for response in (login, register):
+            self.assertContains(response, 'Too many logins in progress', status_code=429)
+            self.assertEqual(response['Retry-After'], '1')
+        self.assertFalse(User.objects.filter(username='dave').exists())
+
+
+class MonthlyReportTests(AuthClientMixin, FinanceFixtureMixin, TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = self.api_client('alice')
+
+    def report(self, query):
+        response = self.client.get(f'/api/reports/monthly/?{query}')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_invalid_queries_are_rejected(self):
+        response = self.client.get('/api/reports/monthly/?group_by=category,payee')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('payee', response.json()['group_by'][0])
+        response = self.client.get('/api/reports/monthly/?start=2024-02-01&end=2024-01-01')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'non_field_errors': ['start must be on or before end.']})
+
+    def test_partial_months_aggregate_transactions(self):
+        # The fixture wrote no rollups, so these totals can only come from the Transaction table
+        TransactionService(self.user).create({'account': self.account.id, 'category': self.category.id,
+                                              'amount': '7.25', 'date': '2024-02-10', 'is_income': True})
+        rows = self.report('start=2024-01-03&end=2024-02-15&group_by=is_income')
+        self.assertEqual(rows, [
+            {'month': '2024-01', 'is_income': False, 'total': '52.00', 'count': 8},
+            {'month': '2024-02', 'is_income': True, 'total': '7.25', 'count': 1},
+        ])
+        with self.assertNumQueries(1):
+            list(monthly_totals(self.user, datetime.date(2024, 1, 3), datetime.date(2024, 1, 5)))
+
+    def test_reports_only_cover_the_users_transactions(self):
+        call_command('rebuild_rollups', stdout=StringIO())
+        for query in ('group_by=account,category', 'start=2024-01-02&group_by=account,category'):
+            rows = self.report(query)
+            self.assertEqual([(row['account_name'], row['category_name']) for row in rows], [('Wallet', 'Food')])
+            self.assertEqual(rows[0]['count'], 10 if query.startswith('group_by') else 9)
+
+
+class MonthlyRollupTests(AuthClientMixin, FinanceFixtureMixin, TestCase):
+    def setUp(self):
+        clear_caches()
+
+    def test_api_writes_keep_rollups_in_step(self):
+        call_command('rebuild_rollups', stdout=StringIO())
+        client = self.api_client('alice')
+        created = client.post('/api/transactions/', {
+            'account': self.account.id, 'category': self.category.id,
+            'amount': '4.50', 'date': '2024-02-03', 'is_income': False,
+        }, content_type='application/json').json()
+        client.patch(f"/api/transactions/{created['id']}/", {'amount': '6.00', 'is_income': True},
+                     content_type='application/json')
+        first = Transaction.objects.for_user(self.user).order_by('date').first()
+        client.delete(f'/api/transactions/{first.id}/')
+        self.assertEqual(rollups.verify(), {})
+        self.assertTrue(MonthlyRollup.objects.filter(user=self.user, month=datetime.date(2024, 2, 1),
+                                                     is_income=True, transaction_count=1).exists())
+
+    def test_whole_month_report_reads_rollups(self):
+        call_command('rebuild_rollups', stdout=StringIO())
+        client = self.api_client('alice')
+        rows = client.get('/api/reports/monthly/?start=2024-01-01&end=2024-01-31&group_by=account').json()
+        self.assertEqual(rows, [{'month': '2024-01', 'account': self.account.id, 'account_name': 'Wallet',
+                                 'total': '55.00', 'count': 10}])
+
+
+class AccountBalanceTests(FinanceFixtureMixin, TestCase):
+    def test_balance_follows_transaction_writes(self):
+        service = TransactionService(self.user)
+        self.assertEqual(ledger.reconcile(), 2)  # fixture rows were created without the service
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('-55.00'))
+        created = service.create({'account': self.account.id, 'category': self.category.id,
+                                  'amount': '100.00', 'date': '2024-02-01', 'is_income': True})
+        service.update(created.pk, {'amount': '80.00'}, partial=True)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('25.00'))
+        service.delete(created.pk)
+        CategoryService(self.user).delete(self.category.pk)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('0.00'))
+
+    def test_opening_balance_change_uses_the_stored_value(self):
+        ledger.reconcile()
+        service = AccountService(self.user)
+        stale = service.get(self.account.pk)
+        service.update(self.account.pk, {'opening_balance': '10.00'}, partial=True)
+        # A request that read the account before the update above committed
+        serializer = service.get_serializer(stale, data={'opening_balance': '4.00'}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        service.perform_update(serializer)
+        self.account.refresh_from_db()
+        self.assertEqual((self.account.opening_balance, self.account.balance), (Decimal('4.00'), Decimal('-51.00')))
+        self.assertEqual(ledger.expected_balances().exclude(balance=F('expected_balance')).count(), 0)
+
+    def test_reconcile_command_repairs_drift(self):
+        Account.objects.filter(pk=self.account.pk).update(balance=999)
+        with self.assertRaises(CommandError):
+            call_command('reconcile_balances', '--check', stdout=StringIO())
+        call_command('reconcile_balances', stdout=StringIO())
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('-55.00'))
+
+
+class MoneyFieldTests(AuthClientMixin, FinanceFixtureMixin, TestCase):
+    """Amounts are stored as integer cents (authapi.money) and read back as the same Decimals."""
+
+    def test_amounts_are_stored_in_cents(self):
+        txn = Transaction.objects.create(user=self.user, account=self.account, category=self.category,
+                                         amount=Decimal('12.34'), date=datetime.date(2024, 2, 1))
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT amount FROM authapi_transaction WHERE id = %s', [txn.pk])
+            self.assertEqual(cursor.fetchone()[0], 1234)
+        txn.refresh_from_db()
+        self.assertEqual(str(txn.amount), '12.34')
+        self.assertEqual(Transaction.objects.filter(amount__gte=Decimal('12.34')).get(), txn)
+        self.assertEqual(self.api_client('alice').get(f'/api/transactions/{txn.pk}/').json()['amount'], '12.34')
+
+    def test_sql_arithmetic_stays_in_cents(self):
+        ledger.reconcile()
+        service = TransactionService(self.user)
+        for _ in range(3):
+            service.create({'account': self.account.id, 'category': self.category.id,
+                            'amount': '0.10', 'date': '2024-02-01', 'is_income': True})
+        AccountService(self.user).update(self.account.pk, {'opening_balance': '10.05'}, partial=True)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('-44.65'))
+        self.assertEqual(ledger.expected_balances().exclude(balance=F('expected_balance')).count(), 0)
+        self.assertEqual(MonthlyRollup.objects.get(month=datetime.date(2024, 2, 1)).total_amount, Decimal('0.30'))
+        total = Transaction.objects.filter(date__month=2).aggregate(total=Sum('amount'))['total']
+        self.assertEqual(str(total), '0.30')
+
+
+class AccountBalanceConcurrencyTests(TransactionTestCase):
+    """Parallel writes against one account must not lose balance updates."""
+
+    def test_parallel_creates_update_balance_atomically(self):
+        user = User.objects.create_user('dave', password='pw12345!')
+        account = Account.objects.create(user=user, name='Shared', type='bank')
+        category = Category.objects.create(user=user, name='Misc', type='expense')
+        start = threading.Barrier(8)
+
+        def write(i):
+            try:
+                if connection.vendor == 'sqlite':
+                    # Writers queue for SQLite's single write lock; a lost update or a
+                    # lock wait past this bound fails the test rather than being retried
+                    with connection.cursor() as cursor:
+                        cursor.execute('PRAGMA busy_timeout = 10000')
+                if i < 8:
+                    start.wait(timeout=10)
+                TransactionService(user).create({
+                    'account': account.id, 'category': category.id,
+                    'amount': '1.00', 'date': '2024-03-01', 'is_income': i % 2 == 0,
+                })
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(write, range(40)))
+        account.refresh_from_db()
+        self.assertEqual(Transaction.objects.filter(account=account).count(), 40)
+        self.assertEqual(account.balance, Decimal('0.00'))
+        self.assertEqual(ledger.expected_balances().get(pk=account.pk).expected_balance, account.balance)
+
+
+class BulkTransactionTests(QueryBudgetMixin, AuthClientMixin, FinanceFixtureMixin, TestCase):
+    def setUp(self):
+        clear_caches()
+        ledger.reconcile()
+        rollups.rebuild()
+
+    def item(self, **overrides):
+        return {'account': self.account.id, 'category': self.category.id, 'amount': '2.00',
+                'date': '2024-04-01', 'is_income': False, **overrides}
+
+    def test_bulk_write_reports_per_item_errors(self):
+        client = self.api_client('alice')
+        first, second = Transaction.objects.for_user(self.user).order_by('id')[:2]
+        foreign = Transaction.objects.for_user(self.other).first()
+        payload = {
+            'create': [self.item() for _ in range(300)] + [self.item(amount='abc')],
+            'update': [{'id': first.id, 'amount': '7.00', 'is_income': True}, {'id': foreign.id, 'amount': '1'}],
+            'delete': [second.id, second.id],
+        }
+        with self.assertMaxQueries(30):
+            response = client.post('/api/transactions/bulk/', payload, content_type='application/json')
+        self.assertEqual(response.status_code, 207)
+        body = response.json()
+        self.assertEqual((len(body['created']), body['updated'], body['deleted']), (300, [first.id], [second.id]))
+        self.assertEqual([(e['op'], e['index']) for e in body['errors']],
+                         [('create', 300), ('update', 1), ('delete', 1)])
+        self.assertEqual(ledger.expected_balances().exclude(balance=F('expected_balance')).count(), 0)
+        self.assertEqual(rollups.verify(), {})
+
+    def test_batch_size_is_capped(self):
+        client = self.api_client('alice')
+        with self.settings(TRANSACTION_BULK_MAX_ITEMS=2):
+            response = client.post('/api/transactions/bulk/', {'create': [self.item()] * 3},
+                                   content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class TransactionImportTests(AuthClientMixin, FinanceFixtureMixin, TestCase):
+    CSV = (
+        'date,amount,description,category\n'
+        '2024-05-01,-12.50,Groceries,food\n'
+        '2024-05-02,1000,Salary,\n'
+        '2024-05-03,abc,Broken,\n'
+        '2024-05-04,-3,Coffee,Unknown\n'
+    )
+    OFX = (
+        '<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>\n'
+        '<STMTTRN>\n<TRNTYPE>DEBIT\n<DTPOSTED>20240506120000\n<TRNAMT>-7.25\n<NAME>Bakery\n</STMTTRN>\n'
+        '<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240507<TRNAMT>20.00<NAME>Refund</STMTTRN>\n'
+        '</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n'
+    )
+
+    def setUp(self):
+        clear_caches()
+        rollups.rebuild()
+
+    def upload(self, client, name, content):
+        return client.post('/api/transactions/import/', {
+            'file': SimpleUploadedFile(name, content.encode()),
+            'account': self.account.id, 'category': self.category.id,
+        })
+
+    def test_csv_import_reports_errors_and_skips_duplicates(self):
+        client = self.api_client('alice')
+        body = self.upload(client, 'statement.csv', self.CSV).json()
+        self.assertEqual((body['created'], body['duplicates'], body['error_count']), (2, 0, 2))
+        self.assertEqual([e['line'] for e in body['errors']], [4, 5])
+        salary = Transaction.objects.get(user=self.user, description='Salary')
+        self.assertEqual((salary.amount, salary.is_income), (Decimal('1000.00'), True))
+        body = self.upload(client, 'statement.csv', self.CSV).json()
+        self.assertEqual((body['created'], body['duplicates']), (0, 2))
+        self.assertEqual(rollups.verify(), {})
+
+    def test_csv_rows_with_extra_fields_are_reported(self):
+        csv_text = (
+            'date,amount,description\n'
+            '2024-05-01,-1,Tea\n'
+            '2024-05-02,-2,Milk,extra,fields\n'
+            '2024-05-03,-3,Bread\n'
+        )
+        response = self.upload(self.api_client('alice'), 'statement.csv', csv_text)
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual((body['created'], body['error_count']), (2, 1))
+        self.assertEqual(body['errors'], [{'line': 3, 'error': 'Expected 3 fields, got 5.'}])
+
+    def test_ofx_import(self):
+        body = self.upload(self.api_client('alice'), 'statement.ofx', self.OFX).json()
+        self.assertEqual(body['created'], 2)
+        bakery = Transaction.objects.get(user=self.user, description='Bakery')
+        self.assertEqual((bakery.date, bakery.amount, bakery.is_income),
+                         (datetime.date(2024, 5, 6), Decimal('7.25'), False))
+
+
+class TransactionExportTests(AuthClientMixin, FinanceFixtureMixin, TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = self.api_client('alice')
+
+    def export(self, query=''):
+        response = self.client.get(f'/api/transactions/export/?{query}')
+        self.assertEqual(response.status_code, 200, response.content if not response.streaming else '')
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export_imports_back(self):
+        lines = self.export().splitlines()
+        self.assertEqual(lines[0], 'id,date,account_id,account,category_id,category,amount,is_income,description,'
+                                   'created_at')
+        first = Transaction.objects.for_user(self.user).get(date=datetime.date(2024, 1, 1))
+        self.assertTrue(lines[1].startswith(
+            f'{first.id},2024-01-01,{self.account.id},Wallet,{self.category.id},Food,1.00,false,,'))
+        copy = Account.objects.create(user=self.user, name='Copy', type='cash')
+        body = self.client.post('/api/transactions/import/', {
+            'file': SimpleUploadedFile('transactions.csv', '\n'.join(lines).encode()), 'account': copy.id,
+        }).json()
+        self.assertEqual((body['created'], body['error_count']), (10, 0))
+        columns = ('date', 'category', 'amount', 'is_income', 'description')
+        self.assertEqual(list(Transaction.objects.filter(account=copy).order_by('date').values_list(*columns)),
+                         list(Transaction.objects.filter(account=self.account).order_by('date').values_list(*columns)))
+
+    def test_ndjson_export_uses_api_field_names(self):
+        rows = [json.loads(line) for line in self.export('output=ndjson&end=2024-01-02').splitlines()]
+        self.assertEqual([row['date'] for row in rows], ['2024-01-01', '2024-01-02'])
+        self.assertEqual({k: rows[1][k] for k in ('account', 'account_name', 'category', 'category_name',
+                                                  'amount', 'is_income', 'description')},
+                         {'account': self.account.id, 'account_name': 'Wallet', 'category': self.category.id,
+                          'category_name': 'Food', 'amount': '2.00', 'is_income': False, 'description': ''})
+
+    def test_filters(self):
+        savings = Account.objects.create(user=self.user, name='Savings', type='bank')
+        Transaction.objects.create(user=self.user, account=savings, category=self.category,
+                                   amount=4, date=datetime.date(2024, 1, 4))
+        rows = [json.loads(line) for line in self.export('output=ndjson&start=2024-01-04&end=2024-01-05').splitlines()]
+        self.assertEqual([(row['date'], row['account_name']) for row in rows],
+                         [('2024-01-04', 'Wallet'), ('2024-01-04', 'Savings'), ('2024-01-05', 'Wallet')])
+        rows = [json.loads(line) for line in self.export(f'output=ndjson&account={savings.id}').splitlines()]
+        self.assertEqual([row['account'] for row in rows], [savings.id])
+        foreign = Account.objects.get(user=self.other)
+        response = self.client.get(f'/api/transactions/export/?account={foreign.id}')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('account', response.json())
+
+    def test_rows_are_encoded_as_the_response_is_read(self):
+        with mock.patch('authapi.exports.encode', autospec=True, side_effect=exports.encode) as encode:
+            response = self.client.get('/api/transactions/export/')
+            self.assertTrue(response.streaming)
+            self.assertEqual(encode.call_count, 0)
+            content = iter(response.streaming_content)
+            self.assertTrue(next(content).startswith(b'id,date,'))
+            next(content)
+            self.assertEqual(encode.call_count, 1)
+            self.assertEqual(len(list(content)), 9)
+            self.assertEqual(encode.call_count, 10)
+
+
+@override_settings(TASK_BACKEND='authapi.tasks.ImmediateBackend', PROFILE_THUMBNAIL_SIZES=(64,))
+class ProfilePhotoTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def post(self, name, content, content_type='image/jpeg'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Client().post('/api/register/', {
+                'username': 'erin', 'password': 'pw12345!', 'email': '',
+                'photo': SimpleUploadedFile(name, content, content_type=content_type),
+            })
+
+    def register(self, name, content, content_type='image/jpeg'):
+        self.assertEqual(self.post(name, content, content_type).status_code, 201)
+        return UserProfile.objects.get(user__username='erin')
+
+    def image(self, image_format):
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera Maker'
+        buffer = BytesIO()
+        Image.new('RGB', (300, 200), 'red').save(buffer, image_format, exif=exif)
+        return buffer.getvalue()
+
+    def test_photo_is_stripped_and_thumbnailed(self):
+        profile = self.register('me.jpg', self.image('JPEG'))
+        self.assertEqual(profile.photo_status, UserProfile.PHOTO_READY)
+        with Image.open(profile.photo.path) as original:
+            self.assertNotIn('exif', original.info)
+        self.assertRegex(profile.thumbnail_url(64), r'/thumbs/[0-9a-f]{32}\.jpg\.64\.webp$')
+        with profile.photo.storage.open(photos.thumbnail_name(profile.photo.name, 64)) as f, Image.open(f) as thumb:
+            self.assertEqual((thumb.format, thumb.size), ('WEBP', (64, 64)))
+
+    def test_file_name_comes_from_the_image_header(self):
+        # Not the client's name, extension or Content-Type
+        profile = self.register('../me.html', self.image('PNG'), content_type='text/html')
+        self.assertRegex(profile.photo.name, r'^user_photos/[0-9a-f]{32}\.png$')
+        self.assertEqual(profile.photo_status, UserProfile.PHOTO_READY)
+
+    def test_non_image_is_rejected(self):
+        response = self.post('me.png', b'not an image', content_type='image/png')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'photo': ['Only JPEG, PNG, and WebP images are allowed.']})
+        self.assertFalse(User.objects.filter(username='erin').exists())
+        self.assertFalse(os.listdir(settings.MEDIA_ROOT))
+
+    def test_undecodable_image_is_deleted_by_the_worker(self):
+        # A valid header with a truncated body gets past registration
+        profile = self.register('me.png', self.image('PNG')[:100], content_type='image/png')
+        self.assertEqual(profile.photo_status, UserProfile.PHOTO_FAILED)
+        self.assertFalse(profile.photo)
+        self.assertIsNone(profile.thumbnail_url(64))
+
+    def test_profile_endpoint_lists_thumbnails(self):
+        profile = self.register('me.webp', self.image('WEBP'))
+        client = AuthClientMixin().api_client('erin')
+        data = client.get('/api/profile/').json()
+        self.assertEqual((data['username'], data['photo_status']), ('erin', 'ready'))
+        self.assertEqual(data['photo_url'], profile.photo.url)
+        self.assertEqual(data['thumbnails'], {'64': profile.thumbnail_url(64)})
+        UserProfile.objects.filter(pk=profile.pk).update(photo_status=UserProfile.PHOTO_PENDING)
+        data = client.get('/api/profile/').json()
+        self.assertEqual((data['photo_url'], data['thumbnails']), (None, {}))
+
+
+class PasswordHashingTests(TestCase):
+    def setUp(self):
+        clear_caches()
+
+    def hashing(self, algorithm, iterations):
+        # Hasher instances are cached per PASSWORD_HASHERS value, so re-set it too
+        classes = settings.PASSWORD_HASHER_CLASSES
+        return override_settings(
+            PASSWORD_HASHERS=[classes[algorithm]] + [p for a, p in classes.items() if a != algorithm],
+            PASSWORD_HASH_COST={'pbkdf2_sha256': {'iterations': iterations}, 'scrypt': {'work_factor': 2 ** 10}},
+        )
+
+    def login(self):
+        return Client().post('/api/login/', {'username': 'frank', 'password': 'pw12345!'})
+
+    def test_login_rehashes_outdated_passwords(self):
+        with self.hashing('pbkdf2_sha256', 1000):
+            user = User.objects.create_user('frank', password='pw12345!')
+        with self.hashing('pbkdf2_sha256', 2000):
+            self.assertEqual(self.login().status_code, 200)
+            user.refresh_from_db()
+            self.assertTrue(user.password.startswith('pbkdf2_sha256$2000$'))
+        with self.hashing('scrypt', 2000):
+            self.assertEqual(self.login().status_code, 200)
+            user.refresh_from_db()
+            self.assertTrue(user.password.startswith('scrypt$'))
+            backend = passwords.PooledModelBackend()
+            self.assertEqual(async_to_sync(backend.aauthenticate)(None, username='frank', password='pw12345!'), user)
+
+    def test_full_hashing_pool_rejects_logins(self):
+        User.objects.create_user('frank', password='pw12345!')
+        pool = passwords.HashPool(workers=1, queue_size=0)
+        pool.slots.acquire()
+        with mock.patch.object(passwords, '_pool', pool):
+            response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+
+    def test_registration_hashes_outside_the_transaction(self):
+        depth = len(connection.atomic_blocks)
+        hashed_in = []
+
+        def hash_password(password):
+            hashed_in.append(len(connection.atomic_blocks))
+            return passwords.hash_password(password)
+
+        with mock.patch('authapi.serializers.hash_password', side_effect=hash_password):
+            response = Client().post('/api/register/', {'username': 'gina', 'password': 'pw12345!', 'email': ''})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(hashed_in, [depth])
+        self.assertTrue(User.objects.get(username='gina').check_password('pw12345!'))
+
+
+@override_settings(ROOT_URLCONF='finalproj.asgi_urls')
+class AsyncReadViewTests(FinanceFixtureMixin, TestCase):
+    def setUp(self):
+        clear_caches()
+        token = LoginTokenSerializer.get_token(self.user).access_token
+        self.client = AsyncClient(AUTHORIZATION=f'Bearer {token}')
+        self.sync_client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    async def test_reads_match_sync_views(self):
+        pk = (await Transaction.objects.for_user(self.user).afirst()).pk
+        for path in ('/api/protected/', '/api/accounts/', f'/api/transactions/{pk}/',
+                     '/api/transactions/?page_size=3'):
+            response = await self.client.get(path)
+            self.assertEqual(response.status_code, 200)
+            with override_settings(ROOT_URLCONF='finalproj.urls'):
+                expected = await sync_to_async(self.sync_client.get)(path)
+            self.assertEqual(response.json(), expected.json(), path)
+            if path != '/api/protected/':
+                self.assertEqual(response['ETag'], expected['ETag'], path)
+        next_page = await self.client.get(response.json()['next'])
+        self.assertEqual(len(next_page.json()['results']), 3)
+        previous_page = await self.client.get(next_page.json()['previous'])
+        self.assertEqual(previous_page.json()['results'], response.json()['results'])
+        self.assertEqual((await self.client.get('/api/transactions/?cursor=W251bGxd')).status_code, 400)
+
+    async def test_errors_and_writes(self):
+        client = self.client
+        self.assertEqual((await AsyncClient().get('/api/accounts/')).status_code, 401)
+        foreign = await Transaction.objects.for_user(self.other).afirst()
+        self.assertEqual((await client.get(f'/api/transactions/{foreign.pk}/')).status_code, 404)
+        response = await client.post('/api/categories/', {'name': 'Travel', 'type': 'expense'},
+                                     content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(await Category.objects.for_user(self.user).filter(name='Travel').aexists())
+
+
+class TransactionFilterTests(AuthClientMixin, FinanceFixtureMixin, TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = self.api_client('alice')
+        descriptions = ['Groceries at the market', 'Café latte', 'Market stall rent', 'Salary']
+        self.rows = list(Transaction.objects.for_user(self.user).order_by('date'))
+        for txn, description in zip(self.rows, descriptions):
+            txn.description = description
+            txn.save()
+
+    def ids(self, query, client=None):
+        response = (client or self.client).get(f'/api/transactions/?{query}')
+        self.assertEqual(response.status_code, 200, response.content)
+        return [row['id'] for row in response.json()['results']]
+
+    def test_filters_and_ordering(self):
+        day = {txn.date.day: txn.pk for txn in self.rows}
+        self.assertEqual(self.ids('start=2024-01-03&end=2024-01-05&ordering=date'), [day[3], day[4], day[5]])
+        self.assertEqual(self.ids('min_amount=8&ordering=-amount'), [day[10], day[9], day[8]])
+        self.assertEqual(self.ids('max_amount=2.50&ordering=amount'), [day[1], day[2]])
+        self.assertEqual(self.ids(f'account={self.account.pk}&is_income=false&page_size=2'), [day[10], day[9]])
+        other_account = Account.objects.for_user(self.other).get()
+        self.assertEqual(self.ids(f'account={other_account.pk}'), [])
+        # Cursors carry the chosen ordering
+        first = self.client.get('/api/transactions/?ordering=amount&page_size=4').json()
+        self.assertEqual([row['id'] for row in self.client.get(first['next']).json()['results']],
+                         [day[5], day[6], day[7], day[8]])
+
+    def test_search_uses_the_full_text_index_and_follows_writes(self):
+        self.assertEqual(self.ids('search=market'), [self.rows[2].pk, self.rows[0].pk])
+        self.assertEqual(self.ids('search=MAR groc'), [self.rows[0].pk])
+        self.assertEqual(self.ids('search=cafe'), [self.rows[1].pk])
+        # FTS query syntax is treated as words
+        self.assertEqual(self.ids('search=NOT "cafe'), [])
+        self.assertEqual(len(self.ids('search=*"')), 10)
+        service = TransactionService(self.user)
+        service.update(self.rows[3].pk, {'description': 'Farmers market'}, partial=True)
+        service.delete(self.rows[2].pk)
+        service.bulk_write({'create': [{
+            'account': self.account.pk, 'category': self.category.pk,
+            'amount': '1.00', 'date': '2024-02-01', 'description': 'Night market',
+        }]})
+        Transaction.objects.filter(pk=self.rows[0].pk).update(description='Groceries')
+        found = Transaction.objects.get(description='Night market').pk
+        self.assertEqual(list(search.matching(service.get_queryset(), 'market').order_by('-date')
+                              .values_list('pk', flat=True)), [found, self.rows[3].pk])
+        # Other users' rows never match
+        self.assertEqual(self.ids('search=market', self.api_client('bob')), [])
+
+    def test_invalid_filters_are_rejected(self):
+        for query in ('start=2024-02-01&end=2024-01-01', 'min_amount=5&max_amount=1',
+                      'ordering=description', 'is_income=maybe', 'account=x'):
+            response = self.client.get(f'/api/transactions/?{query}')
+            self.assertEqual(response.status_code, 400, query)
+
+    async def test_async_list_accepts_the_same_filters(self):
+        token = LoginTokenSerializer.get_token(self.user).access_token
+        client = AsyncClient(AUTHORIZATION=f'Bearer {token}')
+        for query in ('search=market&ordering=date', 'min_amount=3&max_amount=4'):
+            response = await client.get(f'/api/transactions/?{query}')
+            with override_settings(ROOT_URLCONF='finalproj.urls'):
+                expected = await sync_to_async(self.client.get)(f'/api/transactions/?{query}')
+            self.assertEqual(response.json(), expected.json(), query)
+        response = await client.get('/api/transactions/?ordering=bogus')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ordering', response.json())
+
+
+@shared_response_cache
+class DashboardTests(QueryBudgetMixin, AuthClientMixin, FinanceFixtureMixin, TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = self.api_client('alice')
+
+    def test_bundle_matches_the_resource_endpoints(self):
+        # revocation check + accounts + categories + transactions
+        with self.assertMaxQueries(4):
+            data = self.client.get('/api/dashboard/?recent=5').json()
+        self.assertEqual(data['accounts'], self.client.get('/api/accounts/').json()['results'])
+        self.assertEqual(data['categories'], self.client.get('/api/categories/').json()['results'])
+        self.assertEqual(data['transactions'], self.client.get('/api/transactions/?page_size=5').json()['results'])
+        self.assertEqual(data['balances'], [{'id': self.account.pk, 'name': 'Wallet', 'balance': '0.00'}])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/dashboard/?recent=5').json(), data)
+        TransactionService(self.user).delete(data['transactions'][0]['id'])
+        self.assertEqual(len(self.client.get('/api/dashboard/?recent=10').json()['transactions']), 9)
+
+    def test_fields_projection(self):
+        self.client.get('/api/protected/')
+        with self.assertNumQueries(1):
+            data = self.client.get('/api/dashboard/?fields=transactions.amount,transactions.date&recent=2').json()
+        self.assertEqual(data, {'transactions': [
+            {'amount': '10.00', 'date': '2024-01-10'}, {'amount': '9.00', 'date': '2024-01-09'},
+        ]})
+        data = self.client.get('/api/dashboard/?fields=balances.balance,categories').json()
+        self.assertEqual(data['balances'], [{'balance': '0.00'}])
+        self.assertEqual(data['categories'][0]['name'], 'Food')
+        for query in ('fields=budgets', 'fields=accounts.password', 'fields=,', 'recent=500'):
+            self.assertEqual(self.client.get(f'/api/dashboard/?{query}').status_code, 400, query)
+
+    def test_transaction_form_lists_accounts_and_categories(self):
+        response = self.session_client('alice').get('/api/crud/transactions/create/')
+        self.assertContains(response, 'Wallet')
+        self.assertContains(response, 'Food')
+
+
+class ReadPathTests(FinanceFixtureMixin, TestCase):
+    """The values() read path (authapi.readers) gives exactly the read serializers' output."""
+
+    def setUp(self):
+        clear_caches()
+        Account.objects.create(user=self.user, name='Épargne ✓', type='investment', institution='',
+                               opening_balance=Decimal('-1234567.5'), balance=Decimal('0.1'))
+        Category.objects.create(user=self.user, name='Gifts', type='income', description='Multi\nline')
+        Transaction.objects.create(user=self.user, account=self.account, category=self.category,
+                                   amount=Decimal('-0.01'), date=datetime.date(1999, 12, 31),
+                                   description='Line\u2028break "quoted"', is_income=True)
+
+    def assertSameOutput(self, service):
+        expected = service.get_read_serializer(
+            service.get_list_queryset().order_by(*service.get_ordering()), many=True
+        ).data
+        actual = service.get_reader().represent(service.list_values())
+        self.assertEqual(actual, expected)
+        self.assertEqual(ORJSONRenderer().render(actual), JSONRenderer().render(expected))
+
+    def test_lists_match_the_serializers(self):
+        for service_class in (AccountService, CategoryService, TransactionService):
+            self.assertSameOutput(service_class(self.user))
+            with timezone.override('America/New_York'):
+                self.assertSameOutput(service_class(self.user))
+
+    def test_projection_and_unsupported_fields(self):
+        service = TransactionService(self.user)
+        rows = service.list_values(fields={'amount', 'account_name'})
+        self.assertNotIn('description', str(rows.query))
+        data = service.get_reader({'amount', 'account_name'}).represent(rows)
+        self.assertEqual(data[0], {'account_name': 'Wallet', 'amount': '10.00'})
+
+        class Nested(serializers.ModelSerializer):
+            account = AccountSerializer()
+
+            class Meta:
+                model = Transaction
+                fields = ('id', 'account')
+        with self.assertRaises(ImproperlyConfigured):
+            readers.RowReader(Nested)
+
+
+class JSONRenderingTests(AuthClientMixin, FinanceFixtureMixin, TestCase):
+    def setUp(self):
+        clear_caches()
+
+    def test_orjson_renderer_matches_json_renderer(self):
+        data = {
+            'created_at': datetime.datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc),
+            'date': datetime.date(2024, 1, 2), 'amount': '12.50', 'text': 'Café \u2028 ok', 7: [None, True, 1.5],
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(ORJSONRenderer().render({'amount': Decimal('12.50')}), b'{"amount":"12.50"}')
+        self.assertEqual(ORJSONParser().parse(BytesIO('{"a":"é","n":[1,2.5]}'.encode())), {'a': 'é', 'n': [1, 2.5]})
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(BytesIO(b'{"a":NaN}'))
+
+    def test_responses_are_compressed_when_large_enough(self):
+        client = self.api_client('alice')
+        plain = client.get('/api/transactions/')
+        response = client.get('/api/transactions/', HTTP_ACCEPT_ENCODING='br;q=0, gzip;q=0.5')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(response['ETag'], f'W/{plain["ETag"]}')
+        revalidated = client.get('/api/transactions/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        # Below COMPRESSION_MIN_SIZE, or not accepted
+        self.assertFalse(client.get('/api/accounts/', HTTP_ACCEPT_ENCODING='gzip').has_header('Content-Encoding'))
+        self.assertFalse(client.get('/api/transactions/', HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+                         .has_header('Content-Encoding'))
+        export = client.get('/api/transactions/export/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(export['Content-Encoding'], 'gzip')
+        self.assertIn(b'date,account', gzip.decompress(b''.join(export.streaming_content)))
+
+    def test_accept_encoding_negotiation(self):
+        self.assertEqual(accepted_encodings('gzip, br;q=0.9, *;q=0.1, x;q=bad'),
+                         {'gzip': 1.0, 'br': 0.9, '*': 0.1, 'x': 0.0})
+        middleware = CompressionMiddleware(lambda request: None)
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='deflate, *;q=0.2')
+        self.assertEqual(middleware.choose_encoding(request), 'br' if brotli else 'gzip')
+        self.assertIsNone(middleware.choose_encoding(RequestFactory().get('/')))
+
+
+@shared_response_cache
+class ResponseCacheTests(AuthClientMixin, FinanceFixtureMixin, TestCase):
+    def setUp(self):
+        clear_caches()
+
+    def test_reads_are_cached_and_revalidated(self):
+        client = self.api_client('alice')
+        first = client.get('/api/accounts/')
+        with self.assertNumQueries(0):
+            cached = client.get('/api/accounts/')
+        self.assertEqual(cached.json(), first.json())
+        self.assertEqual(cached['ETag'], first['ETag'])
+        with self.assertNumQueries(0):
+            response = client.get('/api/accounts/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual((response.status_code, response.content), (304, b''))
+        self.assertNotEqual(client.get('/api/accounts/?page_size=1')['ETag'], first['ETag'])
+
+    def test_writes_invalidate_every_resource_of_the_user(self):
+        client = self.api_client('alice')
+        etag = client.get('/api/accounts/')['ETag']
+        other_client = self.api_client('bob')
+        other_etag = other_client.get('/api/accounts/')['ETag']
+        client.post('/api/transactions/', {
+            'account': self.account.id, 'category': self.category.id,
+            'amount': '5.00', 'date': '2024-02-01', 'is_income': True,
+        }, content_type='application/json')
+        response = client.get('/api/accounts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.account.refresh_from_db()
+        self.assertEqual(response.json()['results'][0]['balance'], str(self.account.balance))
+        self.assertEqual(other_client.get('/api/accounts/', HTTP_IF_NONE_MATCH=other_etag).status_code, 304)
+
+    @override_settings(RESPONSE_CACHE_SHARED=False)
+    def test_per_process_cache_sees_writes_from_other_processes(self):
+        client = self.api_client('alice')
+        first = client.get('/api/accounts/')
+        with self.assertNumQueries(1):
+            self.assertEqual(client.get('/api/accounts/').json(), first.json())
+        # A write in another worker process: this process's cache is never told
+        with transaction.atomic():
+            sync.advance(self.user.pk)
+            Account.objects.filter(pk=self.account.pk).update(name='Purse', **sync.touched())
+        response = client.get('/api/accounts/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['name'], 'Purse')
+
+
+@shared_response_cache
+class ConditionalGetTests(AuthClientMixin, FinanceFixtureMixin, TestCase):
+    def setUp(self):
+        clear_caches()
+
+    def test_writes_move_updated_at(self):
+        before = self.account.updated_at
+        TransactionService(self.user).create({
+            'account': self.account.id, 'category': self.category.id, 'amount': '5.00', 'date': '2024-02-01',
+        })
+        self.account.refresh_from_db()
+        self.assertGreater(self.account.updated_at, before)
+
+    def test_validators_come_from_the_database(self):
+        client = self.api_client('alice')
+        first = client.get('/api/transactions/')
+        # Another worker process, with nothing in its response cache
+        clear_caches()
+        with self.assertNumQueries(1):
+            response = client.get('/api/transactions/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual((response.status_code, response.content), (304, b''))
+        item = client.get(f'/api/transactions/{first.json()["results"][0]["id"]}/')
+        response = client.get(item.wsgi_request.path, HTTP_IF_MODIFIED_SINCE=item['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+        # Renaming a category changes the transaction list, which shows its name
+        Category.objects.filter(pk=self.category.pk).update(name='Groceries', updated_at=timezone.now())
+        clear_caches()
+        response = client.get('/api/transactions/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+
+    def test_deletes_change_the_etag(self):
+        client = self.api_client('alice')
+        etag = client.get('/api/transactions/')['ETag']
+        oldest = Transaction.objects.for_user(self.user).order_by('updated_at').first()
+        client.delete(f'/api/transactions/{oldest.pk}/')
+        self.assertEqual(client.get('/api/transactions/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_lists_ignore_if_modified_since(self):
+        client = self.api_client('alice')
+        Account.objects.create(user=self.user, name='Savings', type='bank')
+        first = client.get('/api/accounts/')
+        self.assertNotIn('Last-Modified', first)
+        client.delete(f'/api/accounts/{self.account.pk}/')
+        since = http_date(time.time() + 60)
+        response = client.get('/api/accounts/', HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['name'] for row in response.json()['results']], ['Savings'])
+
+    def test_html_list_views(self):
+        client = self.session_client('alice')
+        client.get('/api/crud/accounts/')  # sets the CSRF cookie
+        for path in ('/api/crud/accounts/', '/api/crud/categories/', '/api/crud/transactions/'):
+            etag = client.get(path)['ETag']
+            response = client.get(path, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304, path)
+
+
+class SyncTests(QueryBudgetMixin, AuthClientMixin, FinanceFixtureMixin, TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = self.api_client('alice')
+
+    def sync(self, token=None, **params):
+        if token:
+            params['since'] = token
+        return self.client.get('/api/sync/', params)
+
+    def test_full_then_incremental_sync(self):
+        full = self.sync().json()
+        self.assertEqual([len(full[name]) for name in ('accounts', 'categories', 'transactions')], [1, 1, 10])
+        self.assertFalse(full['has_more'])
+        txn = self.client.post('/api/transactions/', {
+            'account': self.account.id, 'category': self.category.id, 'amount': '5.00', 'date': '2024-02-01',
+        }, content_type='application/json').json()
+        doomed = Transaction.objects.for_user(self.user).first()
+        self.client.delete(f'/api/transactions/{doomed.pk}/')
+        # Sync cost does not depend on history: expiry check + one indexed read per source
+        with self.assertMaxQueries(5):
+            delta = self.sync(full['token']).json()
+        self.assertEqual([row['id'] for row in delta['transactions']], [txn['id']])
+        self.assertEqual([row['id'] for row in delta['accounts']], [self.account.id])  # balance changed
+        self.assertEqual(delta['categories'], [])
+        self.assertEqual(delta['deleted']['transactions'], [doomed.pk])
+        again = self.sync(delta['token']).json()
+        self.assertEqual((again['transactions'], again['deleted']['transactions'], again['token']),
+                         ([], [], delta['token']))
+
+    def test_pages_do_not_split_or_repeat_changes(self):
+        seen, token, pages = [], None, 0
+        while True:
+            page = self.sync(token, page_size=4).json()
+            seen += [(name, row['id']) for name in ('accounts', 'categories', 'transactions') for row in page[name]]
+            token, pages = page['token'], pages + 1
+            if not page['has_more']:
+                break
+        self.assertEqual((len(seen), len(set(seen)), pages), (12, 12, 3))
+
+    def test_cascaded_deletes_leave_tombstones(self):
+        token = self.sync().json()['token']
+        ids = sorted(Transaction.objects.for_user(self.user).values_list('pk', flat=True))
+        CategoryService(self.user).delete(self.category.pk)
+        delta = self.sync(token).json()
+        self.assertEqual(delta['deleted'], {'accounts': [], 'categories': [self.category.pk], 'transactions': ids})
+
+    def test_invalid_and_expired_tokens(self):
+        self.assertEqual(self.sync('not-a-token').status_code, 400)
+        token = self.sync().json()['token']
+        TransactionService(self.user).delete(Transaction.objects.for_user(self.user).first().pk)
+        call_command('prune_tombstones', days=-1, stdout=StringIO())
+        self.assertEqual(self.sync(token).status_code, 410)
+        self.assertEqual(self.sync().status_code, 200)
+
+
+class DatabaseSetupTests(TestCase):
+    def test_sqlite_pragmas_are_applied_to_connections(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        with override_settings(SQLITE_PRAGMAS={'busy_timeout': 1234, 'temp_store': 'MEMORY'}):
+            configure_connection(sender=None, connection=connection)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 1234)
+            cursor.execute('PRAGMA temp_store')
+            self.assertEqual(cursor.fetchone()[0], 2)
+
+
+class MetricsTests(AuthClientMixin, FinanceFixtureMixin, TestCase):
+    def setUp(self):
+        clear_caches()
+        metrics.registry.clear()
+
+    def test_histogram_quantiles_are_within_bucket_precision(self):
+        histogram = metrics.Histogram()
+        for value in range(1, 100001):
+            histogram.record(value)
+        for q in (0.5, 0.9, 0.99):
+            self.assertAlmostEqual(histogram.quantile(q) / (q * 100000), 1, delta=0.07)
+        # 32 exact buckets, then 16 per power of two
+        self.assertLess(len(histogram.buckets), 32 + 13 * metrics.Histogram.SUB_BUCKETS)
+
+    def test_requests_are_recorded_per_endpoint(self):
+        client = self.api_client('alice')
+        client.get('/api/transactions/')
+        client.get('/api/transactions/')
+        client.get('/api/crud/transactions/')
+        text = client.get('/api/metrics/').content.decode()
+        self.assertIn('authapi_requests_total{endpoint="transaction-list",method="GET",status="200"} 2', text)
+        self.assertIn('authapi_db_queries_count{endpoint="transaction-list"} 2', text)
+        self.assertIn('authapi_requests_total{endpoint="transactions_list",method="GET",status="302"} 1', text)
+        serializer_time = [line for line in text.splitlines()
+                           if line.startswith('authapi_serializer_duration_seconds_sum{endpoint="transaction-list"}')]
+        self.assertGreater(float(serializer_time[0].split()[-1]), 0)
+
+    def test_slow_queries_are_logged_with_their_view(self):
+        client = self.api_client('alice')
+        with override_settings(SLOW_QUERY_MS=0), self.assertLogs('authapi.slow_queries', 'WARNING') as logs:
+            client.get('/api/accounts/')
+        self.assertIn('account-list (authapi.views.AccountViewSet)', logs.output[0])
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_metrics_token(self):
+        self.assertEqual(Client().get('/api/metrics/').status_code, 403)
+        self.assertEqual(Client(HTTP_AUTHORIZATION='Bearer s3cret').get('/api/metrics/').status_code, 200)
@@ -1,7 +1,8 @@
 from django.urls import path
 from rest_framework.routers import DefaultRouter
 from .views import (
-    RegisterView, LoginView, ProtectedView, RegisterPageView, LoginPageView,
+    RegisterView, LoginView, ProtectedView, ProfileView, RegisterPageView, LoginPageView,
+    MonthlyReportView, SyncView, DashboardView, MetricsView,
     AccountViewSet, CategoryViewSet, TransactionViewSet,
     AccountListView, AccountCreateView, AccountUpdateView, AccountDeleteView,
     CategoryListView, CategoryCreateView, CategoryUpdateView, CategoryDeleteView,
@@ -17,6 +18,11 @@ urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', LoginView.as_view(), name='login'),
     path('protected/', ProtectedView.as_view(), name='protected'),
+    path('profile/', ProfileView.as_view(), name='profile'),
+    path('reports/monthly/', MonthlyReportView.as_view(), name='monthly_report'),
+    path('sync/', SyncView.as_view(), name='sync'),
+    path('dashboard/', DashboardView.as_view(), name='dashboard'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     path('register-page/', RegisterPageView.as_view(), name='register_page'),
     path('login-page/', LoginPageView.as_view(), name='login_page'),
     path('crud/accounts/', AccountListView.as_view(), name='accounts_list'),
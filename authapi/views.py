@@ -2,87 +2,42 @@ from django.shortcuts import render, redirect
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from django.contrib.auth.models import User
-from django.contrib.auth.hashers import make_password
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import InvalidToken
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
-from django.http import HttpResponse
-import requests
+from django.utils.cache import patch_vary_headers
+from django.utils.crypto import constant_time_compare
+from django.core.exceptions import BadRequest
+from django.http import HttpResponse, StreamingHttpResponse
 from django.conf import settings
 from rest_framework import viewsets
-from .models import Account, Category, Transaction, UserProfile
+from rest_framework.decorators import action
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from .serializers import (
+    RegisterSerializer, AccountSerializer, CategorySerializer, TransactionSerializer,
+    MonthlyReportQuerySerializer, MonthlyTotalSerializer, TransactionImportSerializer,
+    TransactionExportQuerySerializer, LoginTokenSerializer, SyncQuerySerializer, DashboardQuerySerializer,
+    ProfileSerializer,
+)
+from .authentication import StatelessJWTAuthentication
+from .models import UserProfile
+from .importers import TransactionImporter
+from .exports import EXPORT_FORMATS, export_rows, stream_export
+from .reports import monthly_totals
+from .services import AccountService, CategoryService, TransactionService
+from .pagination import InvalidCursor, get_page_size
+from .ratelimit import rate_limit
+from . import conditional, dashboard, metrics, response_cache, sync
 from django.views import View
-from django.urls import reverse
-from django.core.cache import cache
-from functools import wraps
+import io
+import json
+import math
 from rest_framework.exceptions import Throttled
-from rest_framework import status as drf_status
 from rest_framework.parsers import MultiPartParser, FormParser
 
-# Custom rate limiting decorator
-# Example: @rate_limit(key_func, limit=5, period=60)
-def rate_limit(key_func=None, limit=5, period=60):
-    """
-    Rate limit decorator for Django views.
-    :param key_func: function(request) -> str, unique key per user/IP
-    :param limit: max requests
-    :param period: seconds
-    """
-    def decorator(view_func):
-        @wraps(view_func)
-        def _wrapped_view(request, *args, **kwargs):
-            # Use user id if authenticated, else IP
-            if key_func:
-                key = key_func(request)
-            else:
-                if hasattr(request, 'user') and request.user.is_authenticated:
-                    key = f"rl:{request.user.id}"
-                else:
-                    ip = request.META.get('REMOTE_ADDR', 'anon')
-                    key = f"rl:ip:{ip}"
-            count = cache.get(key, 0)
-            if count >= limit:
-                resp = Response({
-                    'detail': f'Rate limit exceeded. Max {limit} requests per {period} seconds.'
-                }, status=429)
-                return resp
-            else:
-                cache.set(key, count + 1, timeout=period)
-                return view_func(request, *args, **kwargs)
-        return _wrapped_view
-    return decorator
-
-# Serializer for user registration
-class RegisterSerializer(serializers.ModelSerializer):
-    photo = serializers.ImageField(write_only=True, required=False)
-
-    class Meta:
-        model = User
-        fields = ('username', 'password', 'email', 'photo')
-        extra_kwargs = {'password': {'write_only': True}}
-
-    def validate_photo(self, value):
-        if value:
-            if value.size > 2 * 1024 * 1024:
-                raise serializers.ValidationError('Photo size must be less than 2MB.')
-            if value.content_type not in ['image/jpeg', 'image/png', 'image/webp']:
-                raise serializers.ValidationError('Only JPEG, PNG, and WebP images are allowed.')
-        return value
-
-    def create(self, validated_data):
-        photo = validated_data.pop('photo', None)
-        user = User.objects.create(
-            username=validated_data['username'],
-            email=validated_data.get('email', ''),
-            password=make_password(validated_data['password'])
-        )
-        UserProfile.objects.create(user=user, photo=photo)
-        return user
-
+# API views
 class RegisterView(APIView):
     parser_classes = [MultiPartParser, FormParser]
 
@@ -113,6 +68,123 @@ class ProtectedView(APIView):
     def get(self, request):
         return Response({'message': f'Hello, {request.user.username}! This is a protected route.'})
 
+class ProfileView(APIView):
+    """
+    GET /api/profile/
+    The user's name, email and photo: its processing status and, once ready,
+    the URLs of the cleaned original and the thumbnails by size. Rate limited
+    to 30 requests per minute.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @method_decorator(rate_limit(limit=30, period=60))
+    def get(self, request):
+        # Users created outside registration have no profile row
+        profile = (UserProfile.objects.select_related('user').filter(user_id=request.user.pk).first()
+                   or UserProfile(user_id=request.user.pk))
+        return Response(ProfileSerializer(profile).data)
+
+# Monthly spending report
+class MonthlyReportView(APIView):
+    """
+    GET /api/reports/monthly/?start=2024-01-01&end=2024-12-31&group_by=category,is_income
+    Totals and counts per month, aggregated in the database. group_by is any of
+    account, category, is_income (default: all three). Rate limited to 10 requests per minute.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @method_decorator(rate_limit(limit=10, period=60))
+    def get(self, request):
+        query = MonthlyReportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        rows = monthly_totals(request.user, **query.validated_data)
+        return Response(MonthlyTotalSerializer(rows, many=True).data)
+
+class SyncView(APIView):
+    """
+    GET /api/sync/?since=<token>&page_size=500
+    Accounts, categories and transactions created or changed after the sync
+    token, and the ids of deleted ones (authapi.sync). Omit since for a full
+    sync; call again with the returned token while has_more is true.
+    Rate limited to 30 requests per minute.
+    """
+    permission_classes = [IsAuthenticated]
+    services = {'accounts': AccountService, 'categories': CategoryService, 'transactions': TransactionService}
+
+    @method_decorator(rate_limit(limit=30, period=60))
+    def get(self, request):
+        query = SyncQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        key = query.validated_data.get('since')
+        if key is None:
+            key = sync.START
+        elif sync.token_expired(request.user, key):
+            raise sync.SyncTokenExpired()
+        rows, deleted, last_key, has_more = sync.changes(request.user, key, query.validated_data['page_size'])
+        data = {
+            name: service_class(request.user).get_serializer(rows[name], many=True).data
+            for name, service_class in self.services.items()
+        }
+        data.update(deleted=deleted, token=sync.encode_token(last_key), has_more=has_more)
+        return Response(data)
+
+class DashboardView(APIView):
+    """
+    GET /api/dashboard/?fields=accounts,transactions.amount&recent=20
+    Accounts, categories, the latest `recent` transactions and account
+    balances in one response (authapi.dashboard). Cached in the responses
+    cache until the user's next write. Rate limited to 30 requests per minute.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @method_decorator(rate_limit(limit=30, period=60))
+    def get(self, request):
+        query = DashboardQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        user_id = request.user.pk
+        cache = response_cache.get_cache()
+        key = response_cache.entry_key(
+            user_id, response_cache.get_version(user_id), response_cache.request_digest(request)
+        )
+        data = cache.get(key)
+        if data is None:
+            data = dashboard.bundle(request.user, query.validated_data['fields'], query.validated_data['recent'])
+            cache.set(key, data, getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300))
+        response = Response(data)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+class MetricsView(View):
+    """
+    GET /api/metrics/: request metrics in the Prometheus text format (authapi.metrics).
+    Requires "Authorization: Bearer <METRICS_TOKEN>" when METRICS_TOKEN is set.
+    """
+    def get(self, request):
+        token = getattr(settings, 'METRICS_TOKEN', None)
+        if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return HttpResponse('Forbidden\n', status=403, content_type='text/plain')
+        return HttpResponse(metrics.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# Serializer errors as the JSON text the API would have returned
+def error_text(detail):
+    return json.dumps(detail)
+
+# on_limit for the login and registration pages: the form again, with the 429 as its error
+def limited_page(template):
+    def on_limit(request, result):
+        response = render(request, template, {'error': f'Too many attempts. Try again in {result.retry_after} seconds.'},
+                          status=429)
+        response['Retry-After'] = str(result.retry_after)
+        return response
+    return on_limit
+
+# Throttled (including passwords.HashingBusy) as the page's error, instead of DRF's JSON body
+def throttled_page(request, template, exc):
+    response = render(request, template, {'error': exc.detail}, status=exc.status_code)
+    if exc.wait is not None:
+        response['Retry-After'] = str(math.ceil(exc.wait))
+    return response
+
 # HTML Registration View
 @method_decorator(csrf_exempt, name='dispatch')
 class RegisterPageView(APIView):
@@ -122,23 +194,38 @@ class RegisterPageView(APIView):
     def get(self, request):
         return render(request, 'register.html')
 
+    # Same limit as /api/register/
+    @method_decorator(rate_limit(limit=10, period=60, on_limit=limited_page('register.html')))
     def post(self, request):
         username = request.data.get('username') or request.POST.get('username')
         email = request.data.get('email') or request.POST.get('email')
         password = request.data.get('password') or request.POST.get('password')
         data = {'username': username, 'email': email, 'password': password}
-        # Use internal API call
-        response = requests.post(request.build_absolute_uri('/api/register/'), data=data)
-        if response.status_code == 201:
+        serializer = RegisterSerializer(data=data)
+        if serializer.is_valid():
+            try:
+                serializer.save()
+            except Throttled as e:
+                return throttled_page(request, 'register.html', e)
             return render(request, 'register.html', {'message': 'Registration successful! Please log in.'})
         else:
-            error = response.json()
-            return render(request, 'register.html', {'error': error})
+            return render(request, 'register.html', {'error': error_text(serializer.errors)})
 
 # Helper to get JWT token from session
 def get_token(request):
     return request.session.get('jwt_token')
 
+# Resolve the session's JWT to a user in-process, or None if missing/invalid
+def get_session_user(request):
+    token = get_token(request)
+    if not token:
+        return None
+    auth = StatelessJWTAuthentication()
+    try:
+        return auth.get_user(auth.get_validated_token(token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
 # Login page override to store JWT in session
 class LoginPageView(APIView):
     authentication_classes = []
@@ -147,41 +234,132 @@ class LoginPageView(APIView):
     def get(self, request):
         return render(request, 'login.html')
 
+    # Same limit as /api/login/
+    @method_decorator(rate_limit(limit=10, period=60, on_limit=limited_page('login.html')))
     def post(self, request):
         username = request.data.get('username') or request.POST.get('username')
         password = request.data.get('password') or request.POST.get('password')
         data = {'username': username, 'password': password}
-        response = requests.post(request.build_absolute_uri('/api/login/'), data=data)
-        if response.status_code == 200:
-            token = response.json().get('access')
-            request.session['jwt_token'] = token
-            return redirect('/api/crud/accounts/')
+        serializer = LoginTokenSerializer(data=data)
+        try:
+            valid = serializer.is_valid()
+        except AuthenticationFailed as e:
+            return render(request, 'login.html', {'error': e.detail})
+        except Throttled as e:
+            return throttled_page(request, 'login.html', e)
+        if not valid:
+            return render(request, 'login.html', {'error': 'Invalid credentials'})
+        request.session['jwt_token'] = serializer.validated_data['access']
+        return redirect('/api/crud/accounts/')
+
+# Number of items in a bulk request, for the size-based rate limit
+def bulk_size(request):
+    data = request.data if isinstance(request.data, dict) else {}
+    return sum(len(data[op]) for op in ('create', 'update', 'delete') if isinstance(data.get(op), list))
+
+# Routes viewset queries and writes through the per-user service layer
+class ServiceViewSetMixin:
+    service_class = None
+
+    def get_service(self):
+        return self.service_class(self.request.user)
+
+    @property
+    def ordering(self):
+        # Read by KeysetPagination
+        return self.get_service().get_ordering(self.get_filters())
+
+    read_actions = ('list', 'retrieve')
+
+    def get_filters(self):
+        """The list's validated query-parameter filters ({} for other actions). Raises ValidationError."""
+        if self.action != 'list':
+            return {}
+        if not hasattr(self, '_filters'):
+            self._filters = self.get_service().parse_filters(self.request.query_params)
+        return self._filters
+
+    def get_queryset(self):
+        if self.action == 'list':
+            return self.get_service().get_list_queryset(self.get_filters())
+        if self.action in self.read_actions:
+            return self.get_service().get_read_queryset()
+        return self.get_service().get_queryset()
+
+    def list(self, request, *args, **kwargs):
+        # values() rows formatted by authapi.readers: the serializer's output without its per-row cost
+        service = self.get_service()
+        rows = service.list_values(self.get_filters())
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return Response(service.get_reader().represent(rows))
+        return self.get_paginated_response(service.get_reader().represent(page))
+
+    def get_serializer_class(self):
+        if self.action in self.read_actions and self.service_class.read_serializer_class:
+            return self.service_class.read_serializer_class
+        return super().get_serializer_class()
+
+    def perform_create(self, serializer):
+        self.get_service().perform_create(serializer)
+
+    def perform_update(self, serializer):
+        self.get_service().perform_update(serializer)
+
+    def perform_destroy(self, instance):
+        self.get_service().perform_destroy(instance)
+
+# Read-through cache for list/retrieve, with conditional GET support
+class CachedReadMixin:
+    """
+    Serves list and retrieve from authapi.response_cache. Every response
+    carries an ETag (and an item a Last-Modified) from authapi.conditional; when
+    If-None-Match or If-Modified-Since shows the client is up to date, the view
+    answers 304 without reading or serializing the data.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, lambda: super(CachedReadMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, lambda: super(CachedReadMixin, self).retrieve(request, *args, **kwargs)
+        )
+
+    def get_validators(self, digest):
+        """(etag, last_modified) from one aggregate query."""
+        pk = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field) if self.action == 'retrieve' else None
+        state = self.get_service().read_state(pk)
+        return conditional.make_etag(self.request.user.pk, state, digest), conditional.last_modified(state, pk)
+
+    def cached_response(self, request, respond):
+        user_id = request.user.pk
+        digest = response_cache.request_digest(request)
+        cache = response_cache.get_cache()
+        key = response_cache.entry_key(user_id, response_cache.get_version(user_id), digest)
+        entry = cache.get(key)
+        if entry is not None:
+            etag, last_modified, data = entry
         else:
-            error = response.json().get('detail', 'Invalid credentials')
-            return render(request, 'login.html', {'error': error})
-
-# Serializers for CRUD
-class AccountSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Account
-        fields = '__all__'
-        read_only_fields = ['user']
-
-class CategorySerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Category
-        fields = '__all__'
-        read_only_fields = ['user']
-
-class TransactionSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Transaction
-        fields = '__all__'
-        read_only_fields = ['user']
+            # Read before the data: a write in between leaves an older ETag, never a newer one
+            (etag, last_modified), data = self.get_validators(digest), None
+        response = conditional.not_modified(request, etag, last_modified)
+        if response is None:
+            if data is not None:
+                response = Response(data)
+            else:
+                response = respond()
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                cache.set(key, (etag, last_modified, response.data), getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300))
+            for name, value in conditional.validator_headers(etag, last_modified).items():
+                response[name] = value
+        patch_vary_headers(response, ('Authorization',))
+        return response
 
 # CRUD ViewSets (all require authentication)
-class AccountViewSet(viewsets.ModelViewSet):
-    queryset = Account.objects.all()
+class AccountViewSet(CachedReadMixin, ServiceViewSetMixin, viewsets.ModelViewSet):
+    service_class = AccountService
     serializer_class = AccountSerializer
     permission_classes = [IsAuthenticated]
 
@@ -201,11 +379,8 @@ class AccountViewSet(viewsets.ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         return super().destroy(request, *args, **kwargs)
 
-    def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
-
-class CategoryViewSet(viewsets.ModelViewSet):
-    queryset = Category.objects.all()
+class CategoryViewSet(CachedReadMixin, ServiceViewSetMixin, viewsets.ModelViewSet):
+    service_class = CategoryService
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated]
 
@@ -225,11 +400,8 @@ class CategoryViewSet(viewsets.ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         return super().destroy(request, *args, **kwargs)
 
-    def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
-
-class TransactionViewSet(viewsets.ModelViewSet):
-    queryset = Transaction.objects.all()
+class TransactionViewSet(CachedReadMixin, ServiceViewSetMixin, viewsets.ModelViewSet):
+    service_class = TransactionService
     serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticated]
 
@@ -249,207 +421,228 @@ class TransactionViewSet(viewsets.ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         return super().destroy(request, *args, **kwargs)
 
-# CRUD UI Views
-class AccountListView(View):
-    def get(self, request):
-        token = get_token(request)
-        if not token:
+    @action(detail=False, methods=['post'], url_path='bulk')
+    @method_decorator(rate_limit(limit=10, period=60))
+    @method_decorator(rate_limit(limit=50000, period=3600, scope='bulk-items', cost=bulk_size, unit='items'))
+    def bulk(self, request):
+        """
+        POST /api/transactions/bulk/
+        {"create": [{...}], "update": [{"id": 1, ...}], "delete": [2, 3]}
+        Counts as one request against the usual limit, plus one unit per item
+        against a separate hourly item quota.
+        """
+        result = self.get_service().bulk_write(request.data)
+        written = any(result[op] for op in ('created', 'updated', 'deleted'))
+        if not result['errors']:
+            code = status.HTTP_201_CREATED if result['created'] else status.HTTP_200_OK
+        else:
+            code = status.HTTP_207_MULTI_STATUS if written else status.HTTP_400_BAD_REQUEST
+        return Response(result, status=code)
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser, FormParser])
+    @method_decorator(rate_limit(limit=10, period=60))
+    def import_file(self, request):
+        """
+        POST /api/transactions/import/ (multipart)
+        file: CSV or OFX statement; account: target account id; category: default category id;
+        format: csv|ofx (default from the file extension); dedupe: true|false (default true)
+        """
+        params = TransactionImportSerializer(data=request.data, context={'request': request})
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+        importer = TransactionImporter(request.user, data['account'], data.get('category'), dedupe=data['dedupe'])
+        lines = io.TextIOWrapper(data['file'].open('rb'), encoding='utf-8-sig', errors='replace', newline='')
+        report = importer.run(lines, data['format'])
+        return Response(report.as_dict(), status=status.HTTP_201_CREATED if report.created else status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='export')
+    @method_decorator(rate_limit(limit=10, period=60))
+    def export(self, request):
+        """
+        GET /api/transactions/export/?output=csv|ndjson&start=2024-01-01&end=2024-12-31&account=1
+        Streams the user's full (optionally filtered) history, oldest first.
+        """
+        query = TransactionExportQuerySerializer(data=request.query_params, context={'request': request})
+        query.is_valid(raise_exception=True)
+        params = dict(query.validated_data)
+        output = params.pop('output')
+        response = StreamingHttpResponse(
+            stream_export(export_rows(request.user, **params), output),
+            content_type=EXPORT_FORMATS[output],
+        )
+        response['Content-Disposition'] = f'attachment; filename="transactions.{output}"'
+        return response
+
+
+# CRUD UI Views (call the service layer in-process)
+class SessionUserMixin:
+    """Resolves the user from the session JWT, redirecting to the login page if there is none."""
+    def dispatch(self, request, *args, **kwargs):
+        self.user = get_session_user(request)
+        if self.user is None:
             return redirect('/api/login-page/')
-        headers = {'Authorization': f'Bearer {token}'}
-        resp = requests.get(request.build_absolute_uri('/api/accounts/'), headers=headers)
-        accounts = resp.json() if resp.status_code == 200 else []
-        return render(request, 'accounts_list.html', {'accounts': accounts})
+        return super().dispatch(request, *args, **kwargs)
+
+def account_form_data(request):
+    return {
+        'name': request.POST.get('name'),
+        'type': request.POST.get('type'),
+        'opening_balance': request.POST.get('opening_balance'),
+        'institution': request.POST.get('institution'),
+    }
+
+def category_form_data(request):
+    return {
+        'name': request.POST.get('name'),
+        'type': request.POST.get('type'),
+        'description': request.POST.get('description'),
+        'color': request.POST.get('color'),
+    }
+
+def transaction_form_data(request):
+    return {
+        'account': request.POST.get('account'),
+        'category': request.POST.get('category'),
+        'amount': request.POST.get('amount'),
+        'date': request.POST.get('date'),
+        'description': request.POST.get('description'),
+        'is_income': request.POST.get('is_income') == 'on',
+    }
+
+class PagedListMixin(SessionUserMixin):
+    """
+    Keyset-paged list page driven by ?cursor= and ?page_size=. Answers 304
+    from the list's ETag (authapi.conditional) before rendering.
+    """
+    service_class = None
+    template_name = None
+    context_object_name = None
 
-class AccountCreateView(View):
+    def get(self, request):
+        service = self.service_class(self.user)
+        state = service.read_state()
+        # The page embeds a CSRF token, so a new CSRF cookie needs a fresh page
+        variant = f"{response_cache.request_digest(request, format='html')}|{request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')}"
+        etag = conditional.make_etag(self.user.pk, state, variant)
+        response = conditional.not_modified(request, etag, None)
+        if response is None:
+            response = self.render_page(request, service)
+            for name, value in conditional.validator_headers(etag, None).items():
+                response[name] = value
+        return response
+
+    def render_page(self, request, service):
+        try:
+            rows, next_cursor, previous_cursor = service.page_data(
+                request.GET.get('cursor'), get_page_size(request.GET)
+            )
+        except InvalidCursor:
+            raise BadRequest('Invalid cursor')
+        return render(request, self.template_name, {
+            self.context_object_name: rows,
+            'next_cursor': next_cursor,
+            'previous_cursor': previous_cursor,
+            'is_first_page': not request.GET.get('cursor'),
+        })
+
+class AccountListView(PagedListMixin, View):
+    service_class = AccountService
+    template_name = 'accounts_list.html'
+    context_object_name = 'accounts'
+
+class AccountCreateView(SessionUserMixin, View):
     def get(self, request):
         return render(request, 'account_form.html')
     def post(self, request):
-        token = get_token(request)
-        if not token:
-            return redirect('/api/login-page/')
-        headers = {'Authorization': f'Bearer {token}'}
-        data = {
-            'name': request.POST.get('name'),
-            'type': request.POST.get('type'),
-            'balance': request.POST.get('balance'),
-            'institution': request.POST.get('institution'),
-        }
-        resp = requests.post(request.build_absolute_uri('/api/accounts/'), json=data, headers=headers)
-        if resp.status_code == 201:
-            return redirect('/api/crud/accounts/')
-        return render(request, 'account_form.html', {'error': resp.text})
+        try:
+            AccountService(self.user).create(account_form_data(request))
+        except ValidationError as e:
+            return render(request, 'account_form.html', {'error': error_text(e.detail)})
+        return redirect('/api/crud/accounts/')
 
-class AccountUpdateView(View):
+class AccountUpdateView(SessionUserMixin, View):
     def get(self, request, pk):
-        token = get_token(request)
-        if not token:
-            return redirect('/api/login-page/')
-        headers = {'Authorization': f'Bearer {token}'}
-        resp = requests.get(request.build_absolute_uri(f'/api/accounts/{pk}/'), headers=headers)
-        account = resp.json() if resp.status_code == 200 else None
+        account = AccountService(self.user).retrieve_data(pk)
         return render(request, 'account_form.html', {'account': account})
     def post(self, request, pk):
-        token = get_token(request)
-        if not token:
-            return redirect('/api/login-page/')
-        headers = {'Authorization': f'Bearer {token}'}
-        data = {
-            'name': request.POST.get('name'),
-            'type': request.POST.get('type'),
-            'balance': request.POST.get('balance'),
-            'institution': request.POST.get('institution'),
-        }
-        resp = requests.put(request.build_absolute_uri(f'/api/accounts/{pk}/'), json=data, headers=headers)
-        if resp.status_code in (200, 204):
-            return redirect('/api/crud/accounts/')
-        return render(request, 'account_form.html', {'error': resp.text, 'account': data})
+        data = account_form_data(request)
+        try:
+            AccountService(self.user).update(pk, data)
+        except ValidationError as e:
+            return render(request, 'account_form.html', {'error': error_text(e.detail), 'account': data})
+        return redirect('/api/crud/accounts/')
 
-class AccountDeleteView(View):
+class AccountDeleteView(SessionUserMixin, View):
     def post(self, request, pk):
-        token = get_token(request)
-        if not token:
-            return redirect('/api/login-page/')
-        headers = {'Authorization': f'Bearer {token}'}
-        requests.delete(request.build_absolute_uri(f'/api/accounts/{pk}/'), headers=headers)
+        AccountService(self.user).delete(pk)
         return redirect('/api/crud/accounts/')
 
-class CategoryListView(View):
-    def get(self, request):
-        token = get_token(request)
-        if not token:
-            return redirect('/api/login-page/')
-        headers = {'Authorization': f'Bearer {token}'}
-        resp = requests.get(request.build_absolute_uri('/api/categories/'), headers=headers)
-        categories = resp.json() if resp.status_code == 200 else []
-        return render(request, 'categories_list.html', {'categories': categories})
+class CategoryListView(PagedListMixin, View):
+    service_class = CategoryService
+    template_name = 'categories_list.html'
+    context_object_name = 'categories'
 
-class CategoryCreateView(View):
+class CategoryCreateView(SessionUserMixin, View):
     def get(self, request):
         return render(request, 'category_form.html')
     def post(self, request):
-        token = get_token(request)
-        if not token:
-            return redirect('/api/login-page/')
-        headers = {'Authorization': f'Bearer {token}'}
-        data = {
-            'name': request.POST.get('name'),
-            'type': request.POST.get('type'),
-            'description': request.POST.get('description'),
-            'color': request.POST.get('color'),
-        }
-        resp = requests.post(request.build_absolute_uri('/api/categories/'), json=data, headers=headers)
-        if resp.status_code == 201:
-            return redirect('/api/crud/categories/')
-        return render(request, 'category_form.html', {'error': resp.text})
+        try:
+            CategoryService(self.user).create(category_form_data(request))
+        except ValidationError as e:
+            return render(request, 'category_form.html', {'error': error_text(e.detail)})
+        return redirect('/api/crud/categories/')
 
-class CategoryUpdateView(View):
+class CategoryUpdateView(SessionUserMixin, View):
     def get(self, request, pk):
-        token = get_token(request)
-        if not token:
-            return redirect('/api/login-page/')
-        headers = {'Authorization': f'Bearer {token}'}
-        resp = requests.get(request.build_absolute_uri(f'/api/categories/{pk}/'), headers=headers)
-        category = resp.json() if resp.status_code == 200 else None
+        category = CategoryService(self.user).retrieve_data(pk)
         return render(request, 'category_form.html', {'category': category})
     def post(self, request, pk):
-        token = get_token(request)
-        if not token:
-            return redirect('/api/login-page/')
-        headers = {'Authorization': f'Bearer {token}'}
-        data = {
-            'name': request.POST.get('name'),
-            'type': request.POST.get('type'),
-            'description': request.POST.get('description'),
-            'color': request.POST.get('color'),
-        }
-        resp = requests.put(request.build_absolute_uri(f'/api/categories/{pk}/'), json=data, headers=headers)
-        if resp.status_code in (200, 204):
-            return redirect('/api/crud/categories/')
-        return render(request, 'category_form.html', {'error': resp.text, 'category': data})
+        data = category_form_data(request)
+        try:
+            CategoryService(self.user).update(pk, data)
+        except ValidationError as e:
+            return render(request, 'category_form.html', {'error': error_text(e.detail), 'category': data})
+        return redirect('/api/crud/categories/')
 
-class CategoryDeleteView(View):
+class CategoryDeleteView(SessionUserMixin, View):
     def post(self, request, pk):
-        token = get_token(request)
-        if not token:
-            return redirect('/api/login-page/')
-        headers = {'Authorization': f'Bearer {token}'}
-        requests.delete(request.build_absolute_uri(f'/api/categories/{pk}/'), headers=headers)
+        CategoryService(self.user).delete(pk)
         return redirect('/api/crud/categories/')
 
-class TransactionListView(View):
-    def get(self, request):
-        token = get_token(request)
-        if not token:
-            return redirect('/api/login-page/')
-        headers = {'Authorization': f'Bearer {token}'}
-        resp = requests.get(request.build_absolute_uri('/api/transactions/'), headers=headers)
-        transactions = resp.json() if resp.status_code == 200 else []
-        return render(request, 'transactions_list.html', {'transactions': transactions})
+class TransactionListView(PagedListMixin, View):
+    service_class = TransactionService
+    template_name = 'transactions_list.html'
+    context_object_name = 'transactions'
 
-class TransactionCreateView(View):
+class TransactionFormMixin(SessionUserMixin):
+    def render_form(self, request, **context):
+        # Only what the account and category <select>s show
+        context.update(dashboard.bundle(self.user, {'accounts': {'id', 'name'}, 'categories': {'id', 'name'}}))
+        return render(request, 'transaction_form.html', context)
+
+class TransactionCreateView(TransactionFormMixin, View):
     def get(self, request):
-        token = get_token(request)
-        if not token:
-            return redirect('/api/login-page/')
-        headers = {'Authorization': f'Bearer {token}'}
-        accounts = requests.get(request.build_absolute_uri('/api/accounts/'), headers=headers).json()
-        categories = requests.get(request.build_absolute_uri('/api/categories/'), headers=headers).json()
-        return render(request, 'transaction_form.html', {'accounts': accounts, 'categories': categories})
+        return self.render_form(request)
     def post(self, request):
-        token = get_token(request)
-        if not token:
-            return redirect('/api/login-page/')
-        headers = {'Authorization': f'Bearer {token}'}
-        data = {
-            'account': request.POST.get('account'),
-            'category': request.POST.get('category'),
-            'amount': request.POST.get('amount'),
-            'date': request.POST.get('date'),
-            'description': request.POST.get('description'),
-            'is_income': request.POST.get('is_income') == 'on',
-        }
-        resp = requests.post(request.build_absolute_uri('/api/transactions/'), json=data, headers=headers)
-        if resp.status_code == 201:
-            return redirect('/api/crud/transactions/')
-        accounts = requests.get(request.build_absolute_uri('/api/accounts/'), headers=headers).json()
-        categories = requests.get(request.build_absolute_uri('/api/categories/'), headers=headers).json()
-        return render(request, 'transaction_form.html', {'error': resp.text, 'accounts': accounts, 'categories': categories})
-
-class TransactionUpdateView(View):
+        try:
+            TransactionService(self.user).create(transaction_form_data(request))
+        except ValidationError as e:
+            return self.render_form(request, error=error_text(e.detail))
+        return redirect('/api/crud/transactions/')
+
+class TransactionUpdateView(TransactionFormMixin, View):
     def get(self, request, pk):
-        token = get_token(request)
-        if not token:
-            return redirect('/api/login-page/')
-        headers = {'Authorization': f'Bearer {token}'}
-        transaction = requests.get(request.build_absolute_uri(f'/api/transactions/{pk}/'), headers=headers).json()
-        accounts = requests.get(request.build_absolute_uri('/api/accounts/'), headers=headers).json()
-        categories = requests.get(request.build_absolute_uri('/api/categories/'), headers=headers).json()
-        return render(request, 'transaction_form.html', {'transaction': transaction, 'accounts': accounts, 'categories': categories})
+        transaction = TransactionService(self.user).retrieve_data(pk)
+        return self.render_form(request, transaction=transaction)
     def post(self, request, pk):
-        token = get_token(request)
-        if not token:
-            return redirect('/api/login-page/')
-        headers = {'Authorization': f'Bearer {token}'}
-        data = {
-            'account': request.POST.get('account'),
-            'category': request.POST.get('category'),
-            'amount': request.POST.get('amount'),
-            'date': request.POST.get('date'),
-            'description': request.POST.get('description'),
-            'is_income': request.POST.get('is_income') == 'on',
-        }
-        resp = requests.put(request.build_absolute_uri(f'/api/transactions/{pk}/'), json=data, headers=headers)
-        if resp.status_code in (200, 204):
-            return redirect('/api/crud/transactions/')
-        accounts = requests.get(request.build_absolute_uri('/api/accounts/'), headers=headers).json()
-        categories = requests.get(request.build_absolute_uri('/api/categories/'), headers=headers).json()
-        return render(request, 'transaction_form.html', {'error': resp.text, 'transaction': data, 'accounts': accounts, 'categories': categories})
-
-class TransactionDeleteView(View):
+        data = transaction_form_data(request)
+        try:
+            TransactionService(self.user).update(pk, data)
+        except ValidationError as e:
+            return self.render_form(request, error=error_text(e.detail), transaction=data)
+        return redirect('/api/crud/transactions/')
+
+class TransactionDeleteView(SessionUserMixin, View):
     def post(self, request, pk):
-        token = get_token(request)
-        if not token:
-            return redirect('/api/login-page/')
-        headers = {'Authorization': f'Bearer {token}'}
-        requests.delete(request.build_absolute_uri(f'/api/transactions/{pk}/'), headers=headers)
+        TransactionService(self.user).delete(pk)
         return redirect('/api/crud/transactions/')
@@ -0,0 +1,12 @@
+"""
+URL configuration for the ASGI profile (finalproj.settings_asgi).
+
+The async read views in authapi.async_urls come first, so they answer the
+resource URLs; every other route is the same as in finalproj.urls.
+"""
+from django.urls import include, path
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/', include('authapi.async_urls')),
+] + sync_urlpatterns
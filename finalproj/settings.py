@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +44,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its wall time covers everything below it
+    'authapi.middleware.InstrumentationMiddleware',
+    # Next, so it compresses what every other middleware produced and metrics see bytes on the wire
+    'authapi.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,12 +81,66 @@ WSGI_APPLICATION = 'finalproj.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE selects the profile: sqlite (default) or postgres.
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'finalproj'),
+            'USER': os.environ.get('POSTGRES_USER', 'finalproj'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', '127.0.0.1'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            # Reuse each worker thread's connection across requests, checking it first
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 0))
+    if DB_POOL_MAX_SIZE:
+        # psycopg's connection pool (pip install "psycopg[pool]"), shared by the
+        # process's threads. It replaces persistent connections, which must be off.
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': 10,
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {},
+            # A file rather than Django's shared-cache in-memory default, whose lock
+            # conflicts fail at once instead of waiting for busy_timeout
+            'TEST': {'NAME': os.environ.get('SQLITE_TEST_PATH', BASE_DIR / 'test_db.sqlite3')},
+        }
     }
+
+# SQLite tuning, applied to every new connection by authapi.db.configure_connection.
+# WAL lets reads run alongside a write; synchronous=NORMAL fsyncs at checkpoints
+# instead of every commit (safe with WAL); busy_timeout waits for the write lock
+# instead of failing with "database is locked". SQLITE_OPTIMIZED=0 keeps SQLite's defaults.
+SQLITE_OPTIMIZED = os.environ.get('SQLITE_OPTIMIZED', '1') != '0'
+SQLITE_OPTIMIZED_PRAGMAS = {
+    'busy_timeout': 20000,
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
 }
+SQLITE_PRAGMAS = SQLITE_OPTIMIZED_PRAGMAS if SQLITE_OPTIMIZED else {}
+if SQLITE_OPTIMIZED and DB_ENGINE != 'postgres':
+    # Keep connections, and the PRAGMAs run on them, across requests
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 600))
+    # Take the write lock when a transaction starts. A deferred transaction that
+    # reads and then writes cannot wait for the lock and fails at once instead.
+    DATABASES['default']['OPTIONS']['transaction_mode'] = 'IMMEDIATE'
 
 
 # Password validation
@@ -103,6 +162,33 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing (authapi.passwords). PASSWORD_HASHER picks the algorithm for
+# new hashes: pbkdf2_sha256 (default), scrypt, or argon2 (pip install argon2-cffi).
+# The others stay listed so existing hashes still verify; changing the
+# algorithm or a cost rehashes each password at the user's next login.
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2_sha256')
+PASSWORD_HASHER_CLASSES = {
+    'pbkdf2_sha256': 'authapi.passwords.PBKDF2PasswordHasher',
+    'scrypt': 'authapi.passwords.ScryptPasswordHasher',
+    'argon2': 'authapi.passwords.Argon2PasswordHasher',
+}
+PASSWORD_HASHERS = [PASSWORD_HASHER_CLASSES[PASSWORD_HASHER]] + [
+    path for name, path in PASSWORD_HASHER_CLASSES.items() if name != PASSWORD_HASHER
+]
+# Cost parameters per algorithm (hasher class attributes); omitted ones keep Django's defaults
+PASSWORD_HASH_COST = {
+    'pbkdf2_sha256': {'iterations': int(os.environ.get('PBKDF2_ITERATIONS', 1_000_000))},
+    'scrypt': {'work_factor': 2 ** 14},
+    'argon2': {'time_cost': 2, 'memory_cost': 102400, 'parallelism': 8},
+}
+# Threads that hash passwords (default: one per CPU), and how many more
+# requests may wait for one before logins get a 429
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 0)) or None
+PASSWORD_HASH_QUEUE = 64
+
+AUTHENTICATION_BACKENDS = ['authapi.passwords.PooledModelBackend']
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
 
@@ -124,13 +210,113 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Background tasks (authapi.tasks): ThreadPoolBackend, ProcessPoolBackend or ImmediateBackend
+TASK_BACKEND = os.environ.get('TASK_BACKEND', 'authapi.tasks.ThreadPoolBackend')
+TASK_WORKERS = 2
+
+# Square WebP thumbnails generated for each profile photo, in pixels
+PROFILE_THUMBNAIL_SIZES = (64, 256)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Caches
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Rate-limit counters go to their own cache. Set REDIS_URL so that all worker
+# processes share one counter; without it a per-process local-memory cache is used.
+
+REDIS_URL = os.environ.get('REDIS_URL')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'ratelimit': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ratelimit',
+    },
+    # API read responses and per-user versions (authapi.response_cache); shared when REDIS_URL is set
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'responses',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+RATE_LIMIT_CACHE = 'ratelimit'
+
+RESPONSE_CACHE = 'responses'
+# Seconds a cached list/retrieve response is kept; writes make it stale sooner
+RESPONSE_CACHE_TIMEOUT = 300
+# Whether every worker process sees the same responses cache. If not, each cached
+# read also checks the user's change sequence number in the database, so that a
+# write in one process makes the others' cached responses stale.
+RESPONSE_CACHE_SHARED = bool(REDIS_URL)
+
+# Request metrics (authapi.metrics): queries slower than this many milliseconds are
+# logged to authapi.slow_queries. Set METRICS_TOKEN to require
+# "Authorization: Bearer <token>" on /api/metrics/.
+SLOW_QUERY_MS = int(os.environ.get('SLOW_QUERY_MS', 200))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'authapi.slow_queries': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}
+
+# Days deleted objects stay in the /api/sync/ feed (manage.py prune_tombstones)
+SYNC_TOMBSTONE_RETENTION_DAYS = 90
+
+# Maximum number of create/update/delete items in one /api/transactions/bulk/ request
+TRANSACTION_BULK_MAX_ITEMS = 5000
+
+SIMPLE_JWT = {
+    # Login tokens carry the username so requests need no User lookup
+    'TOKEN_OBTAIN_SERIALIZER': 'authapi.serializers.LoginTokenSerializer',
+    # Tokens embed a hash of the password hash; changing the password revokes them
+    'CHECK_REVOKE_TOKEN': True,
+}
+
+# Per-process cache of the user state used for token revocation checks
+AUTH_REVOCATION_CACHE_SIZE = 10000
+AUTH_REVOCATION_CACHE_TTL = 60
+
 REST_FRAMEWORK = {
+    # Builds request.user from token claims; see authapi.authentication
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authapi.authentication.StatelessJWTAuthentication',
+    ),
+    # Keyset pagination; clients may pass ?page_size= up to authapi.pagination.MAX_PAGE_SIZE
+    'DEFAULT_PAGINATION_CLASS': 'authapi.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
+    # orjson-based JSON (authapi.renderers); falls back to DRF's json module if orjson is missing
+    'DEFAULT_RENDERER_CLASSES': (
+        'authapi.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'authapi.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ),
 }
+
+# Response compression (authapi.middleware.CompressionMiddleware): smaller
+# bodies are sent uncompressed; brotli (pip install brotli) is used when the
+# client prefers it, at a quality suited to compressing on every request
+COMPRESSION_MIN_SIZE = 1024
+BROTLI_QUALITY = 4
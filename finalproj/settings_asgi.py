@@ -0,0 +1,13 @@
+"""
+ASGI deployment profile.
+
+Same as finalproj.settings, but GETs on the API's resource URLs are served by
+the native async views in authapi.async_views. finalproj/asgi.py uses this
+module by default. Run one worker per process with an ASGI server, e.g.:
+
+    pip install uvicorn
+    uvicorn finalproj.asgi:application --workers 4
+"""
+from .settings import *  # noqa: F401,F403
+
+ROOT_URLCONF = 'finalproj.asgi_urls'